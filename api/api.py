@@ -194,11 +194,18 @@ async def structural_analysis(request: Request):
                 return {"status": "error", "message": f"The project directory does not exist.: {project_dir}"}
 
                 # 调用 project_parser.py 中的 parser 方法
-        from api.tools.project_parser import parse_project
+        from api.tools.project_parser import update_project_analysis
         logger.info("-------------------project_dir--------------------------- %s", project_dir)
-        analysis_result = parse_project(project_dir)  # 传递本地目录路径
-
-        return {"status": "success", "analysis": analysis_result}
+        # Parsing is CPU-bound and fans out to worker processes; keep the event loop free meanwhile
+        parser_config = configs.get("code_parser", {})
+        analysis_result, cache_stats = await asyncio.to_thread(
+            update_project_analysis, project_dir,
+            engine=parser_config.get("engine", "regex"),
+            use_cache=parser_config.get("cache", True),
+        )  # 传递本地目录路径
+
+        return {"status": "success", "analysis": analysis_result,
+                "cache": {"reused": cache_stats.reused, "parsed": cache_stats.parsed, "removed": cache_stats.removed}}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
@@ -233,7 +240,7 @@ async def get_structural_analysis_api(request: Request):
                 # 调用 project_parser.py 中的 parser 方法
         from api.tools.project_parser import get_structural_analysis
         logger.info("-------------------project_dir--------------------------- %s", project_dir)
-        analysis_result = get_structural_analysis(project_dir)  # 传递本地目录路径
+        analysis_result = get_structural_analysis(project_dir, modules=data.get('modules'))  # 传递本地目录路径
 
         return {"status": "success", "analysis": analysis_result}
     except Exception as e:
@@ -663,6 +670,17 @@ async def health_check():
         "service": "deepwiki-api"
     }
 
+@app.get("/api/retriever_cache/metrics")
+async def retriever_cache_metrics():
+    """Hit/miss counters and memory use of the shared retriever and query embedding caches"""
+    from api.tools.query_cache import get_query_embedding_cache
+    from api.tools.retriever_cache import get_retriever_cache
+    metrics = get_retriever_cache(configs.get("retriever_cache")).metrics()
+    query_cache = get_query_embedding_cache(configs.get("query_cache"))
+    if query_cache is not None:
+        metrics["query_embeddings"] = query_cache.metrics()
+    return metrics
+
 @app.get("/")
 async def root():
     """Root endpoint to check if the API is running and list available endpoints dynamically."""
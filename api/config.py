@@ -268,16 +268,17 @@ lang_config = load_lang_config()
 if generator_config:
     configs["default_provider"] = generator_config.get("default_provider", "google")
     configs["providers"] = generator_config.get("providers", {})
+    configs["context_budget"] = generator_config.get("context_budget", {})
 
 # Update embedder configuration
 if embedder_config:
-    for key in ["embedder", "embedder_ollama", "retriever", "text_splitter"]:
+    for key in ["embedder", "embedder_ollama", "retriever", "retriever_cache", "query_cache", "embedding_cache", "text_splitter", "vector_store"]:
         if key in embedder_config:
             configs[key] = embedder_config[key]
 
 # Update repository configuration
 if repo_config:
-    for key in ["file_filters", "repository"]:
+    for key in ["file_filters", "repository", "ingest", "code_parser"]:
         if key in repo_config:
             configs[key] = repo_config[key]
 
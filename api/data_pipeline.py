@@ -1,23 +1,37 @@
 import adalflow as adal
 from adalflow.core.types import Document, List
+from copy import deepcopy
+from typing import Callable, Iterable, Optional
 from adalflow.components.data_process import TextSplitter, ToEmbeddings
 import os
 import subprocess
 import json
-import tiktoken
 import logging
 import base64
 import re
-import glob
 from adalflow.utils import get_adalflow_default_root_path
 from adalflow.core.db import LocalDB
-from api.config import configs, DEFAULT_EXCLUDED_DIRS, DEFAULT_EXCLUDED_FILES
+from adalflow.core.component import DataComponent
+from api.config import configs, DEFAULT_EXCLUDED_DIRS, DEFAULT_EXCLUDED_FILES, is_ollama_embedder as configured_ollama_embedder
 from api.ollama_patch import OllamaDocumentProcessor
+from api.tools.ollama_batch import OllamaBatchConfig
+from api.tools.embedding_cache import EmbeddingCache, embedding_cache_key, get_embedding_cache
+from api.tools.streaming import PipelineStats, batched, run_pipeline
 from urllib.parse import urlparse, urlunparse, quote
 import requests
 from requests.exceptions import RequestException
 
 from api.tools.embedder import get_embedder
+from api.tools.file_walker import RepoFile, iter_repository_files
+from api.tools.code_splitter import CodeSplitterConfig, split_code
+from api.tools.project_parser import create_code_parser
+from api.tools.file_gate import SKIP_READ_ERROR, SKIP_TOKEN_LIMIT, FileGateConfig
+from api.tools.ingest import ConcurrentIngestor, IngestConfig, IngestReport, ingest_report_path_for
+from api.tools.index_manifest import IndexManifest, compute_fingerprints, manifest_path_for
+from api.tools.vector_store import StoreBuildLock, VectorStore, VectorStoreWriter, store_path_for
+from api.tools.lexical_index import ensure_lexical_index
+from api.tools.metadata_index import ensure_metadata_index
+from api.tools.token_counter import DEFAULT_ENCODING, count_tokens as count_text_tokens, encoding_name_for_model
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -25,7 +39,25 @@ logger = logging.getLogger(__name__)
 # Maximum token limit for OpenAI embedding models
 MAX_EMBEDDING_TOKENS = 819200
 
-def count_tokens(text: str, is_ollama_embedder: bool = None) -> int:
+def get_embedding_encoding_name(is_ollama_embedder: bool = None) -> str:
+    """
+    Name of the tiktoken encoding used to size texts for the configured embedder.
+
+    Args:
+        is_ollama_embedder (bool, optional): Whether using Ollama embeddings.
+                                           If None, will be determined from configuration.
+
+    Returns:
+        str: The tiktoken encoding name.
+    """
+    if is_ollama_embedder is None:
+        is_ollama_embedder = configured_ollama_embedder()
+
+    if is_ollama_embedder:
+        return DEFAULT_ENCODING
+    return encoding_name_for_model("text-embedding-3-small")
+
+def count_tokens(text: str, is_ollama_embedder: bool = None, estimate: bool = False) -> int:
     """
     Count the number of tokens in a text string using tiktoken.
 
@@ -33,27 +65,13 @@ def count_tokens(text: str, is_ollama_embedder: bool = None) -> int:
         text (str): The text to count tokens for.
         is_ollama_embedder (bool, optional): Whether using Ollama embeddings.
                                            If None, will be determined from configuration.
+        estimate (bool): Approximate the count from the text length instead of tokenizing,
+                         for size checks that do not need an exact count.
 
     Returns:
         int: The number of tokens in the text.
     """
-    try:
-        # Determine if using Ollama embedder if not specified
-        if is_ollama_embedder is None:
-            from api.config import is_ollama_embedder as check_ollama
-            is_ollama_embedder = check_ollama()
-
-        if is_ollama_embedder:
-            encoding = tiktoken.get_encoding("cl100k_base")
-        else:
-            encoding = tiktoken.encoding_for_model("text-embedding-3-small")
-
-        return len(encoding.encode(text))
-    except Exception as e:
-        # Fallback to a simple approximation if tiktoken fails
-        logger.warning(f"Error counting tokens with tiktoken: {e}")
-        # Rough approximation: 4 characters per token
-        return len(text) // 4
+    return count_text_tokens(text, get_embedding_encoding_name(is_ollama_embedder), estimate=estimate)
 
 def download_repo(repo_url: str, local_path: str, type: str = "github", access_token: str = None) -> str:
     """
@@ -129,33 +147,49 @@ def download_repo(repo_url: str, local_path: str, type: str = "github", access_t
 # Alias for backward compatibility
 download_github_repo = download_repo
 
-def read_all_documents(path: str, is_ollama_embedder: bool = None, excluded_dirs: List[str] = None, excluded_files: List[str] = None,
-                      included_dirs: List[str] = None, included_files: List[str] = None):
+def update_repo(local_path: str) -> str:
     """
-    Recursively reads all documents in a directory and its subdirectories.
+    Fast-forward a shallow clone created by ``download_repo`` to the remote head.
+
+    Args:
+        local_path (str): The local directory of the cloned repository.
+
+    Returns:
+        str: The output message from the `git` command.
+    """
+    try:
+        logger.info(f"Updating repository at {local_path}")
+        subprocess.run(
+            ["git", "-C", local_path, "fetch", "--depth=1", "origin"],
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        result = subprocess.run(
+            ["git", "-C", local_path, "reset", "--hard", "FETCH_HEAD"],
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        logger.info("Repository updated successfully")
+        return result.stdout.decode("utf-8")
+    except subprocess.CalledProcessError as e:
+        raise ValueError(f"Error during update: {e.stderr.decode('utf-8')}")
+
+def resolve_file_filters(excluded_dirs: List[str] = None, excluded_files: List[str] = None,
+                         included_dirs: List[str] = None, included_files: List[str] = None) -> dict:
+    """
+    Combine request-level file filters with the configured defaults.
 
     Args:
-        path (str): The root directory path.
-        is_ollama_embedder (bool, optional): Whether using Ollama embeddings for token counting.
-                                           If None, will be determined from configuration.
         excluded_dirs (List[str], optional): List of directories to exclude from processing.
-            Overrides the default configuration if provided.
         excluded_files (List[str], optional): List of file patterns to exclude from processing.
-            Overrides the default configuration if provided.
         included_dirs (List[str], optional): List of directories to include exclusively.
-            When provided, only files in these directories will be processed.
         included_files (List[str], optional): List of file patterns to include exclusively.
-            When provided, only files matching these patterns will be processed.
 
     Returns:
-        list: A list of Document objects with metadata.
+        dict: The excluded_dirs, excluded_files, included_dirs and included_files to walk with.
     """
-    documents = []
-    # File extensions to look for, prioritizing code files
-    code_extensions = [".py", ".js", ".ts", ".java", ".cpp", ".c", ".h", ".hpp", ".go", ".rs",
-                       ".jsx", ".tsx", ".html", ".css", ".php", ".swift", ".cs"]
-    doc_extensions = [".md", ".txt", ".rst", ".json", ".yaml", ".yml", ".json"]
-
     # Determine filtering mode: inclusion or exclusion
     use_inclusion_mode = (included_dirs is not None and len(included_dirs) > 0) or (included_files is not None and len(included_files) > 0)
 
@@ -203,165 +237,226 @@ def read_all_documents(path: str, is_ollama_embedder: bool = None, excluded_dirs
         logger.info(f"Excluded directories: {excluded_dirs}")
         logger.info(f"Excluded files: {excluded_files}")
 
-    logger.info(f"Reading documents from {path}")
+    return {
+        "excluded_dirs": excluded_dirs,
+        "excluded_files": excluded_files,
+        "included_dirs": included_dirs,
+        "included_files": included_files,
+    }
+
+def create_ingestor(is_ollama_embedder: bool = None) -> ConcurrentIngestor:
+    """Ingestor with the ``ingest`` settings of repo.json and the embedder's tokenizer."""
+    ingest_config = IngestConfig.from_dict(configs.get("ingest"))
+    ingest_config.encoding_name = get_embedding_encoding_name(is_ollama_embedder)
+    gate = FileGateConfig.from_dict(configs.get("ingest", {}).get("file_gate"))
+    return ConcurrentIngestor(ingest_config, gate=gate)
+
+def read_documents_from_files(repo_files: Iterable[RepoFile], is_ollama_embedder: bool = None,
+                              report: IngestReport = None, ingestor: ConcurrentIngestor = None) -> List[Document]:
+    """
+    Read the given repository files into Document objects.
 
-    def should_process_file(file_path: str, use_inclusion: bool, included_dirs: List[str], included_files: List[str],
-                           excluded_dirs: List[str], excluded_files: List[str]) -> bool:
-        """
-        Determine if a file should be processed based on inclusion/exclusion rules.
+    Files that are too large, binary or minified are skipped from their size and first
+    bytes (``ingest.file_gate`` in repo.json) without being read.
 
-        Args:
-            file_path (str): The file path to check
-            use_inclusion (bool): Whether to use inclusion mode
-            included_dirs (List[str]): List of directories to include
-            included_files (List[str]): List of files to include
-            excluded_dirs (List[str]): List of directories to exclude
-            excluded_files (List[str]): List of files to exclude
+    Args:
+        repo_files (Iterable[RepoFile]): Files to read, typically from ``iter_repository_files``.
+        is_ollama_embedder (bool, optional): Whether using Ollama embeddings for token counting.
+                                           If None, will be determined from configuration.
+        report (IngestReport, optional): Collects the skipped files and their reasons.
+        ingestor (ConcurrentIngestor, optional): Ingestor to read with, e.g. one whose pools are
+                                                 shared by several batches; a new one by default.
 
-        Returns:
-            bool: True if the file should be processed, False otherwise
-        """
-        file_path_parts = os.path.normpath(file_path).split(os.sep)
-        file_name = os.path.basename(file_path)
-
-        if use_inclusion:
-            # Inclusion mode: file must be in included directories or match included files
-            is_included = False
-
-            # Check if file is in an included directory
-            if included_dirs:
-                for included in included_dirs:
-                    clean_included = included.strip("./").rstrip("/")
-                    if clean_included in file_path_parts:
-                        is_included = True
-                        break
-
-            # Check if file matches included file patterns
-            if not is_included and included_files:
-                for included_file in included_files:
-                    if file_name == included_file or file_name.endswith(included_file):
-                        is_included = True
-                        break
-
-            # If no inclusion rules are specified for a category, allow all files from that category
-            if not included_dirs and not included_files:
-                is_included = True
-            elif not included_dirs and included_files:
-                # Only file patterns specified, allow all directories
-                pass  # is_included is already set based on file patterns
-            elif included_dirs and not included_files:
-                # Only directory patterns specified, allow all files in included directories
-                pass  # is_included is already set based on directory patterns
-
-            return is_included
+    Returns:
+        List[Document]: One document per readable file within the token limits, in input order.
+    """
+    documents = []
+
+    # Read and count tokens concurrently; records come back in walk order
+    if ingestor is None:
+        ingestor = create_ingestor(is_ollama_embedder)
+    records, _ = ingestor.run(repo_files)
+
+    for record in records:
+        repo_file = record.repo_file
+        relative_path = repo_file.relative_path
+        if record.skip_reason is not None:
+            logger.info(f"Skipping {record.skip_reason} file {relative_path}: {record.skip_detail}")
+            if report is not None:
+                report.add_skipped(relative_path, record.skip_reason, record.skip_detail)
+            continue
+        if record.error is not None:
+            logger.error(f"Error reading {repo_file.path}: {record.error}")
+            if report is not None:
+                report.add_skipped(relative_path, SKIP_READ_ERROR, record.error)
+            continue
+
+        # Code files get a larger token allowance than documentation files
+        token_count = record.token_count
+        token_limit = MAX_EMBEDDING_TOKENS * 10 if repo_file.is_code else MAX_EMBEDDING_TOKENS
+        if token_count > token_limit:
+            logger.warning(f"Skipping large file {relative_path}: Token count ({token_count}) exceeds limit")
+            if report is not None:
+                report.add_skipped(relative_path, SKIP_TOKEN_LIMIT, f"{token_count} tokens > {token_limit}")
+            continue
+
+        if repo_file.is_code:
+            # Determine if this is an implementation file
+            is_implementation = (
+                not relative_path.startswith("test_")
+                and not relative_path.startswith("app_")
+                and "test" not in relative_path.lower()
+            )
         else:
-            # Exclusion mode: file must not be in excluded directories or match excluded files
-            is_excluded = False
-
-            # Check if file is in an excluded directory
-            for excluded in excluded_dirs:
-                clean_excluded = excluded.strip("./").rstrip("/")
-                if clean_excluded in file_path_parts:
-                    is_excluded = True
-                    break
-
-            # Check if file matches excluded file patterns
-            if not is_excluded:
-                for excluded_file in excluded_files:
-                    if file_name == excluded_file:
-                        is_excluded = True
-                        break
-
-            return not is_excluded
-
-    # Process code files first
-    for ext in code_extensions:
-        files = glob.glob(f"{path}/**/*{ext}", recursive=True)
-        for file_path in files:
-            # Check if file should be processed based on inclusion/exclusion rules
-            if not should_process_file(file_path, use_inclusion_mode, included_dirs, included_files, excluded_dirs, excluded_files):
-                continue
+            is_implementation = False
+
+        doc = Document(
+            text=record.content,
+            meta_data={
+                "file_path": relative_path,
+                "type": repo_file.extension[1:],
+                "is_code": repo_file.is_code,
+                "is_implementation": is_implementation,
+                "title": relative_path,
+                "token_count": token_count,
+            },
+        )
+        documents.append(doc)
 
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                    relative_path = os.path.relpath(file_path, path)
-
-                    # Determine if this is an implementation file
-                    is_implementation = (
-                        not relative_path.startswith("test_")
-                        and not relative_path.startswith("app_")
-                        and "test" not in relative_path.lower()
-                    )
-
-                    # Check token count
-                    token_count = count_tokens(content, is_ollama_embedder)
-                    if token_count > MAX_EMBEDDING_TOKENS * 10:
-                        logger.warning(f"Skipping large file {relative_path}: Token count ({token_count}) exceeds limit")
-                        continue
-
-                    doc = Document(
-                        text=content,
-                        meta_data={
-                            "file_path": relative_path,
-                            "type": ext[1:],
-                            "is_code": True,
-                            "is_implementation": is_implementation,
-                            "title": relative_path,
-                            "token_count": token_count,
-                        },
-                    )
-                    documents.append(doc)
-            except Exception as e:
-                logger.error(f"Error reading {file_path}: {e}")
-
-    # Then process documentation files
-    for ext in doc_extensions:
-        files = glob.glob(f"{path}/**/*{ext}", recursive=True)
-        for file_path in files:
-            # Check if file should be processed based on inclusion/exclusion rules
-            if not should_process_file(file_path, use_inclusion_mode, included_dirs, included_files, excluded_dirs, excluded_files):
-                continue
+    if report is not None:
+        report.add_indexed(len(documents))
+    return documents
 
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                    relative_path = os.path.relpath(file_path, path)
-
-                    # Check token count
-                    token_count = count_tokens(content, is_ollama_embedder)
-                    if token_count > MAX_EMBEDDING_TOKENS:
-                        logger.warning(f"Skipping large file {relative_path}: Token count ({token_count}) exceeds limit")
-                        continue
-
-                    doc = Document(
-                        text=content,
-                        meta_data={
-                            "file_path": relative_path,
-                            "type": ext[1:],
-                            "is_code": False,
-                            "is_implementation": False,
-                            "title": relative_path,
-                            "token_count": token_count,
-                        },
-                    )
-                    documents.append(doc)
-            except Exception as e:
-                logger.error(f"Error reading {file_path}: {e}")
+def read_all_documents(path: str, is_ollama_embedder: bool = None, excluded_dirs: List[str] = None, excluded_files: List[str] = None,
+                      included_dirs: List[str] = None, included_files: List[str] = None):
+    """
+    Recursively reads all documents in a directory and its subdirectories.
+
+    Args:
+        path (str): The root directory path.
+        is_ollama_embedder (bool, optional): Whether using Ollama embeddings for token counting.
+                                           If None, will be determined from configuration.
+        excluded_dirs (List[str], optional): List of directories to exclude from processing.
+            Overrides the default configuration if provided.
+        excluded_files (List[str], optional): List of file patterns to exclude from processing.
+            Overrides the default configuration if provided.
+        included_dirs (List[str], optional): List of directories to include exclusively.
+            When provided, only files in these directories will be processed.
+        included_files (List[str], optional): List of file patterns to include exclusively.
+            When provided, only files matching these patterns will be processed.
+
+    Returns:
+        list: A list of Document objects with metadata.
+    """
+    file_filters = resolve_file_filters(excluded_dirs, excluded_files, included_dirs, included_files)
+
+    logger.info(f"Reading documents from {path}")
+
+    # Walk the tree once, pruning excluded directories before descending into them
+    repo_files = iter_repository_files(path, **file_filters)
+    documents = read_documents_from_files(repo_files, is_ollama_embedder)
 
     logger.info(f"Found {len(documents)} documents")
     return documents
 
-def prepare_data_pipeline(is_ollama_embedder: bool = None):
+class CachedEmbeddingProcessor(DataComponent):
     """
-    Creates and returns the data transformation pipeline.
+    Reuses embeddings of identical chunks from the shared embedding cache.
+
+    Only chunks whose (model, dimensions, text) is not cached are passed to the wrapped
+    embedder transformer; their embeddings are added to the cache afterwards.
+    """
+    def __init__(self, embedder_transformer: DataComponent, cache: EmbeddingCache, signature: dict) -> None:
+        super().__init__()
+        self.embedder_transformer = embedder_transformer
+        self.cache = cache
+        self.model = f"{signature.get('client_class')}/{signature.get('model')}"
+        self.dimensions = signature.get("dimensions")
+
+    def _key(self, doc: Document) -> bytes:
+        return embedding_cache_key(self.model, self.dimensions, doc.text or "")
+
+    def __call__(self, documents: List[Document]) -> List[Document]:
+        cached = self.cache.get_many([self._key(doc) for doc in documents])
+        missing = [doc for doc, vector in zip(documents, cached) if vector is None]
+        logger.info(f"Embedding cache: {len(documents) - len(missing)}/{len(documents)} chunks cached, "
+                    f"embedding {len(missing)}")
+
+        embedded = self.embedder_transformer(missing) if missing else []
+        self.cache.put_many([self._key(doc) for doc in embedded], [doc.vector for doc in embedded])
+        # Transformers may copy documents and drop failures, so match results back by id
+        embedded_by_id = {doc.id: doc for doc in embedded}
+
+        output = []
+        for doc, vector in zip(documents, cached):
+            if vector is not None:
+                doc.vector = vector
+                output.append(doc)
+            elif doc.id in embedded_by_id:
+                output.append(embedded_by_id[doc.id])
+        return output
+
+class CodeAwareSplitter(DataComponent):
+    """
+    Splits code files at class and function boundaries and everything else by words.
+
+    Code chunks are cut between definitions found by the configured code parser
+    (``code_parser.engine`` in repo.json) and carry no overlap (``text_splitter.code`` in
+    embedder.json); documents in unsupported languages or without any definition fall
+    back to the word splitter.
+    """
+    def __init__(self, text_splitter: TextSplitter, config: CodeSplitterConfig) -> None:
+        super().__init__()
+        self.text_splitter = text_splitter
+        self.config = config
+        self.parser = create_code_parser(configs.get("code_parser", {}).get("engine", "regex"))
+
+    def _split_code(self, doc: Document) -> Optional[List[Document]]:
+        meta = doc.meta_data or {}
+        if not self.config.enabled or not meta.get("is_code"):
+            return None
+        try:
+            texts = split_code(doc.text or "", meta.get("file_path", ""), self.config.chunk_size,
+                               self.config.chunk_overlap, parser=self.parser)
+        except Exception as e:
+            logger.warning(f"Code-aware splitting failed for {meta.get('file_path')}, splitting by words: {e}")
+            return None
+        if not texts:
+            return None
+        return [
+            Document(text=text, meta_data=deepcopy(doc.meta_data), parent_doc_id=f"{doc.id}", order=i, vector=[])
+            for i, text in enumerate(texts)
+        ]
+
+    def __call__(self, documents: List[Document]) -> List[Document]:
+        chunks, word_split = [], []
+        code_chunks = 0
+        for doc in documents:
+            split = self._split_code(doc)
+            if split is None:
+                word_split.append(doc)
+            else:
+                # Keep the input order: flush pending documents through the word splitter first
+                if word_split:
+                    chunks.extend(self.text_splitter(word_split))
+                    word_split = []
+                chunks.extend(split)
+                code_chunks += len(split)
+        if word_split:
+            chunks.extend(self.text_splitter(word_split))
+        logger.info(f"Split {len(documents)} documents into {len(chunks)} chunks, {code_chunks} at code boundaries")
+        return chunks
+
+def prepare_pipeline_stages(is_ollama_embedder: bool = None):
+    """
+    Creates the splitter and embedder stages of the data transformation pipeline.
 
     Args:
         is_ollama_embedder (bool, optional): Whether to use Ollama for embedding.
                                            If None, will be determined from configuration.
 
     Returns:
-        adal.Sequential: The data transformation pipeline
+        tuple: (CodeAwareSplitter, embedder transformer)
     """
     from api.config import get_embedder_config, is_ollama_embedder as check_ollama
 
@@ -369,14 +464,19 @@ def prepare_data_pipeline(is_ollama_embedder: bool = None):
     if is_ollama_embedder is None:
         is_ollama_embedder = check_ollama()
 
-    splitter = TextSplitter(**configs["text_splitter"])
+    splitter_config = dict(configs["text_splitter"])
+    code_config = CodeSplitterConfig.from_dict(splitter_config.pop("code", None))
+    splitter = CodeAwareSplitter(TextSplitter(**splitter_config), code_config)
     embedder_config = get_embedder_config()
 
     embedder = get_embedder()
 
     if is_ollama_embedder:
-        # Use Ollama document processor for single-document processing
-        embedder_transformer = OllamaDocumentProcessor(embedder=embedder)
+        # Use Ollama document processor for batched, concurrent /api/embed requests; the batch
+        # settings live in the active embedder section, next to the Ollama model
+        embedder_transformer = OllamaDocumentProcessor(
+            embedder=embedder, batch_config=OllamaBatchConfig.from_dict(embedder_config)
+        )
     else:
         # Use batch processing for other embedders
         batch_size = embedder_config.get("batch_size", 500)
@@ -384,34 +484,166 @@ def prepare_data_pipeline(is_ollama_embedder: bool = None):
             embedder=embedder, batch_size=batch_size
         )
 
+    embedding_cache = get_embedding_cache(configs.get("embedding_cache"), get_adalflow_default_root_path())
+    if embedding_cache is not None:
+        embedder_transformer = CachedEmbeddingProcessor(
+            embedder_transformer, embedding_cache, get_embedder_signature()
+        )
+    return splitter, embedder_transformer
+
+def prepare_data_pipeline(is_ollama_embedder: bool = None):
+    """
+    Creates and returns the data transformation pipeline.
+
+    Args:
+        is_ollama_embedder (bool, optional): Whether to use Ollama for embedding.
+                                           If None, will be determined from configuration.
+
+    Returns:
+        adal.Sequential: The data transformation pipeline
+    """
+    splitter, embedder_transformer = prepare_pipeline_stages(is_ollama_embedder)
     data_transformer = adal.Sequential(
         splitter, embedder_transformer
     )  # sequential will chain together splitter and embedder
     return data_transformer
 
+def get_embedder_signature() -> dict:
+    """
+    Identify the embedding model that produced a database.
+
+    Returns:
+        dict: The embedder client class, model and dimensions from the configuration.
+    """
+    embedder_config = configs.get("embedder", {})
+    model_kwargs = embedder_config.get("model_kwargs", {})
+    return {
+        "client_class": embedder_config.get("client_class"),
+        "model": model_kwargs.get("model"),
+        "dimensions": model_kwargs.get("dimensions"),
+    }
+
+def get_vector_store_dtype() -> str:
+    """Precision vectors are stored in (``vector_store.dtype`` in embedder.json): float32, float16 or int8."""
+    return configs.get("vector_store", {}).get("dtype", "float32")
+
+
+def get_build_lock_timeout() -> Optional[float]:
+    """
+    Seconds a build waits for another build of the same store (``ingest.build_lock_timeout``
+    in repo.json) before failing; a negative value waits without limit.
+    """
+    timeout = configs.get("ingest", {}).get("build_lock_timeout", 600)
+    return None if timeout is None or timeout < 0 else timeout
+
 def transform_documents_and_save_to_db(
     documents: List[Document], db_path: str, is_ollama_embedder: bool = None
-) -> LocalDB:
+) -> VectorStore:
     """
-    Transforms a list of documents and saves them to a local database.
+    Transforms a list of documents and saves them to a vector store.
 
     Args:
         documents (list): A list of `Document` objects.
-        db_path (str): The path to the local database file.
+        db_path (str): The path to the vector store directory.
         is_ollama_embedder (bool, optional): Whether to use Ollama for embedding.
                                            If None, will be determined from configuration.
     """
     # Get the data transformer
     data_transformer = prepare_data_pipeline(is_ollama_embedder)
 
-    # Save the documents to a local database
-    db = LocalDB()
-    db.register_transformer(transformer=data_transformer, key="split_and_embed")
-    db.load(documents)
-    db.transform(key="split_and_embed")
+    # Split and embed, then save the chunks to the vector store
+    chunks = data_transformer(documents) if documents else []
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    db.save_state(filepath=db_path)
-    return db
+    store = VectorStore.write(db_path, chunks, dtype=get_vector_store_dtype(), embedder=get_embedder_signature())
+    build_store_indexes(store)
+    return store
+
+def build_store_indexes(store: VectorStore) -> None:
+    """
+    Build the metadata index (for retrieval filters) and the BM25 index over a freshly written store.
+
+    Retrieval works without either of them, so failures here are logged rather than raised.
+    """
+    try:
+        ensure_metadata_index(store)
+    except Exception as e:
+        logger.warning(f"Could not build metadata index for {store.path}: {e}")
+    if not configs.get("retriever", {}).get("hybrid", {}).get("enabled", True):
+        return
+    try:
+        ensure_lexical_index(store)
+    except Exception as e:
+        logger.warning(f"Could not build lexical index for {store.path}: {e}")
+
+def stream_files_to_store(repo_files: Iterable[RepoFile], writer: VectorStoreWriter,
+                          is_ollama_embedder: bool = None,
+                          on_batch: Callable[[List[RepoFile]], None] = None,
+                          report: IngestReport = None) -> PipelineStats:
+    """
+    Read, split, embed and append repository files to a vector store in bounded batches.
+
+    Each stage runs on its own thread with small bounded queues in between, so reading
+    the next files overlaps embedding the current ones while memory use stays proportional
+    to the batch size (``ingest.stream_batch_files``) rather than to the repository.
+
+    Args:
+        repo_files (Iterable[RepoFile]): Files to index, typically from ``iter_repository_files``.
+        writer (VectorStoreWriter): Store the embedded chunks are appended to.
+        is_ollama_embedder (bool, optional): Whether to use Ollama for embedding.
+                                           If None, will be determined from configuration.
+        on_batch (Callable, optional): Called with each batch of files once its chunks are in the store.
+        report (IngestReport, optional): Collects the skipped files and their reasons.
+    """
+    ingest_config = IngestConfig.from_dict(configs.get("ingest"))
+    splitter, embedder_transformer = prepare_pipeline_stages(is_ollama_embedder)
+    # One ingestor for the whole run, so its reader threads and tokenizer processes
+    # are started once instead of once per batch
+    ingestor = create_ingestor(is_ollama_embedder)
+
+    # Items carry their file batch along, so the sink knows which files are done
+    def read(file_batch: List[RepoFile]):
+        return file_batch, read_documents_from_files(file_batch, is_ollama_embedder=is_ollama_embedder,
+                                                     report=report, ingestor=ingestor)
+
+    def split(item):
+        file_batch, documents = item
+        return file_batch, splitter(documents) if documents else []
+
+    def embed(item):
+        file_batch, chunks = item
+        return file_batch, embedder_transformer(chunks) if chunks else []
+
+    def store(item):
+        file_batch, chunks = item
+        writer.add(chunks)
+        if on_batch is not None:
+            on_batch(file_batch)
+
+    with ingestor:
+        return run_pipeline(
+            batched(repo_files, max(1, ingest_config.stream_batch_files)),
+            [read, split, embed],
+            store,
+            queue_size=ingest_config.stream_queue_size,
+            stage_names=["read", "split", "embed"],
+        )
+
+def migrate_legacy_db(pkl_path: str, store_path: str) -> VectorStore:
+    """
+    Convert a pickled LocalDB from earlier versions into a vector store.
+
+    The pickle is left in place, so older versions can still read it.
+
+    Args:
+        pkl_path (str): Path of the pickled LocalDB.
+        store_path (str): Path of the vector store directory to create.
+    """
+    logger.info(f"Migrating legacy database {pkl_path} to {store_path}")
+    db = LocalDB.load_state(pkl_path)
+    chunks = db.get_transformed_data(key="split_and_embed") or []
+    store = VectorStore.write(store_path, chunks, dtype=get_vector_store_dtype(), embedder=get_embedder_signature())
+    build_store_indexes(store)
+    return store
 
 def get_github_file_content(repo_url: str, file_path: str, access_token: str = None) -> str:
     """
@@ -674,7 +906,7 @@ def get_file_content(repo_url: str, file_path: str, type: str = "github", access
 
 class DatabaseManager:
     """
-    Manages the creation, loading, transformation, and persistence of LocalDB instances.
+    Manages the creation, loading, transformation, and persistence of repository vector stores.
     """
 
     def __init__(self):
@@ -684,7 +916,8 @@ class DatabaseManager:
 
     def prepare_database(self, repo_url_or_path: str, type: str = "github", access_token: str = None, is_ollama_embedder: bool = None,
                        excluded_dirs: List[str] = None, excluded_files: List[str] = None,
-                       included_dirs: List[str] = None, included_files: List[str] = None) -> List[Document]:
+                       included_dirs: List[str] = None, included_files: List[str] = None,
+                       refresh: bool = None) -> List[Document]:
         """
         Create a new database from the repository.
 
@@ -697,14 +930,18 @@ class DatabaseManager:
             excluded_files (List[str], optional): List of file patterns to exclude from processing
             included_dirs (List[str], optional): List of directories to include exclusively
             included_files (List[str], optional): List of file patterns to include exclusively
+            refresh (bool, optional): Update an existing index with the files that changed since it was built.
+                                    If None, uses ``repository.refresh_index`` from repo.json.
 
         Returns:
             List[Document]: List of Document objects
         """
+        if refresh is None:
+            refresh = configs.get("repository", {}).get("refresh_index", False)
         self.reset_database()
-        self._create_repo(repo_url_or_path, type, access_token)
+        self._create_repo(repo_url_or_path, type, access_token, update=refresh)
         return self.prepare_db_index(is_ollama_embedder=is_ollama_embedder, excluded_dirs=excluded_dirs, excluded_files=excluded_files,
-                                   included_dirs=included_dirs, included_files=included_files)
+                                   included_dirs=included_dirs, included_files=included_files, refresh=refresh)
 
     def reset_database(self):
         """
@@ -729,16 +966,54 @@ class DatabaseManager:
             repo_name = url_parts[-1].replace(".git", "")
         return repo_name
 
-    def _create_repo(self, repo_url_or_path: str, repo_type: str = "github", access_token: str = None) -> None:
+    def _is_remote(self, repo_url_or_path: str) -> bool:
+        return repo_url_or_path.startswith("https://") or repo_url_or_path.startswith("http://")
+
+    def _resolve_repo_paths(self, repo_url_or_path: str, repo_type: str = "github") -> dict:
+        """
+        Compute the clone, database and manifest paths of a repository without touching them.
+
+        Args:
+            repo_url_or_path (str): The URL or local path of the repository
+            repo_type (str): Type of repository (github, gitlab, bitbucket)
+
+        Returns:
+            dict: save_repo_dir, save_db_file, save_store_dir and save_manifest_file
+        """
+        root_path = get_adalflow_default_root_path()
+        if self._is_remote(repo_url_or_path):
+            repo_name = self._extract_repo_name_from_url(repo_url_or_path, repo_type)
+            save_repo_dir = os.path.join(root_path, "repos", repo_name)
+        else:  # local path
+            repo_name = os.path.basename(repo_url_or_path)
+            save_repo_dir = repo_url_or_path
+
+        save_db_file = os.path.join(root_path, "databases", f"{repo_name}.pkl")
+        return {
+            "save_repo_dir": save_repo_dir,
+            "save_db_file": save_db_file,
+            "save_store_dir": store_path_for(save_db_file),
+            "save_manifest_file": manifest_path_for(save_db_file),
+        }
+
+    def get_store_dir(self, repo_url_or_path: str, repo_type: str = "github") -> str:
+        """Vector store directory of a repository, whether or not it has been built yet."""
+        return self._resolve_repo_paths(repo_url_or_path, repo_type)["save_store_dir"]
+
+    def _create_repo(self, repo_url_or_path: str, repo_type: str = "github", access_token: str = None,
+                     update: bool = False) -> None:
         """
         Download and prepare all paths.
         Paths:
         ~/.adalflow/repos/{owner}_{repo_name} (for url, local path will be the same)
-        ~/.adalflow/databases/{owner}_{repo_name}.pkl
+        ~/.adalflow/databases/{owner}_{repo_name}.store/
+        ~/.adalflow/databases/{owner}_{repo_name}.manifest.json
+        ~/.adalflow/databases/{owner}_{repo_name}.pkl (legacy, migrated on first load)
 
         Args:
             repo_url_or_path (str): The URL or local path of the repository
             access_token (str, optional): Access token for private repositories
+            update (bool, optional): Pull the latest commit into an existing clone
         """
         logger.info(f"Preparing repo storage for {repo_url_or_path}...")
 
@@ -746,32 +1021,26 @@ class DatabaseManager:
             root_path = get_adalflow_default_root_path()
 
             os.makedirs(root_path, exist_ok=True)
+            repo_paths = self._resolve_repo_paths(repo_url_or_path, repo_type)
+            save_repo_dir = repo_paths["save_repo_dir"]
             # url
-            if repo_url_or_path.startswith("https://") or repo_url_or_path.startswith("http://"):
-                # Extract the repository name from the URL
-                repo_name = self._extract_repo_name_from_url(repo_url_or_path, repo_type)
-                logger.info(f"Extracted repo name: {repo_name}")
-
-                save_repo_dir = os.path.join(root_path, "repos", repo_name)
-
+            if self._is_remote(repo_url_or_path):
                 # Check if the repository directory already exists and is not empty
                 if not (os.path.exists(save_repo_dir) and os.listdir(save_repo_dir)):
                     # Only download if the repository doesn't exist or is empty
                     download_repo(repo_url_or_path, save_repo_dir, repo_type, access_token)
+                elif update:
+                    try:
+                        update_repo(save_repo_dir)
+                    except ValueError as e:
+                        logger.warning(f"Could not update repository, using existing checkout: {e}")
                 else:
                     logger.info(f"Repository already exists at {save_repo_dir}. Using existing repository.")
-            else:  # local path
-                repo_name = os.path.basename(repo_url_or_path)
-                save_repo_dir = repo_url_or_path
 
-            save_db_file = os.path.join(root_path, "databases", f"{repo_name}.pkl")
             os.makedirs(save_repo_dir, exist_ok=True)
-            os.makedirs(os.path.dirname(save_db_file), exist_ok=True)
+            os.makedirs(os.path.dirname(repo_paths["save_db_file"]), exist_ok=True)
 
-            self.repo_paths = {
-                "save_repo_dir": save_repo_dir,
-                "save_db_file": save_db_file,
-            }
+            self.repo_paths = repo_paths
             self.repo_url_or_path = repo_url_or_path
             logger.info(f"Repo paths: {self.repo_paths}")
 
@@ -780,7 +1049,7 @@ class DatabaseManager:
             raise
 
     def prepare_db_index(self, is_ollama_embedder: bool = None, excluded_dirs: List[str] = None, excluded_files: List[str] = None,
-                        included_dirs: List[str] = None, included_files: List[str] = None) -> List[Document]:
+                        included_dirs: List[str] = None, included_files: List[str] = None, refresh: bool = False) -> List[Document]:
         """
         Prepare the indexed database for the repository.
 
@@ -791,40 +1060,177 @@ class DatabaseManager:
             excluded_files (List[str], optional): List of file patterns to exclude from processing
             included_dirs (List[str], optional): List of directories to include exclusively
             included_files (List[str], optional): List of file patterns to include exclusively
+            refresh (bool, optional): Re-embed only the files that changed since the index was built
 
         Returns:
             List[Document]: List of Document objects
         """
+        file_filters = resolve_file_filters(excluded_dirs, excluded_files, included_dirs, included_files)
+
         # check the database
-        if self.repo_paths and os.path.exists(self.repo_paths["save_db_file"]):
-            logger.info("Loading existing database...")
-            try:
-                self.db = LocalDB.load_state(self.repo_paths["save_db_file"])
-                documents = self.db.get_transformed_data(key="split_and_embed")
-                if documents:
-                    logger.info(f"Loaded {len(documents)} documents from existing database")
-                    return documents
-            except Exception as e:
-                logger.error(f"Error loading existing database: {e}")
-                # Continue to create a new database
+        store_dir = self.repo_paths["save_store_dir"] if self.repo_paths else None
+        if store_dir and (VectorStore.exists(store_dir) or os.path.exists(self.repo_paths["save_db_file"])):
+            manifest = IndexManifest.load(self.repo_paths["save_manifest_file"])
+            if manifest is not None and manifest.embedder != get_embedder_signature():
+                logger.info(f"Embedder changed since the database was built ({manifest.embedder}), rebuilding")
+            elif refresh and manifest is not None:
+                try:
+                    return self._refresh_db_index(manifest, file_filters, is_ollama_embedder)
+                except Exception as e:
+                    logger.error(f"Error refreshing existing database: {e}")
+                    # Continue to create a new database
+            else:
+                logger.info("Loading existing database...")
+                try:
+                    self.db = self._open_store()
+                    documents = self.db.documents()
+                    if documents:
+                        logger.info(f"Loaded {len(documents)} documents from existing database")
+                        return documents
+                except Exception as e:
+                    logger.error(f"Error loading existing database: {e}")
+                    # Continue to create a new database
 
         # prepare the database
         logger.info("Creating new database...")
-        documents = read_all_documents(
-            self.repo_paths["save_repo_dir"],
-            is_ollama_embedder=is_ollama_embedder,
-            excluded_dirs=excluded_dirs,
-            excluded_files=excluded_files,
-            included_dirs=included_dirs,
-            included_files=included_files
+        repo_dir = self.repo_paths["save_repo_dir"]
+        repo_files = list(iter_repository_files(repo_dir, **file_filters))
+        fingerprints = compute_fingerprints(repo_dir, repo_files)
+        writer, pending_files = self._start_store_writer(store_dir, repo_files, fingerprints)
+
+        def checkpoint(file_batch: List[RepoFile]) -> None:
+            paths = (f.relative_path.replace(os.sep, "/") for f in file_batch)
+            writer.checkpoint({path: fingerprints.get(path, "") for path in paths})
+
+        report = IngestReport()
+        try:
+            stream_files_to_store(pending_files, writer, is_ollama_embedder=is_ollama_embedder, on_batch=checkpoint,
+                                  report=report)
+        except Exception:
+            if writer.resumable:
+                # Keep the checkpoint so the next prepare_database call resumes from it
+                writer.close()
+            else:
+                # Nothing resumes a non-resumable build; drop its temporary directory
+                writer.abort()
+            raise
+        self.db = writer.commit()
+        build_store_indexes(self.db)
+        self._save_ingest_report(report)
+        logger.info(f"Total files: {len(repo_files)}")
+        logger.info(f"Total transformed documents: {len(self.db)}")
+        IndexManifest.from_records(get_embedder_signature(), fingerprints, self.db.iter_metadata()).save(
+            self.repo_paths["save_manifest_file"]
         )
-        self.db = transform_documents_and_save_to_db(
-            documents, self.repo_paths["save_db_file"], is_ollama_embedder=is_ollama_embedder
+        return self.db.documents()
+
+    def _start_store_writer(self, store_dir: str, repo_files: List[RepoFile], fingerprints: dict):
+        """
+        Resume an interrupted build of the store, or start a new one.
+
+        A checkpoint is only reused when every file it completed still has the same
+        fingerprint; otherwise its chunks could be stale and the build starts over.
+        The store's build lock is held from before the checkpoint is read until the
+        returned writer commits or closes, so concurrent builds of the same repository
+        (another worker process, or another filter set) wait for each other.
+
+        Returns:
+            tuple: (VectorStoreWriter, files that still need to be indexed)
+        """
+        resumable = configs.get("ingest", {}).get("resumable", True)
+        embedder = get_embedder_signature()
+        dtype = get_vector_store_dtype()
+        # Held here while the writers below take it over; released on commit or close
+        lock = StoreBuildLock(store_dir).acquire(get_build_lock_timeout())
+        try:
+            if resumable:
+                resumed = VectorStoreWriter.resume(store_dir, dtype=dtype, embedder=embedder, lock=lock)
+                if resumed is not None:
+                    writer, completed = resumed
+                    if all(fingerprints.get(path) == fingerprint for path, fingerprint in completed.items()):
+                        pending = [f for f in repo_files if f.relative_path.replace(os.sep, "/") not in completed]
+                        logger.info(f"Resuming indexing: {len(completed)} files already embedded, "
+                                    f"{len(pending)} to go")
+                        return writer, pending
+                    logger.info("Files changed since the last checkpoint, restarting indexing")
+                    writer.abort()
+            return VectorStoreWriter(store_dir, dtype=dtype, embedder=embedder, resumable=resumable,
+                                     lock=lock), repo_files
+        finally:
+            lock.release()
+
+    def _save_ingest_report(self, report: IngestReport) -> None:
+        """Log the skipped files of an indexing run and save the report next to the database."""
+        logger.info(f"Ingest report: {report.indexed} files indexed, skipped {report.counts()}")
+        path = ingest_report_path_for(self.repo_paths["save_db_file"])
+        try:
+            report.save(path)
+        except OSError as e:
+            logger.warning(f"Could not save ingest report to {path}: {e}")
+
+    def _open_store(self) -> VectorStore:
+        """Open the repository's vector store, migrating a legacy pickle if that is all there is."""
+        store_dir = self.repo_paths["save_store_dir"]
+        if VectorStore.exists(store_dir):
+            return VectorStore.open(store_dir)
+        return migrate_legacy_db(self.repo_paths["save_db_file"], store_dir)
+
+    def _refresh_db_index(self, manifest: IndexManifest, file_filters: dict, is_ollama_embedder: bool = None) -> List[Document]:
+        """
+        Bring an existing database up to date with the working tree.
+
+        Only added and modified files are re-read, split and embedded; chunks of deleted
+        files are dropped and everything else is carried over from the stored database.
+
+        Args:
+            manifest (IndexManifest): The manifest written when the database was last saved
+            file_filters (dict): Resolved inclusion/exclusion filters
+            is_ollama_embedder (bool, optional): Whether to use Ollama for embedding.
+
+        Returns:
+            List[Document]: List of Document objects
+        """
+        repo_dir = self.repo_paths["save_repo_dir"]
+        repo_files = list(iter_repository_files(repo_dir, **file_filters))
+        fingerprints = compute_fingerprints(repo_dir, repo_files)
+        diff = manifest.diff(fingerprints)
+        logger.info(f"Index refresh: {diff.summary()}")
+
+        store = self._open_store()
+        if not diff.has_changes:
+            self.db = store
+            return store.documents()
+
+        changed = set(diff.changed)
+        stale = changed.union(diff.deleted)
+        kept_rows = [
+            index for index, record in enumerate(store.iter_metadata())
+            if (record.get("meta_data") or {}).get("file_path", "").replace(os.sep, "/") not in stale
+        ]
+
+        changed_files = [f for f in repo_files if f.relative_path.replace(os.sep, "/") in changed]
+
+        # Unchanged rows are copied as raw bytes (converted if the configured dtype changed),
+        # changed files are streamed through the pipeline
+        writer = VectorStoreWriter(store.path, dim=store.dim or None, dtype=get_vector_store_dtype(),
+                                   embedder=get_embedder_signature(), lock_timeout=get_build_lock_timeout())
+        report = IngestReport()
+        try:
+            writer.copy_from(store, kept_rows)
+            stream_files_to_store(changed_files, writer, is_ollama_embedder=is_ollama_embedder, report=report)
+        except Exception:
+            writer.abort()
+            raise
+        self.db = writer.commit()
+        build_store_indexes(self.db)
+        self._save_ingest_report(report)
+        logger.info(f"Re-embedded {len(self.db) - len(kept_rows)} chunks from {len(changed_files)} changed files, "
+                    f"kept {len(kept_rows)} chunks")
+
+        IndexManifest.from_records(get_embedder_signature(), fingerprints, self.db.iter_metadata()).save(
+            self.repo_paths["save_manifest_file"]
         )
-        logger.info(f"Total documents: {len(documents)}")
-        transformed_docs = self.db.get_transformed_data(key="split_and_embed")
-        logger.info(f"Total transformed documents: {len(transformed_docs)}")
-        return transformed_docs
+        return self.db.documents()
 
     def prepare_retriever(self, repo_url_or_path: str, type: str = "github", access_token: str = None):
         """
@@ -1,6 +1,4 @@
 from typing import Sequence, List
-from copy import deepcopy
-from tqdm import tqdm
 import logging
 import adalflow as adal
 from adalflow.core.types import Document
@@ -8,6 +6,8 @@ from adalflow.core.component import DataComponent
 import requests
 import os
 
+from api.tools.ollama_batch import OllamaBatchConfig, OllamaBatchEmbedder
+
 # Configure logging
 from api.logging_config import setup_logging
 
@@ -61,45 +61,48 @@ def check_ollama_model_exists(model_name: str, ollama_host: str = None) -> bool:
 
 class OllamaDocumentProcessor(DataComponent):
     """
-    Process documents for Ollama embeddings by processing one document at a time.
-    Adalflow Ollama Client does not support batch embedding, so we need to process each document individually.
+    Process documents for Ollama embeddings.
+    Adalflow Ollama Client does not support batch embedding, so documents are sent to the
+    Ollama server directly in batches through /api/embed, with several requests in flight.
     """
-    def __init__(self, embedder: adal.Embedder) -> None:
+    def __init__(self, embedder: adal.Embedder, batch_config: OllamaBatchConfig = None) -> None:
         super().__init__()
         self.embedder = embedder
+        model_client = getattr(embedder, "model_client", None)
+        model_kwargs = dict(getattr(embedder, "model_kwargs", None) or {})
+        self.batch_embedder = OllamaBatchEmbedder(
+            model=model_kwargs.pop("model", None),
+            host=getattr(model_client, "_host", None),
+            config=batch_config,
+            options=model_kwargs.get("options"),
+        )
 
     def __call__(self, documents: Sequence[Document]) -> Sequence[Document]:
-        output = deepcopy(documents)
-        logger.info(f"Processing {len(output)} documents individually for Ollama embeddings")
+        # The splitter hands us freshly created chunks, so vectors are set in place rather than on a deep copy
+        logger.info(f"Processing {len(documents)} documents in batches for Ollama embeddings "
+                    f"(batch size {self.batch_embedder.config.batch_size}, "
+                    f"concurrency {self.batch_embedder.config.concurrency})")
+
+        embeddings = self.batch_embedder.embed([doc.text for doc in documents])
 
         successful_docs = []
         expected_embedding_size = None
+        for i, (doc, embedding) in enumerate(zip(documents, embeddings)):
+            file_path = getattr(doc, 'meta_data', {}).get('file_path', f'document_{i}')
+            if not embedding:
+                logger.warning(f"Failed to get embedding for document '{file_path}', skipping")
+                continue
 
-        for i, doc in enumerate(tqdm(output, desc="Processing documents for Ollama embeddings")):
-            try:
-                # Get embedding for a single document
-                result = self.embedder(input=doc.text)
-                if result.data and len(result.data) > 0:
-                    embedding = result.data[0].embedding
-
-                    # Validate embedding size consistency
-                    if expected_embedding_size is None:
-                        expected_embedding_size = len(embedding)
-                        logger.info(f"Expected embedding size set to: {expected_embedding_size}")
-                    elif len(embedding) != expected_embedding_size:
-                        file_path = getattr(doc, 'meta_data', {}).get('file_path', f'document_{i}')
-                        logger.warning(f"Document '{file_path}' has inconsistent embedding size {len(embedding)} != {expected_embedding_size}, skipping")
-                        continue
+            # Validate embedding size consistency
+            if expected_embedding_size is None:
+                expected_embedding_size = len(embedding)
+                logger.info(f"Expected embedding size set to: {expected_embedding_size}")
+            elif len(embedding) != expected_embedding_size:
+                logger.warning(f"Document '{file_path}' has inconsistent embedding size {len(embedding)} != {expected_embedding_size}, skipping")
+                continue
 
-                    # Assign the embedding to the document
-                    output[i].vector = embedding
-                    successful_docs.append(output[i])
-                else:
-                    file_path = getattr(doc, 'meta_data', {}).get('file_path', f'document_{i}')
-                    logger.warning(f"Failed to get embedding for document '{file_path}', skipping")
-            except Exception as e:
-                file_path = getattr(doc, 'meta_data', {}).get('file_path', f'document_{i}')
-                logger.error(f"Error processing document '{file_path}': {e}, skipping")
+            doc.vector = embedding
+            successful_docs.append(doc)
 
-        logger.info(f"Successfully processed {len(successful_docs)}/{len(output)} documents with consistent embeddings")
-        return successful_docs
\ No newline at end of file
+        logger.info(f"Successfully processed {len(successful_docs)}/{len(documents)} documents with consistent embeddings")
+        return successful_docs
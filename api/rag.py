@@ -6,6 +6,8 @@ from typing import Any, List, Tuple, Dict
 from uuid import uuid4
 
 import adalflow as adal
+import faiss
+import numpy as np
 
 from api.tools.embedder import get_embedder
 from api.prompts import RAG_SYSTEM_PROMPT as system_prompt, RAG_TEMPLATE
@@ -40,7 +42,17 @@ class CustomConversation:
 # Import other adalflow components
 from adalflow.components.retriever.faiss_retriever import FAISSRetriever
 from api.config import configs
-from api.data_pipeline import DatabaseManager
+from api.data_pipeline import DatabaseManager, get_embedder_signature
+from adalflow.core.types import Embedding, EmbedderOutput, RetrieverOutput
+from api.tools.ann_index import (
+    AnnIndexConfig, describe_index, exact_search, index_nbytes, load_or_build_ann_index, rerank,
+    search_hits, search_with_selector,
+)
+from api.tools.lexical_index import HybridConfig, ensure_lexical_index, reciprocal_rank_fusion
+from api.tools.metadata_index import MetadataIndex, RetrievalFilter, ensure_metadata_index
+from api.tools.query_cache import get_query_embedding_cache
+from api.tools.retriever_cache import get_retriever_cache, store_version
+from api.tools.vector_store import StoredDocuments, validate_embeddings
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -150,6 +162,100 @@ class RAGAnswer(adal.DataClass):
 
     __output_fields__ = ["rationale", "answer"]
 
+@dataclass
+class PreparedIndex:
+    """Validated documents and the FAISS index built over their vectors, shared between requests."""
+    documents: List
+    index: Any
+    dimensions: int
+    # BM25 index over the store and the store rows behind ``documents`` (None when they are all rows)
+    lexical: Any = None
+    store_rows: Any = None
+    # Metadata columns of the store (or of ``documents`` when they are not backed by one) for filters
+    metadata: Any = None
+
+    @property
+    def nbytes(self) -> int:
+        # The index holds its own copy of the vectors; documents are a lazy view over the store
+        extra = sum(part.nbytes for part in (self.lexical, self.metadata) if part is not None)
+        return index_nbytes(self.index) + len(self.documents) * 8 + extra
+
+    def allowed_positions(self, retrieval_filter: RetrievalFilter) -> np.ndarray:
+        """Boolean mask over ``documents`` of the chunks that satisfy ``retrieval_filter``."""
+        mask = self.metadata.mask(retrieval_filter)
+        return mask if self.store_rows is None else mask[self.store_rows]
+
+    def search(self, queries: np.ndarray, top_k: int, allowed: np.ndarray = None, exact_max: int = 0,
+               rerank_factor: int = 0):
+        """
+        Search ``queries`` among the allowed documents, or all of them when ``allowed`` is None.
+
+        Small subsets (a file, a directory) are scanned exactly from the store's vectors;
+        larger ones go through the index with an ID selector. With ``rerank_factor`` above
+        1, ``top_k * rerank_factor`` candidates from a (quantized) index are re-scored
+        with the store's vectors.
+        """
+        stored = isinstance(self.documents, StoredDocuments)
+        if allowed is not None:
+            positions = np.flatnonzero(allowed)
+            if positions.size <= exact_max and stored:
+                return exact_search(self.float_vectors(positions), positions, queries, top_k)
+        rerank_factor = rerank_factor if stored else 0
+        k = min(top_k * max(rerank_factor, 1), int(self.index.ntotal))
+        if allowed is None:
+            distances, ids = self.index.search(np.ascontiguousarray(queries, dtype=np.float32), k)
+        else:
+            distances, ids = search_with_selector(self.index, queries, k, allowed)
+        if rerank_factor <= 1:
+            return distances, ids
+        return rerank(ids, queries, top_k, self.float_vectors)
+
+    def float_vectors(self, positions: np.ndarray) -> np.ndarray:
+        """L2-normalized float32 vectors of the documents at ``positions``, read from the store."""
+        rows = positions if self.store_rows is None else self.store_rows[positions]
+        vectors = self.documents.store.float_vectors(np.asarray(rows))
+        faiss.normalize_L2(vectors)
+        return vectors
+
+    def positions(self, rows: np.ndarray) -> List[int]:
+        """Positions in ``documents`` of the given store rows, dropping rows without a valid embedding."""
+        if self.store_rows is None:
+            return rows.tolist()
+        found = np.minimum(np.searchsorted(self.store_rows, rows), len(self.store_rows) - 1)
+        return found[self.store_rows[found] == rows].tolist()
+
+_NEXT_STEPS_HEADING = re.compile(r"^#{2,4}\s*Next Steps\s*$", re.IGNORECASE | re.MULTILINE)
+_LIST_ITEM = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+(.+?)\s*$")
+
+def research_followup_queries(previous_response: str, limit: int = 4) -> List[str]:
+    """
+    Sub-questions for the next Deep Research iteration, taken from the list under the
+    "## Next Steps" heading of the previous iteration's answer.
+    """
+    match = _NEXT_STEPS_HEADING.search(previous_response or "")
+    if not match:
+        return []
+    queries = []
+    for line in previous_response[match.end():].splitlines():
+        if line.lstrip().startswith("#"):
+            break
+        item = _LIST_ITEM.match(line)
+        if item:
+            queries.append(item.group(1).replace("**", "").strip()[:300])
+            if len(queries) >= limit:
+                break
+    return queries
+
+@dataclass
+class MultiQueryRetrieval:
+    """Merged results of several query variants; ``provenance[i]`` lists the queries that found ``documents[i]``."""
+    queries: List[str]
+    per_query: List[RetrieverOutput]
+    doc_indices: List[int]
+    doc_scores: List[float]
+    documents: List
+    provenance: List[List[int]]
+
 class RAG(adal.Component):
     """RAG with one repo.
     If you want to load a new repos, call prepare_retriever(repo_url_or_path) first."""
@@ -246,100 +352,49 @@ IMPORTANT FORMATTING RULES:
         """Initialize the database manager with local storage"""
         self.db_manager = DatabaseManager()
         self.transformed_docs = []
+        self.prepared_index = None
 
-    def _validate_and_filter_embeddings(self, documents: List) -> List:
+    def _validate_and_filter_embeddings(self, documents: List) -> Tuple[List, np.ndarray]:
         """
         Validate embeddings and filter out documents with invalid or mismatched embedding sizes.
 
+        Documents loaded from a vector store use the validation saved with the store;
+        other documents are stacked into a matrix and validated the same way.
+
         Args:
             documents: List of documents with embeddings
 
         Returns:
-            List of documents with valid embeddings of consistent size
+            Tuple of (documents with valid embeddings of consistent size, their vectors as a float32 matrix)
         """
         if not documents:
             logger.warning("No documents provided for embedding validation")
-            return []
-
-        valid_documents = []
-        embedding_sizes = {}
-
-        # First pass: collect all embedding sizes and count occurrences
-        for i, doc in enumerate(documents):
-            if not hasattr(doc, 'vector') or doc.vector is None:
-                logger.warning(f"Document {i} has no embedding vector, skipping")
-                continue
-
-            try:
-                if isinstance(doc.vector, list):
-                    embedding_size = len(doc.vector)
-                elif hasattr(doc.vector, 'shape'):
-                    embedding_size = doc.vector.shape[0] if len(doc.vector.shape) == 1 else doc.vector.shape[-1]
-                elif hasattr(doc.vector, '__len__'):
-                    embedding_size = len(doc.vector)
-                else:
-                    logger.warning(f"Document {i} has invalid embedding vector type: {type(doc.vector)}, skipping")
-                    continue
-
-                if embedding_size == 0:
-                    logger.warning(f"Document {i} has empty embedding vector, skipping")
-                    continue
-
-                embedding_sizes[embedding_size] = embedding_sizes.get(embedding_size, 0) + 1
-
-            except Exception as e:
-                logger.warning(f"Error checking embedding size for document {i}: {str(e)}, skipping")
-                continue
-
-        if not embedding_sizes:
-            logger.error("No valid embeddings found in any documents")
-            return []
-
-        # Find the most common embedding size (this should be the correct one)
-        target_size = max(embedding_sizes.keys(), key=lambda k: embedding_sizes[k])
-        logger.info(f"Target embedding size: {target_size} (found in {embedding_sizes[target_size]} documents)")
-
-        # Log all embedding sizes found
-        for size, count in embedding_sizes.items():
-            if size != target_size:
-                logger.warning(f"Found {count} documents with incorrect embedding size {size}, will be filtered out")
-
-        # Second pass: filter documents with the target embedding size
-        for i, doc in enumerate(documents):
-            if not hasattr(doc, 'vector') or doc.vector is None:
-                continue
-
-            try:
-                if isinstance(doc.vector, list):
-                    embedding_size = len(doc.vector)
-                elif hasattr(doc.vector, 'shape'):
-                    embedding_size = doc.vector.shape[0] if len(doc.vector.shape) == 1 else doc.vector.shape[-1]
-                elif hasattr(doc.vector, '__len__'):
-                    embedding_size = len(doc.vector)
-                else:
-                    continue
-
-                if embedding_size == target_size:
-                    valid_documents.append(doc)
-                else:
-                    # Log which document is being filtered out
-                    file_path = getattr(doc, 'meta_data', {}).get('file_path', f'document_{i}')
-                    logger.warning(f"Filtering out document '{file_path}' due to embedding size mismatch: {embedding_size} != {target_size}")
-
-            except Exception as e:
-                file_path = getattr(doc, 'meta_data', {}).get('file_path', f'document_{i}')
-                logger.warning(f"Error validating embedding for document '{file_path}': {str(e)}, skipping")
-                continue
-
-        logger.info(f"Embedding validation complete: {len(valid_documents)}/{len(documents)} documents have valid embeddings")
-
-        if len(valid_documents) == 0:
+            return [], np.zeros((0, 0), dtype=np.float32)
+
+        if isinstance(documents, StoredDocuments) and documents.rows is None:
+            store = documents.store
+            validation = store.validation()
+            valid_documents = store.documents(rows=validation.valid_rows)
+            vectors = store.float_vectors(validation.valid_rows)
+        else:
+            vectors_in = [getattr(doc, "vector", None) for doc in documents]
+            lengths = np.fromiter((len(v) if v is not None and hasattr(v, "__len__") else 0 for v in vectors_in),
+                                  dtype=np.int64, count=len(vectors_in))
+            dim = int(np.bincount(lengths[lengths > 0]).argmax()) if np.any(lengths > 0) else 0
+            matrix = np.zeros((len(vectors_in), dim), dtype=np.float32)
+            for row in np.flatnonzero(lengths == dim):
+                matrix[row] = np.asarray(vectors_in[row], dtype=np.float32).reshape(-1)
+            validation = validate_embeddings(matrix, lengths)
+            valid_documents = [documents[int(row)] for row in validation.valid_rows]
+            vectors = matrix[validation.valid_rows]
+
+        logger.info(f"Embedding validation complete: {validation.summary()}")
+        if validation.valid == 0:
             logger.error("No documents with valid embeddings remain after filtering")
-        elif len(valid_documents) < len(documents):
-            filtered_count = len(documents) - len(valid_documents)
-            logger.warning(f"Filtered out {filtered_count} documents due to embedding issues")
+        elif validation.valid < validation.total:
+            logger.warning(f"Filtered out {validation.total - validation.valid} documents due to embedding issues")
 
-        return valid_documents
+        return valid_documents, vectors
 
     def prepare_retriever(self, repo_url_or_path: str, type: str = "github", access_token: str = None,
                       excluded_dirs: List[str] = None, excluded_files: List[str] = None,
@@ -358,72 +413,256 @@ IMPORTANT FORMATTING RULES:
         """
         self.initialize_db_manager()
         self.repo_url_or_path = repo_url_or_path
-        self.transformed_docs = self.db_manager.prepare_database(
-            repo_url_or_path,
-            type,
-            access_token,
+        database_kwargs = dict(
             is_ollama_embedder=self.is_ollama_embedder,
             excluded_dirs=excluded_dirs,
             excluded_files=excluded_files,
             included_dirs=included_dirs,
-            included_files=included_files
+            included_files=included_files,
         )
+
+        documents = None
+        if configs.get("repository", {}).get("refresh_index", False):
+            # Refreshing may rewrite the store; the version check below then rebuilds the index
+            documents = self.db_manager.prepare_database(repo_url_or_path, type, access_token, **database_kwargs)
+
+        def build():
+            prepared = self._build_prepared_index(repo_url_or_path, type, access_token, documents, **database_kwargs)
+            return prepared, prepared.nbytes
+
+        cache_config = configs.get("retriever_cache", {})
+        if cache_config.get("enabled", True):
+            key = (
+                repo_url_or_path, type, self.is_ollama_embedder,
+                tuple(excluded_dirs or ()), tuple(excluded_files or ()),
+                tuple(included_dirs or ()), tuple(included_files or ()),
+                tuple(sorted(get_embedder_signature().items())),
+                tuple(sorted((configs["retriever"].get("index") or {}).items())),
+                HybridConfig.from_dict(configs["retriever"].get("hybrid")).enabled,
+            )
+            store_dir = self.db_manager.get_store_dir(repo_url_or_path, type)
+            cache = get_retriever_cache(cache_config)
+            prepared = cache.get_or_build(key, lambda: store_version(store_dir), build)
+            logger.info(f"Retriever cache: {cache.metrics()}")
+        else:
+            prepared, _ = build()
+
+        self.transformed_docs = prepared.documents
+        self.prepared_index = prepared
+        # The index is shared; only the query embedder is specific to this instance
+        retrieve_embedder = self.query_embedder if self.is_ollama_embedder else self.embedder
+        retrieve_embedder = self._cached_query_embedder(retrieve_embedder)
+        self.retriever = FAISSRetriever(top_k=configs["retriever"]["top_k"], embedder=retrieve_embedder)
+        self.retriever.index = prepared.index
+        self.retriever.dimensions = prepared.dimensions
+        self.retriever.total_documents = prepared.index.ntotal
+        self.retriever.indexed = True
+
+    def _cached_query_embedder(self, embedder):
+        """
+        Wrap the query embedder with the process-wide query embedding cache.
+
+        Repeated questions (Deep Research continuations, per-file context queries) skip the
+        embedding request, and identical queries arriving together share one request. All
+        uncached queries of a call are embedded in one provider request, except with Ollama
+        whose query embedder takes a single string.
+        """
+        cache = get_query_embedding_cache(configs.get("query_cache"))
+        signature = tuple(sorted(get_embedder_signature().items()))
+        single_string = self.is_ollama_embedder
+
+        def embed_batch(queries: List[str]) -> List[List[float]]:
+            output = embedder(queries)
+            if getattr(output, "error", None) or len(output.data) != len(queries):
+                raise ValueError(f"Query embedding failed: {getattr(output, 'error', None) or 'missing embeddings'}")
+            return [data.embedding for data in output.data]
+
+        def embed_many(queries: List[str]) -> List[List[float]]:
+            if single_string:
+                return [embed_batch([query])[0] for query in queries]
+            return embed_batch(queries)
+
+        def cached_embedder(queries) -> EmbedderOutput:
+            queries = [queries] if isinstance(queries, str) else list(queries)
+            if cache is None:
+                vectors = embed_many(queries)
+            else:
+                vectors = cache.get_or_compute_many(
+                    [(signature, query) for query in queries], lambda keys: embed_many([key[1] for key in keys])
+                )
+            return EmbedderOutput(data=[Embedding(embedding=vector, index=i) for i, vector in enumerate(vectors)])
+
+        return cached_embedder
+
+    def _build_prepared_index(self, repo_url_or_path: str, type: str, access_token: str, documents: List = None,
+                              **database_kwargs) -> PreparedIndex:
+        """
+        Load the repository's documents, validate their embeddings and build the FAISS index.
+
+        Args:
+            repo_url_or_path: URL or local path to the repository
+            type: Type of repository
+            access_token: Optional access token for private repositories
+            documents: Documents already returned by prepare_database, if any
+
+        Returns:
+            PreparedIndex over the documents with valid embeddings
+        """
+        if documents is None:
+            documents = self.db_manager.prepare_database(repo_url_or_path, type, access_token, **database_kwargs)
+        self.transformed_docs = documents
         logger.info(f"Loaded {len(self.transformed_docs)} documents for retrieval")
 
         # Validate and filter embeddings to ensure consistent sizes
-        self.transformed_docs = self._validate_and_filter_embeddings(self.transformed_docs)
+        self.transformed_docs, vectors = self._validate_and_filter_embeddings(self.transformed_docs)
 
         if not self.transformed_docs:
             raise ValueError("No valid documents with embeddings found. Cannot create retriever.")
 
         logger.info(f"Using {len(self.transformed_docs)} documents with valid embeddings for retrieval")
 
+        # Valid rows have a non-zero norm, so normalizing for inner-product search is safe
+        faiss.normalize_L2(vectors)
+        # Trained ANN indexes are saved next to the vector store and reused until it changes
+        store_dir = self.transformed_docs.store.path if isinstance(self.transformed_docs, StoredDocuments) else None
+        index = load_or_build_ann_index(vectors, AnnIndexConfig.from_dict(configs["retriever"].get("index")), store_dir)
+        logger.info(f"FAISS index ready: {describe_index(index)}")
+
         try:
-            # Use the appropriate embedder for retrieval
-            retrieve_embedder = self.query_embedder if self.is_ollama_embedder else self.embedder
-            self.retriever = FAISSRetriever(
-                **configs["retriever"],
-                embedder=retrieve_embedder,
-                documents=self.transformed_docs,
-                document_map_func=lambda doc: doc.vector,
-            )
-            logger.info("FAISS retriever created successfully")
+            if store_dir:
+                metadata = ensure_metadata_index(self.transformed_docs.store)
+            else:
+                metadata = MetadataIndex.from_records(doc.meta_data for doc in self.transformed_docs)
         except Exception as e:
-            logger.error(f"Error creating FAISS retriever: {str(e)}")
-            # Try to provide more specific error information
-            if "All embeddings should be of the same size" in str(e):
-                logger.error("Embedding size validation failed. This suggests there are still inconsistent embedding sizes.")
-                # Log embedding sizes for debugging
-                sizes = []
-                for i, doc in enumerate(self.transformed_docs[:10]):  # Check first 10 docs
-                    if hasattr(doc, 'vector') and doc.vector is not None:
-                        try:
-                            if isinstance(doc.vector, list):
-                                size = len(doc.vector)
-                            elif hasattr(doc.vector, 'shape'):
-                                size = doc.vector.shape[0] if len(doc.vector.shape) == 1 else doc.vector.shape[-1]
-                            elif hasattr(doc.vector, '__len__'):
-                                size = len(doc.vector)
-                            else:
-                                size = "unknown"
-                            sizes.append(f"doc_{i}: {size}")
-                        except:
-                            sizes.append(f"doc_{i}: error")
-                logger.error(f"Sample embedding sizes: {', '.join(sizes)}")
-            raise
-
-    def call(self, query: str, language: str = "en") -> Tuple[List]:
+            logger.warning(f"Metadata index unavailable, retrieval filters will be ignored: {e}")
+            metadata = None
+
+        lexical = None
+        if store_dir and HybridConfig.from_dict(configs["retriever"].get("hybrid")).enabled:
+            try:
+                lexical = ensure_lexical_index(self.transformed_docs.store)
+            except Exception as e:
+                logger.warning(f"Lexical index unavailable, using vector search only: {e}")
+        return PreparedIndex(
+            documents=self.transformed_docs,
+            index=index,
+            dimensions=index.d,
+            lexical=lexical,
+            store_rows=self.transformed_docs.rows if store_dir else None,
+            metadata=metadata,
+        )
+
+    def _allowed_positions(self, filters) -> np.ndarray:
+        """Mask of the documents admitted by ``filters``, or None to search everything."""
+        retrieval_filter = filters if isinstance(filters, RetrievalFilter) else RetrievalFilter.from_dict(filters)
+        if retrieval_filter.is_empty:
+            return None
+        if self.prepared_index is None or self.prepared_index.metadata is None:
+            logger.warning("No metadata index for this repository, ignoring retrieval filters")
+            return None
+        return self.prepared_index.allowed_positions(retrieval_filter)
+
+    def _retrieve(self, queries: List[str], allowed: np.ndarray = None) -> List[RetrieverOutput]:
+        """
+        Retrieve for all ``queries`` at once: one embedding call, one batched index search,
+        then BM25 fusion per query.
+        """
+        index_config = AnnIndexConfig.from_dict(configs["retriever"].get("index"))
+        # Not through FAISSRetriever: for a batch it drops every column holding a -1 in any
+        # row, so one short IVF or HNSW result would cut the results of all other queries
+        outputs = self._index_retrieve(queries, index_config, allowed)
+        if self.prepared_index is not None and self.prepared_index.lexical is not None:
+            outputs = [self._fuse_lexical(query, output, allowed) for query, output in zip(queries, outputs)]
+        return outputs
+
+    def _index_retrieve(self, queries: List[str], index_config: AnnIndexConfig,
+                        allowed: np.ndarray = None) -> List[RetrieverOutput]:
+        """Vector search through the prepared index, restricted to ``allowed`` and re-ranked as configured."""
+        if allowed is not None and not allowed.any():
+            return [RetrieverOutput(doc_indices=[], doc_scores=[], query=query) for query in queries]
+        embeddings = self.retriever.embedder(queries)
+        query_vectors = np.asarray([data.embedding for data in embeddings.data], dtype=np.float32)
+        faiss.normalize_L2(query_vectors)
+        distances, ids = self.prepared_index.search(
+            query_vectors, self.retriever.top_k, allowed, index_config.exact_filter_max, index_config.rerank_factor,
+        )
+        return [
+            RetrieverOutput(doc_indices=doc_indices, doc_scores=doc_scores, query=query)
+            for query, (doc_indices, doc_scores) in zip(queries, search_hits(distances, ids))
+        ]
+
+    def _fuse_lexical(self, query: str, dense: RetrieverOutput, allowed: np.ndarray = None) -> RetrieverOutput:
+        """
+        Merge BM25 hits into the vector search results by reciprocal rank fusion.
+
+        Exact identifiers (function, constant and class names) are often missed by the
+        embeddings but rank first lexically.
+        """
+        hybrid = HybridConfig.from_dict(configs["retriever"].get("hybrid"))
+        rows, _ = self.prepared_index.lexical.search(query, hybrid.bm25_top_k, k1=hybrid.k1, b=hybrid.b)
+        lexical = self.prepared_index.positions(rows)
+        if allowed is not None:
+            lexical = [position for position in lexical if allowed[position]]
+        if not lexical:
+            return dense
+        fused = reciprocal_rank_fusion([dense.doc_indices, lexical], k=hybrid.rrf_k, limit=self.retriever.top_k)
+        return RetrieverOutput(
+            doc_indices=[index for index, _ in fused],
+            doc_scores=[score for _, score in fused],
+            query=dense.query,
+        )
+
+    def retrieve_many(self, queries: List[str], filters=None, top_k: int = None) -> MultiQueryRetrieval:
+        """
+        Retrieve for several query variants at once and merge the results.
+
+        The variants (sub-questions, follow-ups, file-path probes) are embedded in one
+        provider call and searched with one batched index search. Their rankings are merged
+        by reciprocal rank fusion, so documents found by several variants rank first.
+
+        Args:
+            queries: Query variants; blank and duplicate ones are dropped
+            filters: Optional retrieval filters, as for ``call``
+            top_k: Number of merged documents, the retriever's top_k by default
+
+        Returns:
+            MultiQueryRetrieval with the merged documents and which queries found each
+        """
+        unique_queries = list(dict.fromkeys(query.strip() for query in queries if query and query.strip()))
+        if not unique_queries:
+            raise ValueError("No queries to retrieve")
+        per_query = self._retrieve(unique_queries, self._allowed_positions(filters))
+        for output in per_query:
+            output.documents = [self.transformed_docs[doc_index] for doc_index in output.doc_indices]
+
+        rrf_k = HybridConfig.from_dict(configs["retriever"].get("hybrid")).rrf_k
+        fused = reciprocal_rank_fusion([output.doc_indices for output in per_query], k=rrf_k,
+                                       limit=top_k or self.retriever.top_k)
+        found_by = [set(output.doc_indices) for output in per_query]
+        doc_indices = [doc_index for doc_index, _ in fused]
+        return MultiQueryRetrieval(
+            queries=unique_queries,
+            per_query=per_query,
+            doc_indices=doc_indices,
+            doc_scores=[score for _, score in fused],
+            documents=[self.transformed_docs[doc_index] for doc_index in doc_indices],
+            provenance=[[i for i, found in enumerate(found_by) if doc_index in found] for doc_index in doc_indices],
+        )
+
+    def call(self, query: str, language: str = "en", filters=None) -> Tuple[List]:
         """
         Process a query using RAG.
 
         Args:
             query: The user's query
+            filters: Optional RetrievalFilter, or a dict of its fields (path_prefixes, globs,
+                languages, is_code, is_implementation), restricting which chunks are searched
 
         Returns:
             Tuple of (RAGAnswer, retrieved_documents)
         """
         try:
-            retrieved_documents = self.retriever(query)
+            retrieved_documents = self._retrieve([query], self._allowed_positions(filters))
 
             # Fill in the documents
             retrieved_documents[0].documents = [
@@ -17,7 +17,8 @@ from api.openai_client import OpenAIClient
 from api.openrouter_client import OpenRouterClient
 from api.bedrock_client import BedrockClient
 from api.azureai_client import AzureAIClient
-from api.rag import RAG
+from api.rag import RAG, research_followup_queries
+from api.tools.context_packer import ContextPacker
 from api.prompts import (
     DEEP_RESEARCH_FIRST_ITERATION_PROMPT,
     DEEP_RESEARCH_FINAL_ITERATION_PROMPT,
@@ -186,46 +187,41 @@ async def chat_completions_stream(request: ChatCompletionRequest):
         # Only retrieve documents if input is not too large
         context_text = ""
         retrieved_documents = None
+        rag_documents = []
 
         if not input_too_large:
             try:
-                # If filePath exists, modify the query for RAG to focus on the file
+                # If filePath exists, search the question within that file only
                 rag_query = query
+                rag_filters = None
                 if request.filePath:
-                    # Use the file path to get relevant context about the file
-                    rag_query = f"Contexts related to {request.filePath}"
-                    logger.info(f"Modified RAG query to focus on file: {request.filePath}")
+                    rag_filters = {"path_prefixes": [request.filePath]}
+                    logger.info(f"Restricting RAG retrieval to file: {request.filePath}")
+
+                # Later Deep Research iterations also search the previous iteration's next steps
+                rag_followups = []
+                if is_deep_research and research_iteration > 1:
+                    previous_response = next((msg.content for msg in reversed(request.messages) if msg.role == "assistant"), "")
+                    rag_followups = research_followup_queries(previous_response)
 
                 # Try to perform RAG retrieval
                 try:
                     # This will use the actual RAG implementation
-                    retrieved_documents = request_rag(rag_query, language=request.language)
+                    if rag_followups:
+                        # One embedding call and one batched search for all query variants
+                        retrieved_documents = [request_rag.retrieve_many([rag_query] + rag_followups, filters=rag_filters)]
+                        logger.info(f"Retrieved for {len(retrieved_documents[0].queries)} query variants")
+                    else:
+                        retrieved_documents = request_rag(rag_query, language=request.language, filters=rag_filters)
+                    if rag_filters and not (retrieved_documents and getattr(retrieved_documents[0], "documents", None)):
+                        # The file may not be indexed (e.g. too large); look for context about it instead
+                        rag_query = f"Contexts related to {request.filePath}"
+                        retrieved_documents = request_rag(rag_query, language=request.language)
 
                     if retrieved_documents and retrieved_documents[0].documents:
-                        # Format context for the prompt in a more structured way
-                        documents = retrieved_documents[0].documents
-                        logger.info(f"Retrieved {len(documents)} documents")
-
-                        # Group documents by file path
-                        docs_by_file = {}
-                        for doc in documents:
-                            file_path = doc.meta_data.get('file_path', 'unknown')
-                            if file_path not in docs_by_file:
-                                docs_by_file[file_path] = []
-                            docs_by_file[file_path].append(doc)
-
-                        # Format context text with file path grouping
-                        context_parts = []
-                        for file_path, docs in docs_by_file.items():
-                            # Add file header with metadata
-                            header = f"## File Path: {file_path}\n\n"
-                            # Add document content
-                            content = "\n\n".join([doc.text for doc in docs])
-
-                            context_parts.append(f"{header}{content}")
-
-                        # Join all parts with clear separation
-                        context_text = "\n\n" + "-" * 10 + "\n\n".join(context_parts)
+                        # Packed into the prompt within the model's token budget below
+                        rag_documents = retrieved_documents[0].documents
+                        logger.info(f"Retrieved {len(rag_documents)} documents")
                     else:
                         logger.warning("No documents retrieved from RAG")
                 except Exception as e:
@@ -234,7 +230,7 @@ async def chat_completions_stream(request: ChatCompletionRequest):
 
             except Exception as e:
                 logger.error(f"Error retrieving documents: {str(e)}")
-                context_text = ""
+                rag_documents = []
 
         # Get repository information
         repo_url = request.repo_url
@@ -309,14 +305,23 @@ async def chat_completions_stream(request: ChatCompletionRequest):
         if conversation_history:
             prompt += f"<conversation_history>\n{conversation_history}</conversation_history>\n\n"
 
+        # The current file gets a share of the model's context budget, retrieved chunks the rest
+        packer = ContextPacker.for_model(
+            configs.get("context_budget"),
+            request.model or configs["providers"].get(request.provider, {}).get("default_model"),
+        )
+
         # Check if filePath is provided and fetch file content if it exists
         if file_content:
+            file_content = packer.pack_text("file_content", file_content)
             # Add file content to the prompt after conversation history
             prompt += f"<currentFileContent path=\"{request.filePath}\">\n{file_content}\n</currentFileContent>\n\n"
 
         # Only include context if it's not empty
         CONTEXT_START = "<START_OF_CONTEXT>"
         CONTEXT_END = "<END_OF_CONTEXT>"
+        context_text = packer.pack_documents(rag_documents)
+        logger.info(f"Prompt context token usage: {packer.report()}")
         if context_text.strip():
             prompt += f"{CONTEXT_START}\n{context_text}\n{CONTEXT_END}\n\n"
         else:
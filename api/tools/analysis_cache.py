@@ -0,0 +1,143 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# Bump when the parsers change their output, so cached results are not reused
+ANALYSIS_CACHE_VERSION = 1
+
+# A file modified this close to the cache write may change again within the same mtime
+# tick; its stat is not trusted and its content is hashed on the next run
+_RACY_SECONDS = 2.0
+
+_HASH_BLOCK = 1024 * 1024
+
+
+def analysis_cache_path(analysis_dir: str, project_directory: str) -> str:
+    """Path of a project's cache, next to its analysis JSON: {name}_analysis_cache.json."""
+    return os.path.join(analysis_dir, f"{os.path.basename(project_directory)}_analysis_cache.json")
+
+
+def content_hash(path: str) -> str:
+    """sha256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@dataclass
+class AnalysisCacheStats:
+    """What one project analysis took from the cache."""
+    reused: int = 0
+    parsed: int = 0
+    removed: int = 0
+    hashed: int = 0
+
+    def summary(self) -> str:
+        return (f"{self.reused} reused, {self.parsed} parsed, {self.removed} removed "
+                f"({self.hashed} files hashed)")
+
+
+@dataclass
+class CachedAnalysis:
+    """Analysis entry of one file with the content hash and stat it was computed from."""
+    hash: str
+    size: int
+    mtime_ns: int
+    entry: Dict
+
+
+@dataclass
+class AnalysisCache:
+    """
+    Per-file structural analysis results of one project, keyed by relative path.
+
+    An entry is reused while the file's size and mtime are unchanged, or, when they
+    changed, while its content hash still matches (a fresh clone or checkout touches
+    every mtime). Results of another cache version or parser are discarded; ``engine`` is
+    the parser's signature (see ``code_parser_signature``), so installing tree-sitter or a
+    grammar invalidates results of the parser it replaces.
+    """
+    engine: str = "regex"
+    files: Dict[str, CachedAnalysis] = field(default_factory=dict)
+    # Set when entries were stored or dropped since loading
+    changed: bool = False
+
+    @classmethod
+    def load(cls, path: str, engine: str) -> "AnalysisCache":
+        """The cache stored at ``path``, or an empty one if it is missing, unreadable or stale."""
+        if not os.path.exists(path):
+            return cls(engine=engine)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != ANALYSIS_CACHE_VERSION or data.get("engine") != engine:
+                logger.info(f"Ignoring analysis cache {path} of version {data.get('version')}, "
+                            f"engine {data.get('engine')}")
+                return cls(engine=engine)
+            files = {p: CachedAnalysis(**cached) for p, cached in data.get("files", {}).items()}
+            return cls(engine=engine, files=files)
+        except Exception as e:
+            logger.error(f"Error loading analysis cache {path}: {e}")
+            return cls(engine=engine)
+
+    def save(self, path: str) -> None:
+        data = {
+            "version": ANALYSIS_CACHE_VERSION,
+            "engine": self.engine,
+            "files": {p: {"hash": c.hash, "size": c.size, "mtime_ns": c.mtime_ns, "entry": c.entry}
+                      for p, c in self.files.items()},
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self.changed = False
+
+    def lookup(self, relative_path: str, file_path: str, stats: AnalysisCacheStats):
+        """
+        The cached entry of a file if its content is unchanged.
+
+        Returns:
+            tuple: (entry or None, content hash or None if the file was not hashed, stat or None).
+        """
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return None, None, None
+        cached = self.files.get(relative_path)
+        if cached is not None and cached.size == st.st_size and cached.mtime_ns == st.st_mtime_ns:
+            return cached.entry, None, st
+        try:
+            digest = content_hash(file_path)
+        except OSError:
+            return None, None, st
+        stats.hashed += 1
+        if cached is not None and cached.hash == digest:
+            self.store(relative_path, digest, st, cached.entry)
+            return cached.entry, digest, st
+        return None, digest, st
+
+    def store(self, relative_path: str, digest: str, st: os.stat_result, entry: Dict) -> None:
+        mtime_ns = st.st_mtime_ns
+        if time.time() - st.st_mtime < _RACY_SECONDS:
+            mtime_ns = 0
+        self.files[relative_path] = CachedAnalysis(hash=digest, size=st.st_size, mtime_ns=mtime_ns, entry=entry)
+        self.changed = True
+
+    def prune(self, relative_paths) -> int:
+        """Drop the entries of files not in ``relative_paths``; returns how many were dropped."""
+        keep = set(relative_paths)
+        removed = [p for p in self.files if p not in keep]
+        for p in removed:
+            del self.files[p]
+        self.changed = self.changed or bool(removed)
+        return len(removed)
@@ -0,0 +1,208 @@
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_STORE_VERSION = 1
+
+# Artifacts of one project, under ~/.adalflow/analysis
+RECORDS_SUFFIX = "_project_analysis.jsonl"
+SUMMARIES_SUFFIX = "_project_extract_analysis.jsonl"
+INDEX_SUFFIX = "_project_analysis.index.json"
+
+
+def analysis_store_paths(analysis_dir: str, project_name: str) -> Tuple[str, str, str]:
+    """Paths of the per-file records, the per-file summaries and the index of a project."""
+    base = os.path.join(analysis_dir, project_name)
+    return f"{base}{RECORDS_SUFFIX}", f"{base}{SUMMARIES_SUFFIX}", f"{base}{INDEX_SUFFIX}"
+
+
+def _json_line(data: Dict) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+class AnalysisWriter:
+    """
+    Writes the structural analysis of a project one file at a time.
+
+    Each file becomes one JSON line in the records file (its full analysis entry, with the
+    path relative to the project) and one in the summaries file (its ``extract_key_info``
+    summary). The index, written last, holds the project totals and the module, language
+    and byte span of every line, so readers seek to the files they need. All three files
+    are written next to their destination and moved into place by ``close``.
+    """
+
+    def __init__(self, analysis_dir: str, project_name: str, project_path: str):
+        self.project_name = project_name
+        self.project_path = project_path
+        self.paths = analysis_store_paths(analysis_dir, project_name)
+        self._records = open(f"{self.paths[0]}.tmp", "wb")
+        self._summaries = open(f"{self.paths[1]}.tmp", "wb")
+        self._files: List[Dict] = []
+        self._processed = 0
+
+    def add(self, entry: Dict, module: str, summary: Dict) -> None:
+        """Append one file: its analysis entry, module (file type) and summary."""
+        record = {k: v for k, v in entry.items() if k != "file_path"}
+        record_offset = self._records.tell()
+        record_line = _json_line(record)
+        self._records.write(record_line)
+        summary_offset = self._summaries.tell()
+        summary_line = _json_line(summary)
+        self._summaries.write(summary_line)
+
+        if "error" not in entry:
+            self._processed += 1
+        self._files.append({
+            "relative_path": entry.get("relative_path"),
+            "module": module,
+            "language": entry.get("language"),
+            "record": [record_offset, len(record_line)],
+            "summary": [summary_offset, len(summary_line)],
+        })
+
+    def close(self) -> None:
+        records_bytes = self._records.tell()
+        summaries_bytes = self._summaries.tell()
+        self._records.close()
+        self._summaries.close()
+        index = {
+            "version": ANALYSIS_STORE_VERSION,
+            "project_name": self.project_name,
+            "project_path": self.project_path,
+            "total_files": len(self._files),
+            "processed_files": self._processed,
+            "records_bytes": records_bytes,
+            "summaries_bytes": summaries_bytes,
+            "files": self._files,
+        }
+        records_path, summaries_path, index_path = self.paths
+        with open(f"{index_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(f"{records_path}.tmp", records_path)
+        os.replace(f"{summaries_path}.tmp", summaries_path)
+        os.replace(f"{index_path}.tmp", index_path)
+
+    def abort(self) -> None:
+        self._records.close()
+        self._summaries.close()
+        for path in self.paths[:2]:
+            try:
+                os.remove(f"{path}.tmp")
+            except OSError:
+                pass
+
+    def __enter__(self) -> "AnalysisWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class AnalysisStore:
+    """
+    Reader of the analysis artifacts written by ``AnalysisWriter``.
+
+    Only the index is loaded when the store is opened; summaries and records are read
+    by byte span, for the requested modules or files only.
+    """
+
+    def __init__(self, paths: Tuple[str, str, str], index: Dict):
+        self.paths = paths
+        self.index = index
+        self._by_path = {f["relative_path"]: f for f in index["files"]}
+
+    @classmethod
+    def open(cls, analysis_dir: str, project_name: str) -> Optional["AnalysisStore"]:
+        """The store of ``project_name``, or None if it was never written or is incomplete."""
+        paths = analysis_store_paths(analysis_dir, project_name)
+        records_path, summaries_path, index_path = paths
+        if not os.path.isfile(index_path):
+            return None
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") != ANALYSIS_STORE_VERSION:
+                logger.warning(f"Ignoring analysis index {index_path} with unsupported version {index.get('version')}")
+                return None
+            # A writer replacing the files right now leaves sizes that do not match the index
+            if (os.path.getsize(records_path) != index["records_bytes"]
+                    or os.path.getsize(summaries_path) != index["summaries_bytes"]):
+                logger.warning(f"Analysis artifacts of {project_name} do not match their index")
+                return None
+            return cls(paths, index)
+        except Exception as e:
+            logger.error(f"Error loading analysis index {index_path}: {e}")
+            return None
+
+    @property
+    def project_name(self) -> str:
+        return self.index.get("project_name", "")
+
+    @property
+    def total_files(self) -> int:
+        return self.index.get("total_files", 0)
+
+    def modules(self) -> Dict[str, int]:
+        """File count per module (file type), in the order modules first appear."""
+        counts = {}
+        for f in self.index["files"]:
+            counts[f["module"]] = counts.get(f["module"], 0) + 1
+        return counts
+
+    def _read(self, path: str, spans: Iterable[List[int]]) -> Iterable[Dict]:
+        with open(path, "rb") as f:
+            for offset, length in spans:
+                f.seek(offset)
+                yield json.loads(f.read(length))
+
+    def summaries(self, modules: Optional[Iterable[str]] = None, max_bytes: int = 0) -> Dict:
+        """
+        The condensed analysis (``extract_key_info`` layout) read from the summaries file.
+
+        Args:
+            modules (Iterable[str], optional): File types to include, e.g. [".py"]; all by default.
+            max_bytes (int): Stop adding file summaries once they take this many bytes of
+                JSON; 0 for no limit. Module file counts stay complete and the result is
+                marked ``"truncated": true``.
+        """
+        wanted = set(modules) if modules is not None else None
+        counts = self.modules()
+        result = {"project_name": self.project_name, "total_files": self.total_files, "modules": {}}
+        for module, count in counts.items():
+            if wanted is None or module in wanted:
+                result["modules"][module] = {"file_count": count, "files": []}
+
+        selected = [f for f in self.index["files"] if f["module"] in result["modules"]]
+        included, used = [], 0
+        for f in selected:
+            if max_bytes and used + f["summary"][1] > max_bytes:
+                result["truncated"] = True
+                break
+            included.append(f)
+            used += f["summary"][1]
+        for f, summary in zip(included, self._read(self.paths[1], (f["summary"] for f in included))):
+            result["modules"][f["module"]]["files"].append(summary)
+        return result
+
+    def file_entry(self, relative_path: str) -> Optional[Dict]:
+        """Full analysis entry of one file, or None if the project has no such file."""
+        f = self._by_path.get(relative_path)
+        if f is None:
+            return None
+        entry = next(iter(self._read(self.paths[0], [f["record"]])))
+        entry["file_path"] = os.path.join(self.index.get("project_path", ""), relative_path)
+        return entry
+
+    def iter_entries(self, modules: Optional[Iterable[str]] = None) -> Iterable[Dict]:
+        """Full analysis entries of the files of ``modules`` (all by default), in path order."""
+        wanted = set(modules) if modules is not None else None
+        selected = [f for f in self.index["files"] if wanted is None or f["module"] in wanted]
+        for f, entry in zip(selected, self._read(self.paths[0], (f["record"] for f in selected))):
+            entry["file_path"] = os.path.join(self.index.get("project_path", ""), f["relative_path"])
+            yield entry
@@ -0,0 +1,330 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+# Precision the flat, ivf_flat and hnsw indexes keep their vectors in
+PRECISIONS = ("float32", "float16", "int8")
+_SCALAR_QUANTIZERS = {"float16": faiss.ScalarQuantizer.QT_fp16, "int8": faiss.ScalarQuantizer.QT_8bit}
+
+# FAISS warns below ~39 training points per IVF list
+_MIN_POINTS_PER_LIST = 39
+
+
+@dataclass
+class AnnIndexConfig:
+    """
+    Settings of the FAISS index behind the retriever (``retriever.index`` in embedder.json).
+
+    ``type`` is one of flat, ivf_flat, ivf_pq or hnsw. Repositories with fewer than
+    ``min_vectors`` valid chunks always get an exact flat index, where approximate search
+    buys nothing. IVF indexes are trained on at most ``train_sample`` vectors; ``nlist=0``
+    picks about 4 * sqrt(n) lists. ``nprobe`` and ``ef_search`` trade recall for latency at
+    query time and can be changed without rebuilding. Filtered searches over at most
+    ``exact_filter_max`` chunks scan those chunks exactly instead of using the index.
+
+    ``precision`` stores the vectors of flat, ivf_flat and hnsw indexes as float16 or
+    int8 scalar-quantized codes (ivf_pq has its own codes). With ``rerank_factor`` above
+    1, searches fetch ``top_k * rerank_factor`` candidates from the index and re-score
+    them with the store's vectors, recovering the ranking lost to quantization.
+    """
+    type: str = "flat"
+    min_vectors: int = 10000
+    train_sample: int = 100000
+    nlist: int = 0
+    nprobe: int = 16
+    pq_m: int = 32
+    pq_nbits: int = 8
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    ef_search: int = 128
+    exact_filter_max: int = 50000
+    precision: str = "float32"
+    rerank_factor: int = 0
+
+    @classmethod
+    def from_dict(cls, config: Optional[Dict]) -> "AnnIndexConfig":
+        config = config or {}
+        known = {k: v for k, v in config.items() if k in cls.__dataclass_fields__}
+        index_config = cls(**known)
+        if index_config.type not in INDEX_TYPES:
+            raise ValueError(f"Unknown retriever index type '{index_config.type}', expected one of {INDEX_TYPES}")
+        if index_config.precision not in PRECISIONS:
+            raise ValueError(f"Unknown retriever index precision '{index_config.precision}', "
+                             f"expected one of {PRECISIONS}")
+        return index_config
+
+    def effective_type(self, n: int) -> str:
+        return self.type if n >= max(self.min_vectors, 1) else "flat"
+
+    def build_params(self, n: int, dim: int) -> Dict:
+        """The settings that shape a trained index; a saved index is reused only if these match."""
+        index_type = self.effective_type(n)
+        params = {"type": index_type, "n": int(n), "dim": int(dim)}
+        if index_type in ("ivf_flat", "ivf_pq"):
+            params["nlist"] = _nlist(self.nlist, n)
+            params["train_sample"] = self.train_sample
+        if index_type == "ivf_pq":
+            params["pq_m"] = _pq_subquantizers(self.pq_m, dim)
+            params["pq_nbits"] = self.pq_nbits
+        if index_type == "hnsw":
+            params["hnsw_m"] = self.hnsw_m
+            params["ef_construction"] = self.ef_construction
+        if index_type != "ivf_pq" and self.precision != "float32":
+            params["precision"] = self.precision
+        return params
+
+
+def _nlist(nlist: int, n: int) -> int:
+    if nlist <= 0:
+        nlist = int(4 * math.sqrt(n))
+    return max(1, min(nlist, n // _MIN_POINTS_PER_LIST))
+
+
+def _pq_subquantizers(m: int, dim: int) -> int:
+    """Largest number of sub-quantizers not above ``m`` that divides ``dim``."""
+    m = max(1, min(m, dim))
+    while dim % m:
+        m -= 1
+    return m
+
+
+def _training_sample(vectors: np.ndarray, size: int) -> np.ndarray:
+    if size <= 0 or vectors.shape[0] <= size:
+        return vectors
+    rows = np.sort(np.random.default_rng(0).choice(vectors.shape[0], size, replace=False))
+    return np.ascontiguousarray(vectors[rows])
+
+
+def apply_search_params(index: faiss.Index, config: AnnIndexConfig) -> faiss.Index:
+    """Set the query-time knobs (nprobe for IVF, efSearch for HNSW) on ``index``."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = max(1, min(config.nprobe, ivf.nlist))
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = max(config.ef_search, 1)
+    return index
+
+
+def build_ann_index(vectors: np.ndarray, config: Optional[AnnIndexConfig] = None) -> faiss.Index:
+    """
+    Build an inner-product index over ``vectors``.
+
+    Args:
+        vectors (np.ndarray): float32 matrix with one L2-normalized embedding per row.
+        config (AnnIndexConfig, optional): Index settings, exact flat search by default.
+
+    Returns:
+        faiss.Index: Index holding every row, with the search parameters applied.
+    """
+    config = config or AnnIndexConfig()
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    params = config.build_params(n, dim)
+    index_type = params["type"]
+    start = time.perf_counter()
+
+    scalar_quantizer = _SCALAR_QUANTIZERS.get(params.get("precision"))
+    if index_type == "flat":
+        if scalar_quantizer is None:
+            index = faiss.IndexFlatIP(dim)
+        else:
+            index = faiss.IndexScalarQuantizer(dim, scalar_quantizer, faiss.METRIC_INNER_PRODUCT)
+    elif index_type == "hnsw":
+        if scalar_quantizer is None:
+            index = faiss.IndexHNSWFlat(dim, params["hnsw_m"], faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexHNSWSQ(dim, scalar_quantizer, params["hnsw_m"], faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = params["ef_construction"]
+    else:
+        quantizer = faiss.IndexFlatIP(dim)
+        if index_type == "ivf_flat" and scalar_quantizer is not None:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dim, params["nlist"], scalar_quantizer,
+                                                  faiss.METRIC_INNER_PRODUCT)
+        elif index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, params["nlist"], faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dim, params["nlist"], params["pq_m"], params["pq_nbits"],
+                                     faiss.METRIC_INNER_PRODUCT)
+    if not index.is_trained:
+        # IVF centroids and the per-dimension ranges of int8 scalar quantizers
+        index.train(_training_sample(vectors, config.train_sample))
+
+    index.add(vectors)
+    logger.info(f"Built {index_type} index over {n} vectors of dim {dim} "
+                f"in {time.perf_counter() - start:.2f}s ({params})")
+    return apply_search_params(index, config)
+
+
+def _index_file_name(params: Dict) -> str:
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return f"ann-{params['type']}-{digest}.faiss"
+
+
+def load_or_build_ann_index(vectors: np.ndarray, config: Optional[AnnIndexConfig] = None,
+                            store_dir: Optional[str] = None) -> faiss.Index:
+    """
+    Index ``vectors``, reusing a trained index saved in ``store_dir`` when its settings match.
+
+    Trained indexes (IVF, HNSW) are written next to the vector store, so they are rebuilt
+    whenever the store is, and a restart only pays for reading the file. Flat indexes are
+    cheap to rebuild and are never saved, unless quantized (which needs training).
+    """
+    config = config or AnnIndexConfig()
+    n, dim = vectors.shape
+    params = config.build_params(n, dim)
+    if (params["type"] == "flat" and "precision" not in params) or not store_dir or not os.path.isdir(store_dir):
+        return build_ann_index(vectors, config)
+
+    path = os.path.join(store_dir, _index_file_name(params))
+    if os.path.exists(path):
+        try:
+            index = faiss.read_index(path)
+            if index.ntotal == n and index.d == dim:
+                logger.info(f"Loaded {params['type']} index from {path}")
+                return apply_search_params(index, config)
+            logger.warning(f"Saved index {path} does not match the store, rebuilding")
+        except RuntimeError as e:
+            logger.warning(f"Could not read saved index {path}, rebuilding: {e}")
+
+    index = build_ann_index(vectors, config)
+    tmp_path = f"{path}.tmp"
+    try:
+        faiss.write_index(index, tmp_path)
+        os.replace(tmp_path, path)
+        # Drop indexes saved under other settings
+        for name in os.listdir(store_dir):
+            if name.startswith("ann-") and name.endswith(".faiss") and name != os.path.basename(path):
+                os.remove(os.path.join(store_dir, name))
+    except (OSError, RuntimeError) as e:
+        logger.warning(f"Could not save index to {path}: {e}")
+    return index
+
+
+def describe_index(index: faiss.Index) -> Dict:
+    """Short description of an index for logs and metrics."""
+    info = {"class": type(index).__name__, "ntotal": int(index.ntotal), "dim": int(index.d)}
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        info.update(nlist=int(ivf.nlist), nprobe=int(ivf.nprobe))
+    if isinstance(index, faiss.IndexHNSW):
+        info["ef_search"] = int(index.hnsw.efSearch)
+    return info
+
+
+def index_nbytes(index: faiss.Index) -> int:
+    """Approximate memory held by ``index``, for cache budgets."""
+    n, dim = int(index.ntotal), int(index.d)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        # Inverted lists store a code and an int64 id per vector, plus the coarse centroids
+        return n * (int(ivf.code_size) + 8) + int(ivf.nlist) * dim * 4
+    if isinstance(index, faiss.IndexHNSW):
+        # Vector storage plus about 2 * M int32 neighbour links per vector on the base layer
+        return n * (_code_size(index.storage, dim) + int(index.hnsw.nb_neighbors(0)) * 4)
+    return n * _code_size(index, dim)
+
+
+def _code_size(index: faiss.Index, dim: int) -> int:
+    """Bytes per stored vector of a flat or scalar-quantized index."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        return int(index.code_size)
+    return dim * 4
+
+
+def search_with_selector(index: faiss.Index, queries: np.ndarray, top_k: int, allowed: np.ndarray):
+    """
+    Search only the ids where ``allowed`` (a boolean mask over the index ids) is set.
+
+    Uses a FAISS ID selector, so IVF lists and HNSW neighbours outside the subset are
+    skipped during the search rather than filtered out afterwards.
+
+    Returns:
+        tuple: (distances, ids) like ``index.search``, padded with -1.
+    """
+    bitmap = np.packbits(np.asarray(allowed, dtype=bool), bitorder="little")
+    selector = faiss.IDSelectorBitmap(int(allowed.size), faiss.swig_ptr(bitmap))
+    if isinstance(index, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=index.nprobe)
+    elif isinstance(index, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    return index.search(np.ascontiguousarray(queries, dtype=np.float32), top_k, params=params)
+
+
+def search_hits(distances: np.ndarray, ids: np.ndarray) -> List[Tuple[List[int], List[float]]]:
+    """
+    Per-query ``(ids, scores)`` of a batched search, without the -1 padding.
+
+    IVF and HNSW searches pad a query's row with -1 when they find fewer than ``top_k``
+    neighbours; only that row is shortened, never the other queries of the batch. Cosine
+    scores are scaled to [0, 1] like FAISSRetriever does.
+    """
+    hits = []
+    for query_distances, query_ids in zip(distances, ids):
+        found = query_ids >= 0
+        hits.append((query_ids[found].tolist(), ((query_distances[found] + 1) / 2).tolist()))
+    return hits
+
+
+def rerank(candidates: np.ndarray, queries: np.ndarray, top_k: int,
+           vectors_for: Callable[[np.ndarray], np.ndarray]):
+    """
+    Re-score index candidates exactly and keep the best ``top_k`` per query.
+
+    Args:
+        candidates: ``(n_queries, k)`` ids from an index search, padded with -1.
+        queries: L2-normalized float32 query matrix.
+        vectors_for: Returns L2-normalized float32 rows for a sorted array of ids.
+
+    Returns:
+        tuple: (distances, ids) like ``index.search``, padded with -1.
+    """
+    ids = np.unique(candidates[candidates >= 0])
+    vectors = vectors_for(ids)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    distances = np.full((queries.shape[0], top_k), -np.inf, dtype=np.float32)
+    labels = np.full((queries.shape[0], top_k), -1, dtype=np.int64)
+    for q, row in enumerate(candidates):
+        row = row[row >= 0]
+        if row.size == 0:
+            continue
+        scores = vectors[np.searchsorted(ids, row)] @ queries[q]
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        distances[q, :order.size] = scores[order]
+        labels[q, :order.size] = row[order]
+    return distances, labels
+
+
+def exact_search(vectors: np.ndarray, ids: np.ndarray, queries: np.ndarray, top_k: int):
+    """
+    Brute-force inner-product search over ``vectors``, reporting ``ids[i]`` for row ``i``.
+
+    Returns:
+        tuple: (distances, ids) like ``index.search``, padded with -1.
+    """
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    distances = np.full((queries.shape[0], top_k), -np.inf, dtype=np.float32)
+    labels = np.full((queries.shape[0], top_k), -1, dtype=np.int64)
+    if len(ids) == 0:
+        return distances, labels
+    scores = queries @ np.asarray(vectors, dtype=np.float32).T
+    k = min(top_k, scores.shape[1])
+    best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    best_scores = np.take_along_axis(scores, best, axis=1)
+    order = np.argsort(-best_scores, axis=1, kind="stable")
+    distances[:, :k] = np.take_along_axis(best_scores, order, axis=1)
+    labels[:, :k] = np.asarray(ids, dtype=np.int64)[np.take_along_axis(best, order, axis=1)]
+    return distances, labels
@@ -0,0 +1,150 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from api.tools.project_parser import CodeParser
+
+logger = logging.getLogger(__name__)
+
+# Lines kept with the definition below them: decorators, annotations and comments
+_LEADING_PREFIXES = ("@", "#", "//", "/*", "*", "///")
+# Statements the Java/C#/C++ method patterns also match
+_STATEMENT_KEYWORDS = frozenset((
+    "return", "new", "throw", "else", "if", "for", "while", "switch", "catch", "case",
+    "await", "yield", "delete", "typeof", "do", "try",
+))
+
+
+@dataclass
+class CodeSplitterConfig:
+    """
+    Settings of the code-aware splitter (``text_splitter.code`` in embedder.json).
+
+    Source files are cut at class and function boundaries found by ``CodeParser`` and
+    neighbouring definitions are packed into chunks of at most ``chunk_size`` words
+    without overlap. Only a definition longer than ``chunk_size`` is split inside, at line
+    boundaries with ``chunk_overlap`` words of overlap. Files in other languages, or
+    without any definition found, go through the word splitter.
+    """
+    enabled: bool = True
+    chunk_size: int = 1000
+    chunk_overlap: int = 50
+
+    @classmethod
+    def from_dict(cls, config: Optional[Dict]) -> "CodeSplitterConfig":
+        config = config or {}
+        known = {k: v for k, v in config.items() if k in cls.__dataclass_fields__}
+        return cls(**known)
+
+
+def _word_count(lines: List[str]) -> int:
+    return sum(len(line.split()) for line in lines)
+
+
+def _definition_lines(parsed: Dict) -> List[int]:
+    """1-based line numbers of the classes, functions and methods in a CodeParser result."""
+    entries = list(parsed.get("functions", [])) + list(parsed.get("methods", []))
+    for cls in parsed.get("classes", []):
+        entries.append(cls)
+        entries.extend(cls.get("methods", []))
+    return [entry["line_number"] for entry in entries if isinstance(entry, dict) and entry.get("line_number")]
+
+
+def _is_definition(line: str) -> bool:
+    stripped = line.strip()
+    if not stripped or stripped.endswith(";"):
+        # Calls and prototypes, not definitions with a body
+        return False
+    first_word = stripped.split(None, 1)[0].split("(", 1)[0]
+    return first_word not in _STATEMENT_KEYWORDS
+
+
+def find_boundaries(lines: List[str], filename: str, parser: Optional[CodeParser] = None) -> Optional[List[int]]:
+    """
+    0-based line indexes where the definitions of a source file start, or None if its
+    language is not supported. Decorators and comments directly above a definition are
+    counted as part of it.
+    """
+    parser = parser or CodeParser()
+    if parser.detect_language(filename) == "unknown":
+        return None
+    parsed = parser.parse_code(filename, lines=lines)
+    if "error" in parsed:
+        logger.debug(f"Could not parse {filename}: {parsed['error']}")
+        return None
+
+    boundaries = set()
+    for line_number in _definition_lines(parsed):
+        start = line_number - 1
+        if not 0 <= start < len(lines) or not _is_definition(lines[start]):
+            continue
+        while start > 0 and lines[start - 1].strip().startswith(_LEADING_PREFIXES):
+            start -= 1
+        boundaries.add(start)
+    return sorted(boundaries)
+
+
+def _split_long_segment(lines: List[str], chunk_size: int, chunk_overlap: int) -> List[List[str]]:
+    """Split one oversized definition at line boundaries, carrying ``chunk_overlap`` words over."""
+    chunks, current, words = [], [], 0
+    for line in lines:
+        line_words = len(line.split())
+        if current and words + line_words > chunk_size:
+            chunks.append(current)
+            overlap, overlap_words = [], 0
+            for previous in reversed(current):
+                previous_words = len(previous.split())
+                if overlap_words + previous_words > chunk_overlap:
+                    break
+                overlap.insert(0, previous)
+                overlap_words += previous_words
+            current, words = overlap, overlap_words
+        current.append(line)
+        words += line_words
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def split_code(text: str, filename: str, chunk_size: int = 1000, chunk_overlap: int = 50,
+               parser: Optional[CodeParser] = None) -> Optional[List[str]]:
+    """
+    Split source code into chunks aligned to definition boundaries.
+
+    Args:
+        text (str): File content.
+        filename (str): File name or path, used to detect the language.
+        chunk_size (int): Maximum words per chunk.
+        chunk_overlap (int): Words repeated between the pieces of a definition longer than ``chunk_size``.
+        parser (CodeParser, optional): Parser to reuse across files.
+
+    Returns:
+        list or None: Chunk texts in file order, or None when the file should go through
+        the word splitter instead.
+    """
+    lines = text.splitlines(keepends=True)
+    boundaries = find_boundaries(lines, filename, parser)
+    if not boundaries:
+        return None
+
+    starts = [0] + [b for b in boundaries if b > 0]
+    segments = [lines[start:end] for start, end in zip(starts, starts[1:] + [len(lines)])]
+
+    chunks, current, words = [], [], 0
+    for segment in segments:
+        segment_words = _word_count(segment)
+        if segment_words > chunk_size:
+            if current:
+                chunks.append(current)
+                current, words = [], 0
+            chunks.extend(_split_long_segment(segment, chunk_size, chunk_overlap))
+            continue
+        if current and words + segment_words > chunk_size:
+            chunks.append(current)
+            current, words = [], 0
+        current.extend(segment)
+        words += segment_words
+    if current:
+        chunks.append(current)
+
+    return [text for text in ("".join(chunk) for chunk in chunks) if text.strip()]
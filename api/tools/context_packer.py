@@ -0,0 +1,312 @@
+import json
+import logging
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from api.tools.token_counter import CHARS_PER_TOKEN, DEFAULT_ENCODING, count_tokens, get_encoder
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTEXT_TOKENS = 16000
+DEFAULT_SECTION_SHARES = {"file_content": 0.3, "project_summary": 0.15, "call_graph": 0.2}
+
+TRUNCATION_MARK = "\n...[truncated]"
+# Separates chunks of one file that are not adjacent in it
+GAP_MARK = "\n\n...\n\n"
+_SEPARATOR = "\n\n" + "-" * 10
+# Characters of a chunk's start searched for in the previous chunk to find their overlap;
+# shorter overlaps are not detected
+_OVERLAP_PROBE = 32
+
+
+def count_prompt_tokens(text: str) -> int:
+    return count_tokens(text, DEFAULT_ENCODING)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """``text`` cut to at most ``max_tokens`` tokens, or unchanged if it fits."""
+    encoder = get_encoder(DEFAULT_ENCODING)
+    if encoder is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    tokens = encoder.encode_ordinary(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoder.decode(tokens[:max_tokens])
+
+
+def merge_overlap(first: str, second: str) -> Optional[str]:
+    """
+    Join two consecutive chunks whose texts overlap (the splitter repeats ``chunk_overlap``
+    words), keeping the shared part once. Returns None if no overlap is found.
+    """
+    probe = second[:_OVERLAP_PROBE]
+    if not probe:
+        return first
+    position = first.find(probe, max(0, len(first) - len(second)))
+    while position != -1:
+        if second.startswith(first[position:]):
+            return first[:position] + second
+        position = first.find(probe, position + 1)
+    return None
+
+
+def merge_file_chunks(chunks: Sequence) -> str:
+    """Text of one file's chunks in file order, with overlaps removed and gaps marked."""
+    ordered = sorted(chunks, key=lambda chunk: getattr(chunk, "order", None) or 0)
+    text, previous_order = "", None
+    for chunk in ordered:
+        order = getattr(chunk, "order", None)
+        if previous_order is not None and order == previous_order:
+            continue
+        if not text:
+            text = chunk.text
+        elif order is not None and previous_order is not None and order == previous_order + 1:
+            merged = merge_overlap(text, chunk.text)
+            text = merged if merged is not None else f"{text}\n{chunk.text}"
+        else:
+            text = f"{text}{GAP_MARK}{chunk.text}"
+        previous_order = order
+    return text
+
+
+def compact_json(data: Any) -> str:
+    # Indentation costs tokens without helping the model
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def _node_id(node: Any) -> Any:
+    return node.get("id", node.get("name")) if isinstance(node, dict) else node
+
+
+def _keep_summaries(data: Dict) -> Tuple[int, Callable[[int], Dict]]:
+    """Per-file summaries of an ``extract_key_info`` layout, kept in module order."""
+    modules = data["modules"]
+    total = sum(len(module.get("files") or []) for module in modules.values() if isinstance(module, dict))
+
+    def build(keep: int) -> Dict:
+        kept = {}
+        for name, module in modules.items():
+            if isinstance(module, dict) and isinstance(module.get("files"), list):
+                files = module["files"][:keep]
+                keep -= len(files)
+                module = {**module, "files": files}
+            kept[name] = module
+        return {**data, "modules": kept}
+    return total, build
+
+
+def _keep_call_graph(data: Dict) -> Tuple[int, Callable[[int], Dict]]:
+    """Call graph nodes (``nodes_by_file`` or ``nodes``) with the edges between kept nodes."""
+    by_file = data.get("nodes_by_file")
+    if isinstance(by_file, dict):
+        nodes = [(path, node) for path, file_nodes in by_file.items() for node in file_nodes or []]
+    else:
+        nodes = [(None, node) for node in data.get("nodes") or []]
+    edges = data.get("edges") or []
+
+    def build(keep: int) -> Dict:
+        kept = nodes[:keep]
+        ids = {_node_id(node) for _, node in kept}
+        result = dict(data)
+        if isinstance(by_file, dict):
+            result["nodes_by_file"] = {}
+            for path, node in kept:
+                result["nodes_by_file"].setdefault(path, []).append(node)
+        else:
+            result["nodes"] = [node for _, node in kept]
+        if "edges" in data:
+            result["edges"] = [edge for edge in edges
+                               if isinstance(edge, (list, tuple)) and len(edge) >= 2
+                               and edge[0] in ids and edge[1] in ids]
+        return result
+    return len(nodes), build
+
+
+def _keep_list(data: Any) -> Optional[Tuple[int, Callable[[int], Any]]]:
+    """How to keep the first items of the JSON value's main list, or None if it has none."""
+    if isinstance(data, list):
+        return len(data), lambda keep: data[:keep]
+    if not isinstance(data, dict):
+        return None
+    if isinstance(data.get("modules"), dict):
+        return _keep_summaries(data)
+    if isinstance(data.get("nodes_by_file"), dict) or isinstance(data.get("nodes"), list):
+        return _keep_call_graph(data)
+    lists = [key for key, value in data.items() if isinstance(value, list) and value]
+    if not lists:
+        return None
+    key = max(lists, key=lambda k: len(compact_json(data[k])))
+    return len(data[key]), lambda keep: {**data, key: data[key][:keep]}
+
+
+@dataclass
+class SectionUsage:
+    """Tokens one prompt section was allowed and actually used."""
+    budget: int
+    tokens: int = 0
+    items: int = 0
+    dropped: int = 0
+    truncated: bool = False
+
+
+class ContextPacker:
+    """
+    Assembles the retrieved context of a prompt within a token budget.
+
+    The budget comes from the ``context_budget`` section of generator.json for the chosen
+    model. Fixed sections (current file, project summary, call graph) are capped at their
+    share of it and truncated when longer; retrieved chunks then get whatever is left and
+    are packed greedily in rank order, with neighbouring chunks of a file merged back
+    into one passage. ``usage`` records the tokens each section consumed.
+    """
+
+    def __init__(self, total_tokens: int = DEFAULT_CONTEXT_TOKENS, section_shares: Optional[Dict[str, float]] = None,
+                 count_tokens: Callable[[str], int] = count_prompt_tokens,
+                 truncate: Callable[[str, int], str] = truncate_to_tokens):
+        self.total_tokens = total_tokens
+        self.section_shares = dict(DEFAULT_SECTION_SHARES if section_shares is None else section_shares)
+        self.count_tokens = count_tokens
+        self.truncate = truncate
+        self.usage: Dict[str, SectionUsage] = {}
+
+    @classmethod
+    def for_model(cls, config: Optional[Dict], model: Optional[str], **kwargs) -> "ContextPacker":
+        """
+        Packer with the budget of ``model``.
+
+        Args:
+            config (dict, optional): ``context_budget`` section of generator.json with
+                ``default_tokens``, per-model ``models`` budgets and ``sections`` shares.
+            model (str, optional): Model name as used in generator.json.
+        """
+        config = config or {}
+        total = (config.get("models") or {}).get(model) or config.get("default_tokens", DEFAULT_CONTEXT_TOKENS)
+        return cls(int(total), config.get("sections"), **kwargs)
+
+    @property
+    def used_tokens(self) -> int:
+        return sum(usage.tokens for usage in self.usage.values())
+
+    @property
+    def remaining_tokens(self) -> int:
+        return max(0, self.total_tokens - self.used_tokens)
+
+    def section_budget(self, name: str) -> int:
+        share = self.section_shares.get(name)
+        if share is None:
+            return self.remaining_tokens
+        return min(int(self.total_tokens * share), self.remaining_tokens)
+
+    def pack_text(self, name: str, text: str) -> str:
+        """``text`` as a section, truncated to the section's budget."""
+        usage = self.usage[name] = SectionUsage(budget=self.section_budget(name))
+        if not text:
+            return text
+        tokens = self.count_tokens(text)
+        if tokens > usage.budget:
+            text = self.truncate(text, max(0, usage.budget - self.count_tokens(TRUNCATION_MARK))) + TRUNCATION_MARK
+            tokens = self.count_tokens(text)
+            usage.truncated = True
+        usage.tokens, usage.items = tokens, 1
+        return text
+
+    def pack_json(self, name: str, data: Any) -> str:
+        """
+        ``data`` as compact JSON within the section's budget.
+
+        A value that does not fit loses whole items from its end until it does, so the
+        section stays valid JSON: per-file summaries of a project summary, nodes of a call
+        graph (keeping only edges between kept nodes) or entries of a list. A truncated object is
+        marked ``"truncated": true``.
+        """
+        usage = self.usage[name] = SectionUsage(budget=self.section_budget(name))
+        if not data:
+            return ""
+        text = compact_json(data)
+        tokens = self.count_tokens(text)
+        if tokens <= usage.budget:
+            usage.tokens, usage.items = tokens, 1
+            return text
+
+        usage.truncated = True
+        if isinstance(data, str):
+            text = compact_json(self.truncate(data, max(0, usage.budget - self.count_tokens(TRUNCATION_MARK) - 2))
+                                + TRUNCATION_MARK)
+            usage.tokens, usage.items = self.count_tokens(text), 1
+            return text
+        shrinkable = _keep_list(data)
+        if shrinkable is None:
+            usage.dropped = 1
+            return ""
+
+        total, build = shrinkable
+
+        def render(keep: int) -> str:
+            value = build(keep)
+            if isinstance(value, dict):
+                value = {**value, "truncated": True}
+            return compact_json(value)
+
+        # Largest number of items that fits; each count costs one serialization and count
+        low, high, best = 0, total - 1, None
+        while low <= high:
+            keep = (low + high) // 2
+            candidate = render(keep)
+            candidate_tokens = self.count_tokens(candidate)
+            if candidate_tokens <= usage.budget:
+                best, low = (keep, candidate, candidate_tokens), keep + 1
+            else:
+                high = keep - 1
+        if best is None:
+            usage.dropped = total
+            return ""
+        keep, text, usage.tokens = best
+        usage.items, usage.dropped = keep, total - keep
+        return text
+
+    def pack_documents(self, documents: Sequence, name: str = "documents") -> str:
+        """
+        Render the best-ranked chunks that fit the remaining budget, grouped by file.
+
+        Args:
+            documents: Retrieved chunks, best first, with ``text``, ``meta_data['file_path']``
+                and, for merging neighbours, the splitter's ``order``.
+        """
+        usage = self.usage[name] = SectionUsage(budget=self.section_budget(name))
+        selected: Dict[str, List] = {}
+        used = 0
+        for document in documents:
+            file_path = (getattr(document, "meta_data", None) or {}).get("file_path", "unknown")
+            cost = self.count_tokens(document.text) + (0 if file_path in selected else self._header_tokens(file_path))
+            if used + cost > usage.budget:
+                usage.dropped += 1
+                continue
+            selected.setdefault(file_path, []).append(document)
+            used += cost
+            usage.items += 1
+
+        if not selected and documents:
+            # Not even the best chunk fits; keep as much of it as the budget allows
+            best = documents[0]
+            file_path = (getattr(best, "meta_data", None) or {}).get("file_path", "unknown")
+            room = usage.budget - self._header_tokens(file_path)
+            if room > 0:
+                selected[file_path] = [SimpleNamespace(text=self.truncate(best.text, room), order=None)]
+                usage.items, usage.dropped, usage.truncated = 1, len(documents) - 1, True
+            else:
+                usage.dropped = len(documents)
+
+        context_parts = [f"## File Path: {file_path}\n\n{merge_file_chunks(chunks)}" for file_path, chunks in selected.items()]
+        text = _SEPARATOR + "\n\n".join(context_parts) if context_parts else ""
+        usage.tokens = self.count_tokens(text) if text else 0
+        return text
+
+    def _header_tokens(self, file_path: str) -> int:
+        return self.count_tokens(f"## File Path: {file_path}\n\n") + self.count_tokens(_SEPARATOR)
+
+    def report(self) -> Dict[str, Dict]:
+        """Budget and usage per section, for logs."""
+        report = {name: dict(usage.__dict__) for name, usage in self.usage.items()}
+        report["total"] = {"budget": self.total_tokens, "tokens": self.used_tokens}
+        return report
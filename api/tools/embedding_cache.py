@@ -0,0 +1,206 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_FILE = "embedding_cache.sqlite"
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH = 500
+
+# After eviction the cache is trimmed to this fraction of its budget, so it does not evict on every write
+_EVICT_TO = 0.9
+
+
+def embedding_cache_key(model: str, dimensions, text: str) -> bytes:
+    """Content address of one embedding: sha256 over model, dimensions and chunk text."""
+    digest = hashlib.sha256()
+    digest.update(f"{model}\0{dimensions}\0".encode("utf-8"))
+    digest.update(text.encode("utf-8", "surrogatepass"))
+    return digest.digest()
+
+
+@dataclass
+class EmbeddingCacheStats:
+    """Counters of an EmbeddingCache since the process started."""
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return round(self.hits / lookups, 3) if lookups else 0.0
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed cache of chunk embeddings in a SQLite file.
+
+    Embeddings are keyed by hash(model, dimensions, text), so identical chunks in forks,
+    branches or vendored code are embedded once across all repositories. Entries record
+    when they were last used and the least recently used ones are evicted once the
+    stored vectors exceed ``max_bytes``.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 4 * 1024 ** 3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.stats = EmbeddingCacheStats()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key BLOB PRIMARY KEY, vector BLOB NOT NULL, size INTEGER NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        # Running estimate of the stored bytes; recounted exactly only when it crosses the budget
+        self._approx_bytes = self._total_bytes()
+
+    def _total_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[List[float]]]:
+        """Cached vectors for ``keys`` in order, None where missing."""
+        found: Dict[bytes, bytes] = {}
+        now = int(time.time())
+        with self._lock:
+            unique = list(dict.fromkeys(keys))
+            for start in range(0, len(unique), _SQL_BATCH):
+                batch = unique[start:start + _SQL_BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", batch)
+                found.update(rows.fetchall())
+                hit_keys = [key for key in batch if key in found]
+                if hit_keys:
+                    marks = ",".join("?" * len(hit_keys))
+                    self._conn.execute(f"UPDATE embeddings SET last_used = ? WHERE key IN ({marks})", [now, *hit_keys])
+            self._conn.commit()
+
+            results = [np.frombuffer(found[key], dtype=np.float32).tolist() if key in found else None for key in keys]
+            hits = sum(1 for result in results if result is not None)
+            self.stats.hits += hits
+            self.stats.misses += len(keys) - hits
+        return results
+
+    def put_many(self, keys: Sequence[bytes], vectors: Sequence) -> None:
+        """Store vectors; entries with an empty or missing vector are skipped."""
+        now = int(time.time())
+        rows = []
+        for key, vector in zip(keys, vectors):
+            if vector is None or len(vector) == 0:
+                continue
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((key, blob, len(blob), now))
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, size, last_used) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+            self.stats.writes += len(rows)
+            self._approx_bytes += sum(row[2] for row in rows)
+            if self._approx_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        total = self._total_bytes()
+        self._approx_bytes = total
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * _EVICT_TO)
+        cursor = self._conn.execute("SELECT key, size FROM embeddings ORDER BY last_used ASC")
+        doomed = []
+        for key, size in cursor:
+            if total <= target:
+                break
+            doomed.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", doomed)
+        self._conn.commit()
+        self.stats.evictions += len(doomed)
+        self._approx_bytes = total
+        logger.info(f"Evicted {len(doomed)} embeddings from {self.path}")
+
+    def embed(self, texts: Sequence[str], model: str, dimensions,
+              embed_func: Callable[[List[str]], Sequence]) -> List[Optional[List[float]]]:
+        """
+        Embed ``texts``, calling ``embed_func`` only for texts that are not cached.
+
+        ``embed_func`` receives the missing texts (each distinct text once) and must return
+        one vector per text, or None where embedding failed.
+        """
+        keys = [embedding_cache_key(model, dimensions, text) for text in texts]
+        results = self.get_many(keys)
+        missing: Dict[bytes, str] = {}
+        for key, text, result in zip(keys, texts, results):
+            if result is None:
+                missing.setdefault(key, text)
+        if missing:
+            vectors = list(embed_func(list(missing.values())))
+            self.put_many(list(missing.keys()), vectors)
+            fresh = dict(zip(missing.keys(), vectors))
+            results = [fresh.get(key) if result is None else result for key, result in zip(keys, results)]
+        return results
+
+    def summary(self) -> Dict:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings").fetchone()
+            self._approx_bytes = size
+        return {
+            "hits": self.stats.hits,
+            "misses": self.stats.misses,
+            "hit_rate": self.stats.hit_rate,
+            "writes": self.stats.writes,
+            "evictions": self.stats.evictions,
+            "entries": entries,
+            "total_bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_shared_cache: Optional[EmbeddingCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_embedding_cache(config: Optional[Dict] = None, root_path: str = None) -> Optional[EmbeddingCache]:
+    """
+    Process-wide EmbeddingCache, or None when disabled.
+
+    Args:
+        config (dict, optional): ``embedding_cache`` section of embedder.json with
+            ``enabled``, ``max_size_mb`` and an optional ``path``.
+        root_path (str, optional): Directory for the default cache file, ``~/.adalflow``.
+    """
+    global _shared_cache
+    config = config or {}
+    if not config.get("enabled", True):
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            root_path = root_path or os.path.join(os.path.expanduser("~"), ".adalflow")
+            path = config.get("path") or os.path.join(root_path, DEFAULT_CACHE_FILE)
+            try:
+                _shared_cache = EmbeddingCache(path, max_bytes=int(config.get("max_size_mb", 4096)) * 1024 * 1024)
+            except sqlite3.Error as e:
+                logger.error(f"Could not open embedding cache {path}: {e}")
+                return None
+        return _shared_cache
@@ -0,0 +1,114 @@
+import fnmatch
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from api.tools.file_walker import RepoFile
+
+logger = logging.getLogger(__name__)
+
+# Reasons a file is left out of the index, as recorded in the ingest report
+SKIP_TOO_LARGE = "too_large"
+SKIP_BINARY = "binary"
+SKIP_MINIFIED = "minified"
+SKIP_TOKEN_LIMIT = "token_limit"
+SKIP_READ_ERROR = "read_error"
+
+# Control bytes that do not occur in text files; tab, newline, form feed, carriage return,
+# escape and backspace do
+_TEXT_CONTROL_BYTES = frozenset(b"\t\n\x0c\r\x1b\x08")
+_BINARY_CONTROL_BYTES = bytes(b for b in range(32) if b not in _TEXT_CONTROL_BYTES)
+
+
+@dataclass
+class FileGateConfig:
+    """
+    Checks that skip files before they are read (``ingest.file_gate`` in repo.json).
+
+    A file is skipped when ``os.stat`` reports more than ``max_code_bytes`` (code) or
+    ``max_doc_bytes`` (documentation) bytes, or more than ``max_bytes_by_extension`` for its
+    extension. Otherwise its first ``sniff_bytes`` bytes are inspected: NUL bytes or mostly
+    control characters mark it binary, and in code and ``minified_extensions`` files, a
+    line of at least ``max_line_length`` characters in a sample averaging at least
+    ``minified_avg_line_length`` characters per line marks it minified or generated, as do
+    names matching ``minified_patterns``.
+    """
+    enabled: bool = True
+    max_code_bytes: int = 2_000_000
+    max_doc_bytes: int = 1_000_000
+    max_bytes_by_extension: Dict[str, int] = field(default_factory=lambda: {".json": 500_000})
+    sniff_bytes: int = 8192
+    max_line_length: int = 1000
+    minified_avg_line_length: int = 300
+    minified_extensions: List[str] = field(default_factory=lambda: [".json"])
+    minified_patterns: List[str] = field(default_factory=lambda: ["*.min.*", "*-min.*", "*.bundle.js", "*.chunk.js"])
+
+    @classmethod
+    def from_dict(cls, config: Optional[Dict]) -> "FileGateConfig":
+        config = config or {}
+        known = {k: v for k, v in config.items() if k in cls.__dataclass_fields__}
+        return cls(**known)
+
+    def max_bytes(self, repo_file: RepoFile) -> int:
+        limit = self.max_bytes_by_extension.get(repo_file.extension)
+        if limit is not None:
+            return limit
+        return self.max_code_bytes if repo_file.is_code else self.max_doc_bytes
+
+
+def looks_binary(sample: bytes) -> bool:
+    """True if ``sample`` holds a NUL byte or more than 30% control characters."""
+    if not sample:
+        return False
+    if b"\0" in sample:
+        return True
+    control = len(sample) - len(sample.translate(None, _BINARY_CONTROL_BYTES))
+    return control / len(sample) > 0.3
+
+
+def looks_minified(sample: bytes, max_line_length: int, min_avg_line_length: int) -> bool:
+    """True if ``sample`` has very long lines throughout, as minified bundles and generated data do."""
+    if len(sample) < max_line_length:
+        return False
+    lines = sample.split(b"\n")
+    longest = max(len(line) for line in lines)
+    return longest >= max_line_length and len(sample) / len(lines) >= min_avg_line_length
+
+
+def check_file(repo_file: RepoFile, config: FileGateConfig) -> Optional[Tuple[str, str]]:
+    """
+    Decide whether ``repo_file`` is worth reading, using only its size and first bytes.
+
+    Returns:
+        tuple or None: (skip reason, detail) for a file to skip, None for one to read.
+    """
+    if not config.enabled:
+        return None
+    try:
+        size = os.stat(repo_file.path).st_size
+    except OSError as e:
+        return SKIP_READ_ERROR, str(e)
+
+    limit = config.max_bytes(repo_file)
+    if limit > 0 and size > limit:
+        return SKIP_TOO_LARGE, f"{size} bytes > {limit}"
+
+    check_minified = repo_file.is_code or repo_file.extension in config.minified_extensions
+    name = os.path.basename(repo_file.path)
+    if check_minified and any(fnmatch.fnmatchcase(name, pattern) for pattern in config.minified_patterns):
+        return SKIP_MINIFIED, "file name"
+
+    if config.sniff_bytes <= 0 or size == 0:
+        return None
+    try:
+        with open(repo_file.path, "rb") as f:
+            sample = f.read(config.sniff_bytes)
+    except OSError as e:
+        return SKIP_READ_ERROR, str(e)
+
+    if looks_binary(sample):
+        return SKIP_BINARY, "control characters in the first bytes"
+    if check_minified and looks_minified(sample, config.max_line_length, config.minified_avg_line_length):
+        return SKIP_MINIFIED, "long lines in the first bytes"
+    return None
@@ -0,0 +1,177 @@
+import fnmatch
+import logging
+import os
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# File extensions picked up by the ingestion pipeline, code files first
+CODE_EXTENSIONS = (".py", ".js", ".ts", ".java", ".cpp", ".c", ".h", ".hpp", ".go", ".rs",
+                   ".jsx", ".tsx", ".html", ".css", ".php", ".swift", ".cs")
+DOC_EXTENSIONS = (".md", ".txt", ".rst", ".json", ".yaml", ".yml")
+
+
+class RepoFile(NamedTuple):
+    """A candidate file found while walking a repository."""
+    path: str
+    relative_path: str
+    extension: str
+    is_code: bool
+
+
+def clean_dir_pattern(pattern: str) -> str:
+    """
+    Normalize a directory filter such as "./node_modules/" to "node_modules".
+
+    Only a leading "./" and trailing separators are removed, so hidden directories
+    like "./.git/" keep their leading dot.
+    """
+    pattern = pattern.strip().replace("\\", "/")
+    while pattern.startswith("./"):
+        pattern = pattern[2:]
+    return pattern.strip("/")
+
+
+class _PathFilter:
+    """Precomputed inclusion/exclusion rules used by the walker."""
+
+    def __init__(self, excluded_dirs: Optional[Iterable[str]], excluded_files: Optional[Iterable[str]],
+                 included_dirs: Optional[Iterable[str]], included_files: Optional[Iterable[str]]):
+        self.use_inclusion = bool(included_dirs) or bool(included_files)
+
+        # Directory rules: single names are matched against any path component,
+        # multi-component rules ("src/generated") against the relative path
+        self.excluded_dir_names, self.excluded_dir_paths = self._split_dir_rules(excluded_dirs)
+        self.included_dir_names, self.included_dir_paths = self._split_dir_rules(included_dirs)
+
+        # File rules: exact names go through a set lookup, wildcards through fnmatch
+        self.excluded_file_names = set()
+        self.excluded_file_globs = []
+        for pattern in excluded_files or []:
+            if any(ch in pattern for ch in "*?["):
+                self.excluded_file_globs.append(pattern)
+            else:
+                self.excluded_file_names.add(pattern)
+        self.included_files = [pattern for pattern in included_files or [] if pattern]
+
+    @staticmethod
+    def _split_dir_rules(patterns: Optional[Iterable[str]]):
+        names, paths = set(), []
+        for pattern in patterns or []:
+            cleaned = clean_dir_pattern(pattern)
+            if not cleaned:
+                continue
+            if "/" in cleaned:
+                paths.append(cleaned)
+            else:
+                names.add(cleaned)
+        return names, paths
+
+    @staticmethod
+    def _matches_dir(name: str, relative_dir: str, names: set, paths: List[str]) -> bool:
+        if name in names:
+            return True
+        for path in paths:
+            if relative_dir == path or relative_dir.endswith("/" + path):
+                return True
+        return False
+
+    def prune_dir(self, name: str, relative_dir: str) -> bool:
+        """Return True if the directory (and everything below it) can be skipped."""
+        if self.use_inclusion:
+            # An included directory may live anywhere below this one
+            return False
+        return self._matches_dir(name, relative_dir, self.excluded_dir_names, self.excluded_dir_paths)
+
+    def accept_file(self, name: str, relative_dir: str) -> bool:
+        """Return True if a file in ``relative_dir`` passes the file and directory rules."""
+        if self.use_inclusion:
+            if not self.included_dir_names and not self.included_dir_paths and not self.included_files:
+                return True
+            if relative_dir:
+                parts = relative_dir.split("/")
+                if any(part in self.included_dir_names for part in parts):
+                    return True
+                for path in self.included_dir_paths:
+                    if relative_dir == path or relative_dir.startswith(path + "/") or f"/{path}/" in f"/{relative_dir}/":
+                        return True
+            return any(name == pattern or name.endswith(pattern) for pattern in self.included_files)
+
+        if name in self.excluded_file_names:
+            return False
+        return not any(fnmatch.fnmatchcase(name, pattern) for pattern in self.excluded_file_globs)
+
+
+def iter_repository_files(root: str,
+                          code_extensions: Iterable[str] = CODE_EXTENSIONS,
+                          doc_extensions: Iterable[str] = DOC_EXTENSIONS,
+                          excluded_dirs: Optional[Iterable[str]] = None,
+                          excluded_files: Optional[Iterable[str]] = None,
+                          included_dirs: Optional[Iterable[str]] = None,
+                          included_files: Optional[Iterable[str]] = None) -> Iterator[RepoFile]:
+    """
+    Walk a repository once and lazily yield the files the ingestion pipeline should read.
+
+    Excluded directories are pruned before they are descended into and extensions are
+    dispatched through a set lookup, so the cost is a single ``os.scandir`` per directory.
+    Like the recursive globs this replaces, hidden files and directories are skipped and
+    directory symlinks are not followed. Entries are visited in sorted order so the output
+    is deterministic.
+
+    Args:
+        root (str): The repository root directory.
+        code_extensions (Iterable[str]): Extensions treated as code files.
+        doc_extensions (Iterable[str]): Extensions treated as documentation files.
+        excluded_dirs (Iterable[str], optional): Directories to skip in exclusion mode.
+        excluded_files (Iterable[str], optional): File names or glob patterns to skip in exclusion mode.
+        included_dirs (Iterable[str], optional): Directories to include exclusively.
+        included_files (Iterable[str], optional): File names or suffixes to include exclusively.
+
+    Yields:
+        RepoFile: The absolute path, relative path, extension and code flag of each candidate.
+    """
+    code_ext = frozenset(code_extensions)
+    doc_ext = frozenset(doc_extensions) - code_ext
+    path_filter = _PathFilter(excluded_dirs, excluded_files, included_dirs, included_files)
+
+    stack = [(root, "")]
+    while stack:
+        dir_path, relative_dir = stack.pop()
+        try:
+            with os.scandir(dir_path) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError as e:
+            logger.warning(f"Cannot list directory {dir_path}: {e}")
+            continue
+
+        subdirs = []
+        for entry in entries:
+            name = entry.name
+            if name.startswith("."):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    child_dir = f"{relative_dir}/{name}" if relative_dir else name
+                    if not path_filter.prune_dir(name, child_dir):
+                        subdirs.append((entry.path, child_dir))
+                    continue
+                ext = os.path.splitext(name)[1]
+                if ext in code_ext:
+                    is_code = True
+                elif ext in doc_ext:
+                    is_code = False
+                else:
+                    continue
+                if not entry.is_file():
+                    continue
+            except OSError as e:
+                logger.warning(f"Cannot stat {entry.path}: {e}")
+                continue
+
+            if not path_filter.accept_file(name, relative_dir):
+                continue
+            relative_path = f"{relative_dir}/{name}" if relative_dir else name
+            yield RepoFile(entry.path, relative_path.replace("/", os.sep), ext, is_code)
+
+        # Push in reverse so directories are visited in sorted order
+        stack.extend(reversed(subdirs))
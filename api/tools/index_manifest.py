@@ -0,0 +1,191 @@
+import json
+import logging
+import os
+import subprocess
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+def manifest_path_for(db_path: str) -> str:
+    """Path of the manifest stored next to a database file, e.g. repo.pkl -> repo.manifest.json."""
+    base, _ = os.path.splitext(db_path)
+    return f"{base}.manifest.json"
+
+
+def _normalize(relative_path: str) -> str:
+    return relative_path.replace(os.sep, "/")
+
+
+def _run_git(repo_dir: str, args: List[str]) -> Optional[bytes]:
+    try:
+        result = subprocess.run(
+            ["git", "-C", repo_dir, *args],
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        return result.stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def git_blob_shas(repo_dir: str) -> Dict[str, str]:
+    """
+    Blob SHAs of tracked files whose working copy matches the index.
+
+    Files with local modifications are left out so callers fall back to stat-based
+    fingerprints for them. Returns an empty dict when ``repo_dir`` is not a git checkout.
+    """
+    staged = _run_git(repo_dir, ["ls-files", "-s", "-z"])
+    if staged is None:
+        return {}
+
+    shas = {}
+    for entry in staged.split(b"\0"):
+        if not entry:
+            continue
+        # Format: "<mode> <sha> <stage>\t<path>"
+        meta, _, path = entry.partition(b"\t")
+        parts = meta.split()
+        if len(parts) == 3:
+            shas[path.decode("utf-8", "surrogateescape")] = parts[1].decode("ascii")
+
+    # ls-files prints paths relative to repo_dir, also when it is a subdirectory of the
+    # checkout; git diff would print them relative to the checkout root
+    modified = _run_git(repo_dir, ["ls-files", "-m", "-z"])
+    if modified:
+        for path in modified.split(b"\0"):
+            if path:
+                shas.pop(path.decode("utf-8", "surrogateescape"), None)
+    return shas
+
+
+def stat_fingerprint(path: str) -> Optional[str]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"stat:{st.st_mtime_ns}:{st.st_size}"
+
+
+def compute_fingerprints(repo_dir: str, files: Iterable) -> Dict[str, str]:
+    """
+    Fingerprint each file: its git blob SHA when clean in a git checkout, else mtime and size.
+
+    Args:
+        repo_dir (str): Repository root.
+        files (Iterable): ``RepoFile`` entries from the walker.
+
+    Returns:
+        Dict[str, str]: Fingerprint keyed by "/"-separated relative path.
+    """
+    blob_shas = git_blob_shas(repo_dir)
+    fingerprints = {}
+    for repo_file in files:
+        relative_path = _normalize(repo_file.relative_path)
+        sha = blob_shas.get(relative_path)
+        fingerprint = f"git:{sha}" if sha else stat_fingerprint(repo_file.path)
+        if fingerprint is not None:
+            fingerprints[relative_path] = fingerprint
+    return fingerprints
+
+
+@dataclass
+class ManifestEntry:
+    """Indexing state of one file."""
+    fingerprint: str
+    chunk_ids: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ManifestDiff:
+    """Files grouped by how they changed since the manifest was written."""
+    added: List[str] = field(default_factory=list)
+    modified: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> List[str]:
+        return self.added + self.modified
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.modified or self.deleted)
+
+    def summary(self) -> str:
+        return (f"{len(self.added)} added, {len(self.modified)} modified, "
+                f"{len(self.deleted)} deleted, {len(self.unchanged)} unchanged")
+
+
+@dataclass
+class IndexManifest:
+    """
+    Per-file manifest stored next to a repository database.
+
+    Records the fingerprint and chunk ids of every indexed file together with the
+    embedding model, so a refresh can re-embed only added or modified files.
+    """
+    embedder: Dict = field(default_factory=dict)
+    files: Dict[str, ManifestEntry] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["IndexManifest"]:
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != MANIFEST_VERSION:
+                logger.warning(f"Ignoring manifest {path} with unsupported version {data.get('version')}")
+                return None
+            files = {p: ManifestEntry(**entry) for p, entry in data.get("files", {}).items()}
+            return cls(embedder=data.get("embedder", {}), files=files)
+        except Exception as e:
+            logger.error(f"Error loading index manifest {path}: {e}")
+            return None
+
+    def save(self, path: str) -> None:
+        data = {
+            "version": MANIFEST_VERSION,
+            "embedder": self.embedder,
+            "files": {p: {"fingerprint": e.fingerprint, "chunk_ids": e.chunk_ids} for p, e in self.files.items()},
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def diff(self, fingerprints: Dict[str, str]) -> ManifestDiff:
+        result = ManifestDiff()
+        for path, fingerprint in fingerprints.items():
+            entry = self.files.get(path)
+            if entry is None:
+                result.added.append(path)
+            elif entry.fingerprint != fingerprint:
+                result.modified.append(path)
+            else:
+                result.unchanged.append(path)
+        result.deleted = [path for path in self.files if path not in fingerprints]
+        return result
+
+    @classmethod
+    def from_documents(cls, embedder: Dict, fingerprints: Dict[str, str], chunks: Iterable) -> "IndexManifest":
+        """Build a manifest from fingerprints and the split chunks produced for those files."""
+        return cls.from_records(embedder, fingerprints,
+                                ({"id": chunk.id, "meta_data": chunk.meta_data} for chunk in chunks))
+
+    @classmethod
+    def from_records(cls, embedder: Dict, fingerprints: Dict[str, str], records: Iterable[Dict]) -> "IndexManifest":
+        """Build a manifest from chunk metadata records, as stored in a vector store."""
+        files = {path: ManifestEntry(fingerprint=fp) for path, fp in fingerprints.items()}
+        for record in records:
+            path = _normalize((record.get("meta_data") or {}).get("file_path", ""))
+            if path in files:
+                files[path].chunk_ids.append(record.get("id"))
+        return cls(embedder=embedder, files=files)
@@ -0,0 +1,283 @@
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from api.tools.file_gate import SKIP_READ_ERROR, FileGateConfig, check_file
+from api.tools.file_walker import RepoFile
+from api.tools.token_counter import count_tokens_many, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Below this much text, spinning up tokenizer processes costs more than it saves
+MIN_PARALLEL_TOKENIZE_CHARS = 2_000_000
+
+
+def _count_tokens_batch(encoding_name: str, texts: List[str]) -> List[int]:
+    """Count tokens for a batch of texts. Runs inside tokenizer worker processes."""
+    return count_tokens_many(texts, encoding_name, num_threads=1)
+
+
+def ingest_report_path_for(db_path: str) -> str:
+    """Path of the ingest report stored next to a database file, e.g. repo.pkl -> repo.ingest_report.json."""
+    base, _ = os.path.splitext(db_path)
+    return f"{base}.ingest_report.json"
+
+
+@dataclass
+class IngestRecord:
+    """
+    The content and token count of one repository file, or the error that prevented reading it.
+
+    Files rejected by the file gate are not read; ``skip_reason`` and ``skip_detail`` say why.
+    """
+    repo_file: RepoFile
+    content: Optional[str] = None
+    token_count: int = 0
+    error: Optional[str] = None
+    skip_reason: Optional[str] = None
+    skip_detail: str = ""
+
+
+@dataclass
+class IngestStats:
+    """Per-stage wall-clock timings of an ingestion run, in seconds."""
+    files: int = 0
+    read_errors: int = 0
+    skipped: int = 0
+    walk_seconds: float = 0.0
+    read_seconds: float = 0.0
+    tokenize_seconds: float = 0.0
+    read_workers: int = 1
+    token_workers: int = 1
+
+    @property
+    def total_seconds(self) -> float:
+        return self.walk_seconds + self.read_seconds + self.tokenize_seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "files": self.files,
+            "read_errors": self.read_errors,
+            "skipped": self.skipped,
+            "walk_seconds": round(self.walk_seconds, 3),
+            "read_seconds": round(self.read_seconds, 3),
+            "tokenize_seconds": round(self.tokenize_seconds, 3),
+            "total_seconds": round(self.total_seconds, 3),
+            "read_workers": self.read_workers,
+            "token_workers": self.token_workers,
+        }
+
+
+@dataclass
+class IngestConfig:
+    """
+    Concurrency settings for the read and tokenize stages.
+
+    ``read_workers`` threads open and decode files; ``token_workers`` processes run tiktoken.
+    A value of 0 picks a default from the CPU count, 1 runs the stage serially.
+    When indexing streams, files are read ``stream_batch_files`` at a time and at most
+    ``stream_queue_size`` batches wait between two stages. Files of at least
+    ``estimate_tokens_above_chars`` characters get a token count estimated from their length
+    instead of a tiktoken count (0 counts every file exactly); the count only decides
+    whether a file is too large to index, which an estimate settles for such files.
+    """
+    read_workers: int = 0
+    token_workers: int = 0
+    token_batch_size: int = 64
+    encoding_name: str = "cl100k_base"
+    estimate_tokens_above_chars: int = 0
+    stream_batch_files: int = 64
+    stream_queue_size: int = 2
+
+    @classmethod
+    def from_dict(cls, config: Optional[Dict]) -> "IngestConfig":
+        config = config or {}
+        known = {k: v for k, v in config.items() if k in cls.__dataclass_fields__}
+        return cls(**known)
+
+    def resolved_read_workers(self) -> int:
+        if self.read_workers > 0:
+            return self.read_workers
+        return min(32, (os.cpu_count() or 1) * 4)
+
+    def resolved_token_workers(self) -> int:
+        if self.token_workers > 0:
+            return self.token_workers
+        return max(1, (os.cpu_count() or 1) - 1)
+
+
+class IngestReport:
+    """
+    Files left out of an index and why, collected across the batches of one indexing run.
+
+    Reasons are the ``SKIP_*`` constants of ``api.tools.file_gate``.
+    """
+
+    def __init__(self):
+        self.indexed = 0
+        self.skipped: List[Dict[str, str]] = []
+        self._lock = threading.Lock()
+
+    def add_indexed(self, count: int = 1) -> None:
+        with self._lock:
+            self.indexed += count
+
+    def add_skipped(self, relative_path: str, reason: str, detail: str = "") -> None:
+        with self._lock:
+            self.skipped.append({"path": relative_path.replace(os.sep, "/"), "reason": reason, "detail": detail})
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for entry in self.skipped:
+                counts[entry["reason"]] = counts.get(entry["reason"], 0) + 1
+            return counts
+
+    def as_dict(self) -> Dict:
+        counts = self.counts()
+        with self._lock:
+            return {"indexed": self.indexed, "skipped": counts,
+                    "files": sorted(self.skipped, key=lambda entry: entry["path"])}
+
+    def save(self, path: str) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+
+def _read_file(repo_file: RepoFile, gate: Optional[FileGateConfig] = None) -> IngestRecord:
+    if gate is not None:
+        skip = check_file(repo_file, gate)
+        if skip is not None:
+            reason, detail = skip
+            if reason == SKIP_READ_ERROR:
+                return IngestRecord(repo_file=repo_file, error=detail)
+            return IngestRecord(repo_file=repo_file, skip_reason=reason, skip_detail=detail)
+    try:
+        with open(repo_file.path, "r", encoding="utf-8") as f:
+            return IngestRecord(repo_file=repo_file, content=f.read())
+    except Exception as e:
+        return IngestRecord(repo_file=repo_file, error=str(e))
+
+
+class ConcurrentIngestor:
+    """
+    Reads and token-counts repository files concurrently.
+
+    File I/O and UTF-8 decoding run on a thread pool, tiktoken runs on a process pool so
+    large repositories use every core. Both stages use ordered maps, so records come back
+    in the same order as the input files regardless of the number of workers. With a
+    ``gate``, files it rejects by size or first bytes are never read.
+
+    Pools are shut down after each ``run``, except while the ingestor is used as a context
+    manager: then they are created once and reused by every ``run``, so reading a stream
+    of batches starts the tokenizer processes (and their tiktoken import) only once.
+    """
+
+    def __init__(self, config: Optional[IngestConfig] = None, gate: Optional[FileGateConfig] = None):
+        self.config = config or IngestConfig()
+        self.gate = gate
+        self._keep_pools = False
+        self._read_pool: Optional[ThreadPoolExecutor] = None
+        self._token_pool: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> "ConcurrentIngestor":
+        self._keep_pools = True
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the worker pools; a later ``run`` starts new ones."""
+        self._keep_pools = False
+        for pool in (self._read_pool, self._token_pool):
+            if pool is not None:
+                pool.shutdown()
+        self._read_pool = self._token_pool = None
+
+    def run(self, files: Iterable[RepoFile]) -> Tuple[List[IngestRecord], IngestStats]:
+        """
+        Read and count tokens for ``files``.
+
+        Args:
+            files: Candidate files, typically from ``iter_repository_files``.
+
+        Returns:
+            Tuple of (records in input order, per-stage timings).
+        """
+        stats = IngestStats()
+
+        start = time.perf_counter()
+        files = list(files)
+        stats.walk_seconds = time.perf_counter() - start
+        stats.files = len(files)
+
+        try:
+            start = time.perf_counter()
+            records = self._read_all(files, stats)
+            stats.read_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            self._count_all(records, stats)
+            stats.tokenize_seconds = time.perf_counter() - start
+        finally:
+            if not self._keep_pools:
+                self.close()
+
+        stats.skipped = sum(1 for record in records if record.skip_reason is not None)
+        stats.read_errors = sum(1 for record in records if record.error is not None)
+        logger.info(f"Ingest stats: {stats.as_dict()}")
+        return records, stats
+
+    def _read_all(self, files: List[RepoFile], stats: IngestStats) -> List[IngestRecord]:
+        workers = min(self.config.resolved_read_workers(), max(1, len(files)))
+        stats.read_workers = workers
+        if workers <= 1:
+            return [_read_file(repo_file, self.gate) for repo_file in files]
+        if self._read_pool is None:
+            # Sized for the largest batch; threads are only started as tasks need them
+            self._read_pool = ThreadPoolExecutor(max_workers=self.config.resolved_read_workers(),
+                                                 thread_name_prefix="ingest-read")
+        return list(self._read_pool.map(_read_file, files, [self.gate] * len(files)))
+
+    def _count_all(self, records: List[IngestRecord], stats: IngestStats) -> None:
+        readable = [record for record in records if record.content is not None]
+        estimate_above = self.config.estimate_tokens_above_chars
+        if estimate_above > 0:
+            for record in readable:
+                if len(record.content) >= estimate_above:
+                    record.token_count = estimate_tokens(record.content)
+            readable = [record for record in readable if len(record.content) < estimate_above]
+        texts = [record.content for record in readable]
+        batch_size = max(1, self.config.token_batch_size)
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+
+        workers = min(self.config.resolved_token_workers(), max(1, len(batches)))
+        if sum(len(text) for text in texts) < MIN_PARALLEL_TOKENIZE_CHARS:
+            workers = 1
+        stats.token_workers = workers
+
+        encoding_name = self.config.encoding_name
+        if workers <= 1:
+            # One batch for tiktoken's own thread pool
+            counts = count_tokens_many(texts, encoding_name)
+        else:
+            if self._token_pool is None:
+                # spawn keeps the workers independent of the (multi-threaded) server process;
+                # spawned workers are started on demand, up to the configured count
+                context = multiprocessing.get_context("spawn")
+                self._token_pool = ProcessPoolExecutor(max_workers=self.config.resolved_token_workers(),
+                                                       mp_context=context)
+            results = self._token_pool.map(_count_tokens_batch, [encoding_name] * len(batches), batches)
+            counts = [count for batch_counts in results for count in batch_counts]
+
+        for record, count in zip(readable, counts):
+            record.token_count = count
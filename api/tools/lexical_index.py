@@ -0,0 +1,247 @@
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import time
+import uuid
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LEXICAL_DIR = "lexical"
+LEXICAL_VERSION = 1
+
+HEADER_FILE = "header.json"
+TERMS_FILE = "terms.txt"
+OFFSETS_FILE = "offsets.bin"
+DOCS_FILE = "docs.bin"
+TFS_FILE = "tfs.bin"
+LENGTHS_FILE = "lengths.bin"
+
+# Longer "words" are base64 blobs, hashes and minified code, never useful search terms
+MAX_TOKEN_LENGTH = 64
+
+_WORD = re.compile(r"\w+")
+# Pieces of an identifier: acronyms (HTTP in HTTPServer), capitalized or lowercase words, numbers
+_SUBWORD = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+
+def tokenize_code(text: str) -> List[str]:
+    """
+    Split text into lowercase search terms, keeping identifiers whole and in pieces.
+
+    ``get_java_callgraph`` and ``getJavaCallgraph`` produce the full identifier plus
+    ``get``, ``java`` and ``callgraph``, so a query matches either the exact name or its
+    words. Single-character terms are dropped.
+    """
+    tokens = []
+    for word in _WORD.findall(text):
+        if len(word) > MAX_TOKEN_LENGTH:
+            continue
+        whole = word.strip("_").lower()
+        if len(whole) > 1:
+            tokens.append(whole)
+        parts = _SUBWORD.findall(word)
+        if len(parts) > 1:
+            tokens.extend(part.lower() for part in parts if len(part) > 1)
+    return tokens
+
+
+@dataclass
+class HybridConfig:
+    """
+    Settings of lexical retrieval fused with vector search (``retriever.hybrid`` in embedder.json).
+
+    ``bm25_top_k`` BM25 hits are merged with the vector hits by reciprocal rank fusion
+    with constant ``rrf_k``; ``k1`` and ``b`` are the usual BM25 parameters.
+    """
+    enabled: bool = True
+    bm25_top_k: int = 30
+    rrf_k: int = 60
+    k1: float = 1.2
+    b: float = 0.75
+
+    @classmethod
+    def from_dict(cls, config: Optional[Dict]) -> "HybridConfig":
+        config = config or {}
+        known = {k: v for k, v in config.items() if k in cls.__dataclass_fields__}
+        return cls(**known)
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over the chunks of a vector store.
+
+    Postings are kept as flat arrays, memory-mapped from disk: for term ``t`` the chunk
+    rows are ``docs[offsets[t]:offsets[t + 1]]`` with their term frequencies in ``tfs``.
+    Rows are the row numbers of the store the index was built from.
+    """
+
+    def __init__(self, path: str, header: Dict, terms: Dict[str, int], offsets: np.ndarray,
+                 docs: np.ndarray, tfs: np.ndarray, lengths: np.ndarray):
+        self.path = path
+        self.header = header
+        self.terms = terms
+        self.offsets = offsets
+        self.docs = docs
+        self.tfs = tfs
+        self.lengths = lengths
+
+    def __len__(self) -> int:
+        return int(self.header["documents"])
+
+    @property
+    def nbytes(self) -> int:
+        # Postings are memory-mapped; the term dictionary is what stays resident
+        return sum(len(term) + 80 for term in self.terms)
+
+    @staticmethod
+    def path_for(store_path: str) -> str:
+        return os.path.join(store_path, LEXICAL_DIR)
+
+    @staticmethod
+    def exists(store_path: str) -> bool:
+        return os.path.exists(os.path.join(LexicalIndex.path_for(store_path), HEADER_FILE))
+
+    @classmethod
+    def open(cls, store_path: str) -> Optional["LexicalIndex"]:
+        """Open the index saved in a store directory, or None if it is missing or outdated."""
+        path = cls.path_for(store_path)
+        try:
+            with open(os.path.join(path, HEADER_FILE), encoding="utf-8") as f:
+                header = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if header.get("version") != LEXICAL_VERSION:
+            return None
+
+        def load(name, dtype):
+            file_path = os.path.join(path, name)
+            if os.path.getsize(file_path) == 0:
+                return np.zeros(0, dtype=dtype)
+            return np.memmap(file_path, dtype=dtype, mode="r")
+
+        with open(os.path.join(path, TERMS_FILE), encoding="utf-8") as f:
+            words = f.read().split("\n") if header["terms"] else []
+        return cls(
+            path, header, {word: i for i, word in enumerate(words)},
+            load(OFFSETS_FILE, np.int64), load(DOCS_FILE, np.int32),
+            load(TFS_FILE, np.uint16), load(LENGTHS_FILE, np.int32),
+        )
+
+    @classmethod
+    def build(cls, store_path: str, texts: Iterable[str]) -> "LexicalIndex":
+        """
+        Tokenize ``texts`` (one per store row, in row order) and save the index in the store directory.
+        """
+        start = time.perf_counter()
+        vocabulary: Dict[str, int] = {}
+        term_ids, doc_ids, frequencies = array("i"), array("i"), array("H")
+        lengths = array("i")
+        for row, text in enumerate(texts):
+            tokens = tokenize_code(text or "")
+            lengths.append(len(tokens))
+            for term, count in Counter(tokens).items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                doc_ids.append(row)
+                frequencies.append(min(count, 0xFFFF))
+
+        term_ids = np.frombuffer(term_ids, dtype=np.int32) if term_ids else np.zeros(0, np.int32)
+        # A stable sort keeps each term's rows in ascending order
+        order = np.argsort(term_ids, kind="stable")
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(vocabulary)), out=offsets[1:])
+        docs = np.asarray(doc_ids, dtype=np.int32)[order]
+        tfs = np.asarray(frequencies, dtype=np.uint16)[order]
+        lengths = np.asarray(lengths, dtype=np.int32)
+        header = {
+            "version": LEXICAL_VERSION,
+            "documents": int(lengths.size),
+            "terms": len(vocabulary),
+            "postings": int(docs.size),
+            "avg_length": float(lengths.mean()) if lengths.size else 0.0,
+        }
+
+        path = cls.path_for(store_path)
+        tmp_path = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+        os.makedirs(tmp_path)
+        try:
+            with open(os.path.join(tmp_path, TERMS_FILE), "w", encoding="utf-8") as f:
+                f.write("\n".join(vocabulary))
+            offsets.tofile(os.path.join(tmp_path, OFFSETS_FILE))
+            docs.tofile(os.path.join(tmp_path, DOCS_FILE))
+            tfs.tofile(os.path.join(tmp_path, TFS_FILE))
+            lengths.tofile(os.path.join(tmp_path, LENGTHS_FILE))
+            # The header goes last; an index without one is treated as missing
+            with open(os.path.join(tmp_path, HEADER_FILE), "w", encoding="utf-8") as f:
+                json.dump(header, f)
+            if os.path.exists(path):
+                shutil.rmtree(path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        logger.info(f"Built lexical index over {header['documents']} chunks, {header['terms']} terms, "
+                    f"{header['postings']} postings in {time.perf_counter() - start:.2f}s")
+        return cls.open(store_path)
+
+    def search(self, query: str, top_k: int, k1: float = 1.2, b: float = 0.75) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        BM25 search.
+
+        Returns:
+            tuple: (store rows, scores) of the best ``top_k`` chunks, best first.
+        """
+        n = len(self)
+        term_ids = {self.terms[term] for term in tokenize_code(query) if term in self.terms}
+        if not n or not term_ids or top_k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        avg_length = self.header["avg_length"] or 1.0
+        norms = k1 * (1 - b + b * self.lengths.astype(np.float32) / avg_length)
+        scores = np.zeros(n, dtype=np.float32)
+        for term_id in term_ids:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.docs[start:end]
+            tfs = self.tfs[start:end].astype(np.float32)
+            idf = math.log(1 + (n - docs.size + 0.5) / (docs.size + 0.5))
+            # Rows appear once per term, so plain fancy-index addition is safe
+            scores[docs] += idf * tfs * (k1 + 1) / (tfs + norms[docs])
+
+        candidates = np.flatnonzero(scores)
+        if candidates.size > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return candidates.astype(np.int64), scores[candidates]
+
+
+def ensure_lexical_index(store) -> LexicalIndex:
+    """The lexical index of a VectorStore, built from its texts if it has none yet."""
+    index = LexicalIndex.open(store.path)
+    if index is not None and len(index) == len(store):
+        return index
+    return LexicalIndex.build(store.path, (store.text(row) for row in range(len(store))))
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 60,
+                           limit: Optional[int] = None) -> List[Tuple[int, float]]:
+    """
+    Merge ranked id lists: each id scores sum(1 / (k + rank)) over the lists it appears in.
+
+    Returns:
+        list: (id, score) pairs, best first, at most ``limit`` of them.
+    """
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            item = int(item)
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    fused = sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+    return fused[:limit] if limit is not None else fused
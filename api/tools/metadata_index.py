@@ -0,0 +1,213 @@
+import fnmatch
+import json
+import logging
+import os
+import shutil
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+METADATA_DIR = "metadata"
+METADATA_VERSION = 1
+
+HEADER_FILE = "header.json"
+FILE_IDS_FILE = "file_ids.bin"
+TYPE_IDS_FILE = "type_ids.bin"
+FLAGS_FILE = "flags.bin"
+
+FLAG_IS_CODE = 1
+FLAG_IS_IMPLEMENTATION = 2
+
+# Language names accepted by RetrievalFilter.languages, besides plain file extensions
+LANGUAGE_EXTENSIONS = {
+    "python": ["py", "pyi"],
+    "javascript": ["js", "jsx", "mjs", "cjs"],
+    "typescript": ["ts", "tsx"],
+    "java": ["java"],
+    "kotlin": ["kt", "kts"],
+    "go": ["go"],
+    "rust": ["rs"],
+    "c": ["c", "h"],
+    "cpp": ["cpp", "cc", "cxx", "hpp", "hh", "hxx", "h"],
+    "csharp": ["cs"],
+    "php": ["php"],
+    "ruby": ["rb"],
+    "swift": ["swift"],
+    "scala": ["scala"],
+    "markdown": ["md", "mdx"],
+}
+
+
+def _normalize_path(path: str) -> str:
+    path = path.replace("\\", "/")
+    while path.startswith("./"):
+        path = path[2:]
+    return path.lstrip("/")
+
+
+@dataclass
+class RetrievalFilter:
+    """
+    Restricts retrieval to a subset of the chunks.
+
+    A chunk must satisfy every given criterion: its file lies under one of
+    ``path_prefixes`` (a prefix may also be a single file) or matches one of ``globs``,
+    its extension is one of ``languages`` (language names or extensions), and
+    ``is_code`` / ``is_implementation`` match when set.
+    """
+    path_prefixes: List[str] = field(default_factory=list)
+    globs: List[str] = field(default_factory=list)
+    languages: List[str] = field(default_factory=list)
+    is_code: Optional[bool] = None
+    is_implementation: Optional[bool] = None
+
+    @classmethod
+    def from_dict(cls, config: Optional[Dict]) -> "RetrievalFilter":
+        config = config or {}
+        known = {k: v for k, v in config.items() if k in cls.__dataclass_fields__}
+        for key in ("path_prefixes", "globs", "languages"):
+            if isinstance(known.get(key), str):
+                known[key] = [known[key]]
+        return cls(**known)
+
+    @property
+    def is_empty(self) -> bool:
+        return (not self.path_prefixes and not self.globs and not self.languages
+                and self.is_code is None and self.is_implementation is None)
+
+    def matches_path(self, path: str) -> bool:
+        if not self.path_prefixes and not self.globs:
+            return True
+        for prefix in self.path_prefixes:
+            prefix = _normalize_path(prefix).rstrip("/")
+            if not prefix or path == prefix or path.startswith(prefix + "/"):
+                return True
+        return any(fnmatch.fnmatchcase(path, _normalize_path(pattern)) for pattern in self.globs)
+
+    def extensions(self) -> List[str]:
+        extensions = []
+        for language in self.languages:
+            language = language.lower().lstrip(".")
+            extensions.extend(LANGUAGE_EXTENSIONS.get(language, [language]))
+        return extensions
+
+
+class MetadataIndex:
+    """
+    Per-chunk metadata columns for evaluating RetrievalFilters without touching the chunks.
+
+    Each row stores a file id, a file type id and a bit set of flags (is_code,
+    is_implementation). A filter is evaluated against the small file and type tables
+    first, then expanded to a boolean mask over all rows with a single gather.
+    """
+
+    def __init__(self, paths: List[str], types: List[str], file_ids: np.ndarray,
+                 type_ids: np.ndarray, flags: np.ndarray, path: Optional[str] = None):
+        self.paths = paths
+        self.types = types
+        self.file_ids = file_ids
+        self.type_ids = type_ids
+        self.flags = flags
+        self.path = path
+
+    def __len__(self) -> int:
+        return int(self.file_ids.size)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(p) + 60 for p in self.paths) + int(self.file_ids.nbytes + self.type_ids.nbytes + self.flags.nbytes)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> "MetadataIndex":
+        """Build from the ``meta_data`` dicts of the chunks, in row order."""
+        path_ids: Dict[str, int] = {}
+        type_ids_by_name: Dict[str, int] = {}
+        file_ids, type_ids, flags = [], [], []
+        for meta in records:
+            meta = meta or {}
+            path = _normalize_path(str(meta.get("file_path", "")))
+            file_ids.append(path_ids.setdefault(path, len(path_ids)))
+            type_ids.append(type_ids_by_name.setdefault(str(meta.get("type", "")).lower(), len(type_ids_by_name)))
+            flags.append((FLAG_IS_CODE if meta.get("is_code") else 0)
+                         | (FLAG_IS_IMPLEMENTATION if meta.get("is_implementation") else 0))
+        return cls(
+            list(path_ids), list(type_ids_by_name),
+            np.asarray(file_ids, dtype=np.int32), np.asarray(type_ids, dtype=np.int32),
+            np.asarray(flags, dtype=np.uint8),
+        )
+
+    @staticmethod
+    def path_for(store_path: str) -> str:
+        return os.path.join(store_path, METADATA_DIR)
+
+    @classmethod
+    def build(cls, store_path: str, records: Iterable[Dict]) -> "MetadataIndex":
+        """Build from chunk metadata and save the index in the store directory."""
+        index = cls.from_records(records)
+        path = cls.path_for(store_path)
+        tmp_path = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+        os.makedirs(tmp_path)
+        try:
+            index.file_ids.tofile(os.path.join(tmp_path, FILE_IDS_FILE))
+            index.type_ids.tofile(os.path.join(tmp_path, TYPE_IDS_FILE))
+            index.flags.tofile(os.path.join(tmp_path, FLAGS_FILE))
+            with open(os.path.join(tmp_path, HEADER_FILE), "w", encoding="utf-8") as f:
+                json.dump({"version": METADATA_VERSION, "rows": len(index), "paths": index.paths,
+                           "types": index.types}, f, ensure_ascii=False)
+            if os.path.exists(path):
+                shutil.rmtree(path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        index.path = path
+        logger.info(f"Built metadata index over {len(index)} chunks from {len(index.paths)} files")
+        return index
+
+    @classmethod
+    def open(cls, store_path: str) -> Optional["MetadataIndex"]:
+        """Open the index saved in a store directory, or None if it is missing or outdated."""
+        path = cls.path_for(store_path)
+        try:
+            with open(os.path.join(path, HEADER_FILE), encoding="utf-8") as f:
+                header = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if header.get("version") != METADATA_VERSION:
+            return None
+        return cls(
+            header["paths"], header["types"],
+            np.fromfile(os.path.join(path, FILE_IDS_FILE), dtype=np.int32),
+            np.fromfile(os.path.join(path, TYPE_IDS_FILE), dtype=np.int32),
+            np.fromfile(os.path.join(path, FLAGS_FILE), dtype=np.uint8),
+            path=path,
+        )
+
+    def mask(self, retrieval_filter: RetrievalFilter) -> np.ndarray:
+        """Boolean mask over the rows that satisfy ``retrieval_filter``."""
+        mask = np.ones(len(self), dtype=bool)
+        if retrieval_filter.path_prefixes or retrieval_filter.globs:
+            allowed_files = np.fromiter((retrieval_filter.matches_path(p) for p in self.paths),
+                                        dtype=bool, count=len(self.paths))
+            mask &= allowed_files[self.file_ids]
+        if retrieval_filter.languages:
+            extensions = set(retrieval_filter.extensions())
+            allowed_types = np.fromiter((t in extensions for t in self.types), dtype=bool, count=len(self.types))
+            mask &= allowed_types[self.type_ids]
+        for flag, wanted in ((FLAG_IS_CODE, retrieval_filter.is_code),
+                             (FLAG_IS_IMPLEMENTATION, retrieval_filter.is_implementation)):
+            if wanted is not None:
+                mask &= ((self.flags & flag) != 0) == bool(wanted)
+        return mask
+
+
+def ensure_metadata_index(store) -> MetadataIndex:
+    """The metadata index of a VectorStore, built from its chunk metadata if it has none yet."""
+    index = MetadataIndex.open(store.path)
+    if index is not None and len(index) == len(store):
+        return index
+    return MetadataIndex.build(store.path, (record.get("meta_data") for record in store.iter_metadata()))
@@ -0,0 +1,170 @@
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+def resolve_ollama_host(host: str = None) -> str:
+    """Ollama base URL from ``host`` or ``OLLAMA_HOST``, without a trailing /api."""
+    host = host or os.getenv("OLLAMA_HOST", "http://localhost:11434")
+    if not host.startswith("http://") and not host.startswith("https://"):
+        host = f"http://{host}"
+    host = host.rstrip("/")
+    if host.endswith("/api"):
+        host = host[:-4]
+    return host
+
+
+@dataclass
+class OllamaBatchConfig:
+    """
+    Settings of the batched Ollama embedding client.
+
+    ``batch_size`` texts go into one ``/api/embed`` request and at most ``concurrency``
+    requests are in flight at once. Failed requests are retried ``max_retries`` times
+    with exponential backoff starting at ``backoff_seconds``.
+    """
+    batch_size: int = 32
+    concurrency: int = 4
+    max_retries: int = 3
+    backoff_seconds: float = 1.0
+    timeout: float = 120.0
+
+    @classmethod
+    def from_dict(cls, config: Optional[Dict]) -> "OllamaBatchConfig":
+        config = config or {}
+        known = {k: v for k, v in config.items() if k in cls.__dataclass_fields__}
+        return cls(**known)
+
+
+class OllamaBatchEmbedder:
+    """
+    Embeds many texts against an Ollama server with batched, concurrent requests.
+
+    Uses the multi-input ``/api/embed`` endpoint and falls back to one ``/api/embeddings``
+    request per text on servers that predate it. Results keep the input order; texts that
+    still fail after all retries come back as None so callers can skip them.
+    """
+
+    def __init__(self, model: str, host: str = None, config: Optional[OllamaBatchConfig] = None,
+                 options: Optional[Dict] = None, session: Optional[requests.Session] = None):
+        self.model = model
+        self.host = resolve_ollama_host(host)
+        self.config = config or OllamaBatchConfig()
+        self.options = options
+        self._session = session or requests.Session()
+        self._legacy_api = False
+        self._lock = threading.Lock()
+
+    def embed(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Embed ``texts``.
+
+        Returns:
+            One embedding per text, in input order, or None where embedding failed.
+        """
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        batch_size = max(1, self.config.batch_size)
+        batches = [(start, texts[start:start + batch_size]) for start in range(0, len(texts), batch_size)]
+        if not batches:
+            return results
+
+        workers = max(1, min(self.config.concurrency, len(batches)))
+        pending = iter(batches)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ollama-embed") as pool:
+            # Keep at most ``workers`` requests in flight instead of queueing every batch
+            in_flight = {}
+            for start, batch in pending:
+                in_flight[pool.submit(self._embed_batch_safe, batch)] = start
+                if len(in_flight) >= workers:
+                    break
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    start = in_flight.pop(future)
+                    embeddings = future.result()
+                    results[start:start + len(embeddings)] = embeddings
+                    next_batch = next(pending, None)
+                    if next_batch is not None:
+                        in_flight[pool.submit(self._embed_batch_safe, next_batch[1])] = next_batch[0]
+        return results
+
+    def _embed_batch_safe(self, texts: List[str]) -> List[Optional[List[float]]]:
+        try:
+            return self._embed_batch(texts)
+        except Exception as e:
+            logger.error(f"Ollama embedding of a batch of {len(texts)} texts failed: {e}")
+            if len(texts) == 1:
+                return [None]
+            # One bad input fails the whole request; retry the texts one by one
+            return [self._embed_one_safe(text) for text in texts]
+
+    def _embed_one_safe(self, text: str) -> Optional[List[float]]:
+        try:
+            return self._embed_batch([text])[0]
+        except Exception as e:
+            logger.error(f"Ollama embedding failed: {e}")
+            return None
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        if not self._legacy_api:
+            payload = {"model": self.model, "input": texts}
+            if self.options:
+                payload["options"] = self.options
+            response = self._post("/api/embed", payload)
+            if response is not None:
+                embeddings = response.json().get("embeddings") or []
+                if len(embeddings) != len(texts):
+                    raise ValueError(f"Expected {len(texts)} embeddings, got {len(embeddings)}")
+                return embeddings
+            with self._lock:
+                if not self._legacy_api:
+                    logger.warning("Ollama server has no /api/embed, falling back to /api/embeddings per text")
+                    self._legacy_api = True
+
+        embeddings = []
+        for text in texts:
+            payload = {"model": self.model, "prompt": text}
+            if self.options:
+                payload["options"] = self.options
+            response = self._post("/api/embeddings", payload)
+            if response is None:
+                raise ValueError("Ollama server does not support embeddings")
+            embeddings.append(response.json()["embedding"])
+        return embeddings
+
+    def _post(self, path: str, payload: Dict) -> Optional[requests.Response]:
+        """POST with retries. Returns None when the endpoint does not exist."""
+        attempt = 0
+        while True:
+            try:
+                response = self._session.post(f"{self.host}{path}", json=payload, timeout=self.config.timeout)
+                if response.status_code == 404 and "model" not in response.text.lower():
+                    return None
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response
+                error = requests.HTTPError(f"{response.status_code} from {path}", response=response)
+                retry_after = response.headers.get("Retry-After")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error, retry_after = e, None
+
+            if attempt >= self.config.max_retries:
+                raise error
+            delay = self.config.backoff_seconds * (2 ** attempt) * (0.5 + random.random())
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            logger.warning(f"Ollama request to {path} failed ({error}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
@@ -1,6 +1,10 @@
 import re
 import os
 import json
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 import os
 import argparse
@@ -9,552 +13,431 @@ import argparse
 import json
 import sys
 from urllib.parse import urlparse
-from typing import Dict, List, Any
-from api.tools.transfor_tokens import similarity_search
-from api.config import get_embedder_config, is_ollama_embedder
-class CodeParser:
-    def __init__(self):
-
-        self.patterns = {
-            'python': {
-                'class': r'^class\s+(\w+)(?:\(([^)]+)\))?:',
-                'method': r'^\s+def\s+(\w+)\s*\(([^)]*)\)\s*(?:->\s*([\w\[\],\s]+))?\s*:',
-                'function': r'^def\s+(\w+)\s*\(([^)]*)\)\s*(?:->\s*([\w\[\],\s]+))?\s*:',
-                'import': r'^import\s+(.+)$',
-                'from_import': r'^from\s+([\w\.]+)\s+import\s+(.+)'
-            },
-            'java': {
-                'class': r'^\s*(?:public|private|protected)?\s*(?:abstract\s+)?(?:final\s+)?class\s+(\w+)',
-                'method': r'^\s*((?:public|private|protected|static|final|abstract|synchronized|native|\s)*)([\w\<\>\[\]]+)\s+(\w+)\s*\(([^)]*)\)\s*(?:\{)?',
-                'function': r'^\s*((?:public|private|protected|static|final|abstract|synchronized|native|\s)*)([\w\<\>\[\]]+)\s+(\w+)\s*\(([^)]*)\)\s*(?:\{)?',
-                'import': r'^import\s+(?:static\s+)?([\w\.\*]+);'
-            },
-            'c_cpp': {
-                'class': r'^\s*(?:class|struct)\s+(\w+)\s*(?::\s*(?:public|private|protected)\s+\w+)?\s*\{',
-                'function': r'^\s*((?:[\w\s\*]+\s+)+)(\w+)\s*\(([^)]*)\)\s*\{',
-                'include': r'^\s*#include\s+(?:<([^>]+)>|"([^"]+)")'
-            },
-            'javascript': {
-                'class': r'^class\s+(\w+)(?:\s+extends\s+[\w]+)?\s*\{',
-                'method': r'^\s*(\w+)\s*\(([^)]*)\)\s*\{',
-                'function': r'^(?:function\s+)?(\w+)\s*\(([^)]*)\)\s*\{',
-                'arrow_function': r'^\s*(?:const|let|var)\s+(\w+)\s*=\s*\(([^)]*)\)\s*=>',
-                'import': r'^import\s+(?:(.+)\s+from\s+)?[\'"]([^\'"]+)[\'"]',
-                'require': r'^\s*(?:const|let|var)\s+.+\s*=\s*require\([\'"]([^\'"]+)[\'"]\)'
-            },
-            'go': {
-                'function': r'^func\s+(\w+)\s*\(([^)]*)\)\s*(?:\([^)]*\))?\s*\{',
-                'method': r'^func\s+\(([^)]+)\)\s+(\w+)\s*\(([^)]*)\)\s*(?:\([^)]*\))?\s*\{',
-                'import': r'^import\s+(?:(?:\()|(?:"([^"]+)"|`([^`]+)`|([^\s]+))',
-                'package': r'^package\s+(\w+)'
-            },
-            'rust': {
-                'function': r'^fn\s+(\w+)\s*\(([^)]*)\)\s*(?:->\s*([^{]+))?\s*\{',
-                'struct': r'^(?:pub\s+)?struct\s+(\w+)\s*\{',
-                'impl': r'^impl\s+(\w+)\s*\{',
-                'use': r'^use\s+([^;]+);',
-                'mod': r'^mod\s+(\w+)\s*\{'
-            },
-            'typescript': {
-                'class': r'^class\s+(\w+)(?:\s+extends\s+[\w]+)?\s*\{',
-                'method': r'^\s*(?:\w+\s+)?(\w+)\s*\(([^)]*)\)\s*(?::\s*([^{]+))?\s*\{',
-                'function': r'^(?:function\s+)?(\w+)\s*\(([^)]*)\)\s*(?::\s*([^{]+))?\s*\{',
-                'arrow_function': r'^\s*(?:const|let|var)\s+(\w+)\s*=\s*\(([^)]*)\)\s*(?::\s*([^{]+))?\s*=>',
-                'interface': r'^interface\s+(\w+)\s*\{',
-                'import': r'^import\s+(?:(.+)\s+from\s+)?[\'"]([^\'"]+)[\'"]',
-                'require': r'^\s*(?:const|let|var)\s+.+\s*=\s*require\([\'"]([^\'"]+)[\'"]\)'
-            },
-            'php': {
-                'class': r'^class\s+(\w+)(?:\s+extends\s+\w+)?(?:\s+implements\s+[^{]+)?\s*\{',
-                'function': r'^function\s+(\w+)\s*\(([^)]*)\)\s*(?::\s*([^{]+))?\s*\{',
-                'namespace': r'^namespace\s+([^;]+);',
-                'use': r'^use\s+([^;]+);'
-            },
-            'swift': {
-                'class': r'^class\s+(\w+)(?::\s*[^{]+)?\s*\{',
-                'function': r'^func\s+(\w+)\s*\(([^)]*)\)\s*(?:->\s*([^{]+))?\s*\{',
-                'import': r'^import\s+([^\n]+)'
-            },
-            'csharp': {
-                'class': r'^\s*(?:public|private|protected|internal)?\s*(?:abstract\s+)?(?:sealed\s+)?class\s+(\w+)',
-                'method': r'^\s*((?:public|private|protected|static|virtual|override|abstract|\s)*)([\w\<\>\[\]]+)\s+(\w+)\s*\(([^)]*)\)\s*(?:\{)?',
-                'namespace': r'^namespace\s+([^{]+)\s*\{',
-                'using': r'^using\s+([^;]+);'
-            },
-            'html': {
-                'tag': r'^<(\w+)(?:\s+[^>]*)?>',
-                'script': r'<script(?:\s+[^>]*)?>',
-                'style': r'<style(?:\s+[^>]*)?>'
-            },
-            'css': {
-                'selector': r'^([^{]+)\s*\{',
-                'import': r'^@import\s+(?:url\()?["\']?([^"\'\)]+)["\']?\)?;'
-            }
-        }
-
-    def detect_language(self, filename):
-
-        ext = os.path.splitext(filename)[1].lower()
-        language_map = {
-            '.py': 'python',
-            '.java': 'java',
-            '.c': 'c_cpp',
-            '.h': 'c_cpp',
-            '.cpp': 'c_cpp',
-            '.hpp': 'c_cpp',
-            '.js': 'javascript',
-            '.jsx': 'javascript',
-            '.ts': 'typescript',
-            '.tsx': 'typescript',
-            '.go': 'go',
-            '.rs': 'rust',
-            '.php': 'php',
-            '.swift': 'swift',
-            '.cs': 'csharp'
-        }
-        return language_map.get(ext, 'unknown')
-
-    def parse_code(self, filepath):
-
-        try:
-            language = self.detect_language(filepath)
-
-            if language == 'go':
-                return self._parse_go_file(filepath)
-
-            with open(filepath, 'r', encoding='utf-8') as file:
-                content = file.readlines()
-
-            result = {
-                'filename': os.path.basename(filepath),
-                'language': language,
-                'imports': [],
-                'classes': [],
-                'functions': []
-            }
-
-            current_class = None
-
-            for i, line in enumerate(content):
-                line = line.strip()
-
-
-                if not line:
-                    continue
-
-
-                import_info = self._parse_imports(line, language, i)
-                if import_info:
-                    result['imports'].append(import_info)
-                    continue
-
-
-                if self._is_comment(line, language):
-                    continue
-
-
-                if language in self.patterns and 'class' in self.patterns[language]:
-                    class_match = re.match(self.patterns[language]['class'], line)
-                    if class_match:
-                        class_name = class_match.group(1)
-                        inheritance = class_match.group(2) if class_match.lastindex > 1 else None
-
-                        current_class = {
-                            'name': class_name,
-                            'inheritance': inheritance,
-                            'methods': [],
-                            'line_number': i + 1
-                        }
-                        result['classes'].append(current_class)
-                        continue
-
-
-                function_info = None
-
-                if language == 'python':
-                    function_info = self._parse_python_function(line, i, current_class)
-                elif language == 'java':
-                    function_info = self._parse_java_function(line, i, current_class)
-                elif language == 'c_cpp':
-                    function_info = self._parse_c_cpp_function(line, i, current_class,language)
-                elif language == 'javascript':
-                    function_info = self._parse_javascript_function(line, i, current_class)
-                elif language == 'typescript':
-                    function_info = self._parse_typescript_function(line, i, current_class)
-                elif language == 'go':
-                    function_info = self._parse_go_function(line, i, current_class)
-                elif language == 'rust':
-                    function_info = self._parse_rust_function(line, i, current_class)
-                elif language == 'php':
-                    function_info = self._parse_php_function(line, i, current_class)
-                elif language == 'swift':
-                    function_info = self._parse_swift_function(line, i, current_class)
-                elif language == 'csharp':
-                    function_info = self._parse_csharp_function(line, i, current_class)
-                elif language == 'html':
-                    function_info = self._parse_html_element(line, i)
-                elif language == 'css':
-                    function_info = self._parse_css_selector(line, i)
-
-                if function_info:
-                    if current_class and function_info.get('is_method', False):
-                        current_class['methods'].append(function_info)
-                    else:
-                        result['functions'].append(function_info)
+from typing import Dict, List, Any, Tuple
+
+from api.tools.analysis_cache import AnalysisCache, AnalysisCacheStats, analysis_cache_path
+from api.tools.analysis_store import AnalysisStore, AnalysisWriter, analysis_store_paths
+
+logger = logging.getLogger(__name__)
+
+
+# 支持的文件后缀与语言的映射
+PROJECT_LANGUAGE_MAP = {
+    '.py': 'python',
+    '.java': 'java',
+    '.c': 'c_cpp',
+    '.h': 'c_cpp',
+    '.cpp': 'c_cpp',
+    '.hpp': 'c_cpp',
+    '.js': 'javascript',
+    '.jsx': 'javascript',
+    '.ts': 'typescript',
+    '.tsx': 'typescript',
+    '.go': 'go',
+    '.rs': 'rust',
+    '.php': 'php',
+    '.swift': 'swift',
+    '.cs': 'csharp'
+}
+
+# 各语言的正则表达式（原始字符串，供外部查看；解析时使用下方编译后的组合表）
+PATTERNS = {
+    'python': {
+        'class': r'^class\s+(\w+)(?:\(([^)]+)\))?:',
+        'method': r'^\s+def\s+(\w+)\s*\(([^)]*)\)\s*(?:->\s*([\w\[\],\s]+))?\s*:',
+        'function': r'^def\s+(\w+)\s*\(([^)]*)\)\s*(?:->\s*([\w\[\],\s]+))?\s*:',
+        'import': r'^import\s+(.+)$',
+        'from_import': r'^from\s+([\w\.]+)\s+import\s+(.+)'
+    },
+    'java': {
+        'class': r'^\s*(?:public|private|protected)?\s*(?:abstract\s+)?(?:final\s+)?class\s+(\w+)',
+        'method': r'^\s*((?:public|private|protected|static|final|abstract|synchronized|native|\s)*)([\w\<\>\[\]]+)\s+(\w+)\s*\(([^)]*)\)\s*(?:\{)?',
+        'function': r'^\s*((?:public|private|protected|static|final|abstract|synchronized|native|\s)*)([\w\<\>\[\]]+)\s+(\w+)\s*\(([^)]*)\)\s*(?:\{)?',
+        'import': r'^import\s+(?:static\s+)?([\w\.\*]+);'
+    },
+    'c_cpp': {
+        'class': r'^\s*(?:class|struct)\s+(\w+)\s*(?::\s*(?:public|private|protected)\s+\w+)?\s*\{',
+        'function': r'^\s*((?:[\w\s\*]+\s+)+)(\w+)\s*\(([^)]*)\)\s*\{',
+        'include': r'^\s*#include\s+(?:<([^>]+)>|"([^"]+)")'
+    },
+    'javascript': {
+        'class': r'^class\s+(\w+)(?:\s+extends\s+[\w]+)?\s*\{',
+        'method': r'^\s*(\w+)\s*\(([^)]*)\)\s*\{',
+        'function': r'^(?:function\s+)?(\w+)\s*\(([^)]*)\)\s*\{',
+        'arrow_function': r'^\s*(?:const|let|var)\s+(\w+)\s*=\s*\(([^)]*)\)\s*=>',
+        'import': r'^import\s+(?:(.+)\s+from\s+)?[\'"]([^\'"]+)[\'"]',
+        'require': r'^\s*(?:const|let|var)\s+.+\s*=\s*require\([\'"]([^\'"]+)[\'"]\)'
+    },
+    'go': {
+        'function': r'^func\s+(\w+)\s*\(([^)]*)\)\s*(?:\(([^)]*)\))?\s*(?:\{|$)',
+        'method': r'^func\s+\(([^)]+)\)\s+(\w+)\s*\(([^)]*)\)\s*(?:\(([^)]*)\))?\s*(?:\{|$)',
+        'import': r'^import\s+(?:"([^"]+)"|`([^`]+)`|([^\s;]+))',
+        'package': r'^package\s+(\w+)'
+    },
+    'rust': {
+        'function': r'^fn\s+(\w+)\s*\(([^)]*)\)\s*(?:->\s*([^{]+))?\s*\{',
+        'struct': r'^(?:pub\s+)?struct\s+(\w+)\s*\{',
+        'impl': r'^impl\s+(\w+)\s*\{',
+        'use': r'^use\s+([^;]+);',
+        'mod': r'^mod\s+(\w+)\s*\{'
+    },
+    'typescript': {
+        'class': r'^class\s+(\w+)(?:\s+extends\s+[\w]+)?\s*\{',
+        'method': r'^\s*(?:\w+\s+)?(\w+)\s*\(([^)]*)\)\s*(?::\s*([^{]+))?\s*\{',
+        'function': r'^(?:function\s+)?(\w+)\s*\(([^)]*)\)\s*(?::\s*([^{]+))?\s*\{',
+        'arrow_function': r'^\s*(?:const|let|var)\s+(\w+)\s*=\s*\(([^)]*)\)\s*(?::\s*([^{]+))?\s*=>',
+        'interface': r'^interface\s+(\w+)\s*\{',
+        'import': r'^import\s+(?:(.+)\s+from\s+)?[\'"]([^\'"]+)[\'"]',
+        'require': r'^\s*(?:const|let|var)\s+.+\s*=\s*require\([\'"]([^\'"]+)[\'"]\)'
+    },
+    'php': {
+        'class': r'^class\s+(\w+)(?:\s+extends\s+\w+)?(?:\s+implements\s+[^{]+)?\s*\{',
+        'function': r'^function\s+(\w+)\s*\(([^)]*)\)\s*(?::\s*([^{]+))?\s*\{',
+        'namespace': r'^namespace\s+([^;]+);',
+        'use': r'^use\s+([^;]+);'
+    },
+    'swift': {
+        'class': r'^class\s+(\w+)(?::\s*[^{]+)?\s*\{',
+        'function': r'^func\s+(\w+)\s*\(([^)]*)\)\s*(?:->\s*([^{]+))?\s*\{',
+        'import': r'^import\s+([^\n]+)'
+    },
+    'csharp': {
+        'class': r'^\s*(?:public|private|protected|internal)?\s*(?:abstract\s+)?(?:sealed\s+)?class\s+(\w+)',
+        'method': r'^\s*((?:public|private|protected|static|virtual|override|abstract|\s)*)([\w\<\>\[\]]+)\s+(\w+)\s*\(([^)]*)\)\s*(?:\{)?',
+        'namespace': r'^namespace\s+([^{]+)\s*\{',
+        'using': r'^using\s+([^;]+);'
+    },
+    'html': {
+        'tag': r'^<(\w+)(?:\s+[^>]*)?>',
+        'script': r'<script(?:\s+[^>]*)?>',
+        'style': r'<style(?:\s+[^>]*)?>'
+    },
+    'css': {
+        'selector': r'^([^{]+)\s*\{',
+        'import': r'^@import\s+(?:url\()?["\']?([^"\'\)]+)["\']?\)?;'
+    }
+}
 
-            return result
+# 注释行的前缀
+_C_STYLE_COMMENT = r'(?://|/\*|\*)'
+_COMMENT_PATTERNS = {
+    'python': r'#',
+    'html': r'<!--',
+    'css': r'/\*',
+}
 
-        except Exception as e:
-            return {'error': str(e)}
 
-    def _is_comment(self, line, language):
+class PatternSet:
+    """
+    Several patterns tried in order, compiled into one alternation with a named group per
+    pattern, so a line is scanned once instead of once per pattern.
 
-        if language == 'python':
-            return line.startswith('#')
-        elif language in ['java', 'c_cpp', 'javascript', 'typescript', 'go', 'rust', 'php', 'swift', 'csharp']:
-            return line.startswith('//') or line.startswith('/*') or line.startswith('*') or line.startswith('*/')
-        elif language == 'html':
-            return line.startswith('<!--')
-        elif language == 'css':
-            return line.startswith('/*')
-        return False
+    ``match`` returns the name of the first pattern that matches and that pattern's own
+    groups (None for optional groups that did not take part), or None.
+    """
 
-    def _parse_imports(self, line, language, line_number):
+    def __init__(self, named_patterns):
+        parts = []
+        self._groups = {}
+        index = 1
+        for name, pattern in named_patterns:
+            groups = re.compile(pattern).groups
+            parts.append(f'(?P<{name}>{pattern})')
+            # m.groups() is 0-based: the wrapper group sits at index - 1, its own groups follow it
+            self._groups[name] = (index, index + groups)
+            index += groups + 1
+        self.regex = re.compile('|'.join(parts))
+
+    def match(self, line):
+        match = self.regex.match(line)
+        if match is None:
+            return None
+        name = match.lastgroup
+        start, end = self._groups[name]
+        return name, match.groups()[start:end]
+
+
+def _group(groups, index):
+    return groups[index] if len(groups) > index else None
+
+
+def infer_javascript_return_type(func_name):
+    """根据函数名推断JavaScript返回类型"""
+    if func_name.startswith('get') or func_name.startswith('is') or func_name.startswith('has'):
+        return 'boolean'
+    elif func_name.startswith('create') or func_name.startswith('make'):
+        return 'object'
+    elif func_name.startswith('calculate') or func_name.startswith('compute'):
+        return 'number'
+    elif func_name.startswith('to') and len(func_name) > 2:
+        return func_name[2:].lower()  # toString -> string, toNumber -> number
+    return 'any'
+
+
+# 各行记录的构造函数：(匹配的模式名, 分组, 行, 行号, 当前类) -> dict
+def _import(record_type, *fields):
+    def build(kind, groups, line, line_number, current_class):
+        record = {'type': record_type}
+        for field, index in fields:
+            record[field] = groups[index]
+        record['line_number'] = line_number
+        return record
+    return build
+
+
+def _class(kind, groups, line, line_number, current_class):
+    return {
+        'name': groups[0],
+        'inheritance': _group(groups, 1),
+        'methods': [],
+        'line_number': line_number
+    }
 
-        if language == 'python':
 
-            import_match = re.match(self.patterns['python']['import'], line)
-            if import_match:
-                return {
-                    'type': 'import',
-                    'module': import_match.group(1),
-                    'line_number': line_number + 1
-                }
+def _typed_function(kind, groups, line, line_number, current_class):
+    """名称、参数、可选返回类型（Python、TypeScript、Rust、PHP、Swift）"""
+    return {
+        'name': groups[0],
+        'parameters': groups[1],
+        'return_type': _group(groups, 2),
+        'line_number': line_number,
+        'is_method': current_class is not None and kind != 'arrow_function'
+    }
 
 
-            from_import_match = re.match(self.patterns['python']['from_import'], line)
-            if from_import_match:
-                return {
-                    'type': 'from_import',
-                    'module': from_import_match.group(1),
-                    'imports': from_import_match.group(2),
-                    'line_number': line_number + 1
-                }
+def _rust_function(kind, groups, line, line_number, current_class):
+    return _typed_function(kind, groups, line, line_number, None)
 
-        elif language == 'java':
 
-            import_match = re.match(self.patterns['java']['import'], line)
-            if import_match:
-                return {
-                    'type': 'import',
-                    'package': import_match.group(1),
-                    'line_number': line_number + 1
-                }
+def _include(kind, groups, line, line_number, current_class):
+    return {'type': 'include', 'file': groups[0] or groups[1], 'line_number': line_number}
 
-        elif language == 'c_cpp':
 
-            include_match = re.match(self.patterns['c_cpp']['include'], line)
-            if include_match:
+def _es_import(kind, groups, line, line_number, current_class):
+    return {
+        'type': 'import',
+        'imports': (groups[0] or '*').strip(),
+        'module': groups[1],
+        'line_number': line_number
+    }
 
-                included_file = include_match.group(1) or include_match.group(2)
-                return {
-                    'type': 'include',
-                    'file': included_file,
-                    'line_number': line_number + 1
-                }
 
-        elif language == 'javascript':
-
-            import_match = re.match(self.patterns['javascript']['import'], line)
-            if import_match:
-                imports = import_match.group(1) or '*'
-                module = import_match.group(2)
-                return {
-                    'type': 'import',
-                    'imports': imports.strip(),
-                    'module': module,
-                    'line_number': line_number + 1
-                }
+def _java_function(kind, groups, line, line_number, current_class):
+    """修饰符、返回类型、名称、参数（Java、C#）"""
+    return {
+        'name': groups[2],
+        'parameters': groups[3],
+        'return_type': groups[1].strip(),
+        'modifiers': groups[0].strip(),
+        'line_number': line_number,
+        'is_method': current_class is not None
+    }
 
 
-            require_match = re.match(self.patterns['javascript']['require'], line)
-            if require_match:
-                return {
-                    'type': 'require',
-                    'module': require_match.group(1),
-                    'line_number': line_number + 1
-                }
+def _c_cpp_function(kind, groups, line, line_number, current_class):
+    # 简化处理，假设在类定义后的函数都是方法
+    return {
+        'name': groups[1],
+        'parameters': groups[2],
+        'return_type': groups[0].strip(),
+        'line_number': line_number,
+        'is_method': current_class is not None
+    }
 
-        elif language == 'typescript':
-
-            import_match = re.match(self.patterns['typescript']['import'], line)
-            if import_match:
-                imports = import_match.group(1) or '*'
-                module = import_match.group(2)
-                return {
-                    'type': 'import',
-                    'imports': imports.strip(),
-                    'module': module,
-                    'line_number': line_number + 1
-                }
 
+def _javascript_function(kind, groups, line, line_number, current_class):
+    # JavaScript是动态类型语言，通常没有明确的返回类型声明
+    return {
+        'name': groups[0],
+        'parameters': groups[1],
+        'return_type': infer_javascript_return_type(groups[0]),
+        'line_number': line_number,
+        'is_method': current_class is not None and kind != 'arrow_function'
+    }
 
-            require_match = re.match(self.patterns['typescript']['require'], line)
-            if require_match:
-                return {
-                    'type': 'require',
-                    'module': require_match.group(1),
-                    'line_number': line_number + 1
-                }
 
-        elif language == 'go':
+def _html_element(kind, groups, line, line_number, current_class):
+    if kind == 'tag':
+        # 跳过自闭合标签和结束标签
+        if groups[0].startswith('/') or line.endswith('/>'):
+            return None
+        return {'name': groups[0], 'type': 'html_tag', 'line_number': line_number}
+    return {'name': kind, 'type': f'{kind}_tag', 'line_number': line_number}
+
+
+def _css_selector(kind, groups, line, line_number, current_class):
+    return {'name': groups[0].strip(), 'type': 'css_selector', 'line_number': line_number}
+
+
+# 每种语言按顺序尝试的规则：(模式名, 角色, 构造函数)。角色为 import、comment、class、
+# function，或 method（只在类定义之后尝试）。顺序与逐个尝试时相同：导入、注释、类、函数。
+_LANGUAGE_RULES = {
+    'python': [
+        ('import', 'import', _import('import', ('module', 0))),
+        ('from_import', 'import', _import('from_import', ('module', 0), ('imports', 1))),
+        ('class', 'class', _class),
+        ('method', 'method', _typed_function),
+        ('function', 'function', _typed_function),
+    ],
+    'java': [
+        ('import', 'import', _import('import', ('package', 0))),
+        ('class', 'class', _class),
+        # method 与 function 的模式相同，只需尝试一次
+        ('function', 'function', _java_function),
+    ],
+    'c_cpp': [
+        ('include', 'import', _include),
+        ('class', 'class', _class),
+        ('function', 'function', _c_cpp_function),
+    ],
+    'javascript': [
+        ('import', 'import', _es_import),
+        ('require', 'import', _import('require', ('module', 0))),
+        ('class', 'class', _class),
+        ('method', 'method', _javascript_function),
+        ('function', 'function', _javascript_function),
+        ('arrow_function', 'function', _javascript_function),
+    ],
+    'typescript': [
+        ('import', 'import', _es_import),
+        ('require', 'import', _import('require', ('module', 0))),
+        ('class', 'class', _class),
+        ('method', 'method', _typed_function),
+        ('function', 'function', _typed_function),
+        ('arrow_function', 'function', _typed_function),
+    ],
+    'rust': [
+        ('use', 'import', _import('use', ('module', 0))),
+        ('mod', 'import', _import('mod', ('name', 0))),
+        ('function', 'function', _rust_function),
+    ],
+    'php': [
+        ('namespace', 'import', _import('namespace', ('name', 0))),
+        ('use', 'import', _import('use', ('name', 0))),
+        ('class', 'class', _class),
+        ('function', 'function', _typed_function),
+    ],
+    'swift': [
+        ('import', 'import', _import('import', ('module', 0))),
+        ('class', 'class', _class),
+        ('function', 'function', _typed_function),
+    ],
+    'csharp': [
+        ('using', 'import', _import('using', ('namespace', 0))),
+        ('namespace', 'import', _import('namespace', ('name', 0))),
+        ('class', 'class', _class),
+        ('method', 'function', _java_function),
+    ],
+    'html': [
+        ('tag', 'function', _html_element),
+        ('script', 'function', _html_element),
+        ('style', 'function', _html_element),
+    ],
+    'css': [
+        ('import', 'import', _import('import', ('file', 0))),
+        ('selector', 'function', _css_selector),
+    ],
+}
+
+
+
+class _LanguageTable:
+    """The compiled line patterns of one language and the handler of each pattern."""
+
+    def __init__(self, language, rules):
+        imports = [rule for rule in rules if rule[1] == 'import']
+        others = [rule for rule in rules if rule[1] != 'import']
+        ordered = imports + [('comment', 'comment', None)] + others
+        patterns = dict(PATTERNS[language], comment=_COMMENT_PATTERNS.get(language, _C_STYLE_COMMENT))
+        self.handlers = {name: (role, build) for name, role, build in ordered}
+        # 方法模式只在类定义之后尝试
+        self.top_level = PatternSet((name, patterns[name]) for name, role, _ in ordered if role != 'method')
+        self.in_class = PatternSet((name, patterns[name]) for name, _, _ in ordered)
+
+    def match(self, line, in_class):
+        return (self.in_class if in_class else self.top_level).match(line)
 
-            import_match = re.match(self.patterns['go']['import'], line)
-            if import_match:
-                # Go的import有多种格式，这里简化处理
-                import_path = import_match.group(1) or import_match.group(2) or import_match.group(3)
-                return {
-                    'type': 'import',
-                    'package': import_path,
-                    'line_number': line_number + 1
-                }
 
+class CodeParser:
+    # 所有模式在类定义时编译一次，所有实例共享
+    patterns = PATTERNS
+    _tables = {language: _LanguageTable(language, rules) for language, rules in _LANGUAGE_RULES.items()}
+    _go_line = PatternSet((name, PATTERNS['go'][name]) for name in ('package', 'import', 'function', 'method'))
+    _go_import_path = re.compile(r'["`]([^"`]+)["`]')
 
-            package_match = re.match(self.patterns['go']['package'], line)
-            if package_match:
-                return {
-                    'type': 'package',
-                    'name': package_match.group(1),
-                    'line_number': line_number + 1
-                }
+    def detect_language(self, filename):
 
-        elif language == 'rust':
+        ext = os.path.splitext(filename)[1].lower()
+        return PROJECT_LANGUAGE_MAP.get(ext, 'unknown')
 
-            use_match = re.match(self.patterns['rust']['use'], line)
-            if use_match:
-                return {
-                    'type': 'use',
-                    'module': use_match.group(1),
-                    'line_number': line_number + 1
-                }
+    def parse_code(self, filepath, lines=None):
+        """Parse a source file; ``lines`` holds its content when it is already in memory."""
+        try:
+            language = self.detect_language(filepath)
 
+            if language == 'go':
+                return self._parse_go_file(filepath, lines)
 
-            mod_match = re.match(self.patterns['rust']['mod'], line)
-            if mod_match:
-                return {
-                    'type': 'mod',
-                    'name': mod_match.group(1),
-                    'line_number': line_number + 1
-                }
+            if lines is None:
+                with open(filepath, 'r', encoding='utf-8') as file:
+                    content = file.readlines()
+            else:
+                content = lines
 
-        elif language == 'php':
+            result = {
+                'filename': os.path.basename(filepath),
+                'language': language,
+                'imports': [],
+                'classes': [],
+                'functions': []
+            }
 
-            namespace_match = re.match(self.patterns['php']['namespace'], line)
-            if namespace_match:
-                return {
-                    'type': 'namespace',
-                    'name': namespace_match.group(1),
-                    'line_number': line_number + 1
-                }
+            table = self._tables.get(language)
+            if table is None:
+                return result
 
+            current_class = None
 
-            use_match = re.match(self.patterns['php']['use'], line)
-            if use_match:
-                return {
-                    'type': 'use',
-                    'name': use_match.group(1),
-                    'line_number': line_number + 1
-                }
+            for i, line in enumerate(content):
+                line = line.strip()
 
-        elif language == 'swift':
-            # 解析 Swift import
-            import_match = re.match(self.patterns['swift']['import'], line)
-            if import_match:
-                return {
-                    'type': 'import',
-                    'module': import_match.group(1),
-                    'line_number': line_number + 1
-                }
+                if not line:
+                    continue
 
-        elif language == 'csharp':
-            # 解析 C# using
-            using_match = re.match(self.patterns['csharp']['using'], line)
-            if using_match:
-                return {
-                    'type': 'using',
-                    'namespace': using_match.group(1),
-                    'line_number': line_number + 1
-                }
+                # 一次匹配依次尝试导入、注释、类和函数模式
+                hit = table.match(line, current_class is not None)
+                if hit is None:
+                    continue
+                kind, groups = hit
+                role, build = table.handlers[kind]
+                if role == 'comment':
+                    continue
 
-            # 解析 C# namespace
-            namespace_match = re.match(self.patterns['csharp']['namespace'], line)
-            if namespace_match:
-                return {
-                    'type': 'namespace',
-                    'name': namespace_match.group(1),
-                    'line_number': line_number + 1
-                }
+                record = build(kind, groups, line, i + 1, current_class)
+                if role == 'import':
+                    result['imports'].append(record)
+                elif role == 'class':
+                    current_class = record
+                    result['classes'].append(record)
+                elif record:
+                    if current_class and record.get('is_method', False):
+                        current_class['methods'].append(record)
+                    else:
+                        result['functions'].append(record)
 
-        elif language == 'css':
-            # 解析 CSS import
-            import_match = re.match(self.patterns['css']['import'], line)
-            if import_match:
-                return {
-                    'type': 'import',
-                    'file': import_match.group(1),
-                    'line_number': line_number + 1
-                }
+            return result
 
-        return None
-
-    def _parse_python_function(self, line, line_number, current_class):
-        """解析Python函数和方法"""
-        patterns_to_try = []
-
-        if current_class:
-            patterns_to_try.append(self.patterns['python']['method'])
-        patterns_to_try.append(self.patterns['python']['function'])
-
-        for pattern in patterns_to_try:
-            match = re.match(pattern, line)
-            if match:
-                func_name = match.group(1)
-                params = match.group(2)
-                return_type = match.group(3) if match.lastindex > 2 else None
-
-                return {
-                    'name': func_name,
-                    'parameters': params,
-                    'return_type': return_type,
-                    'line_number': line_number + 1,
-                    'is_method': current_class is not None
-                }
-        return None
-
-    def _parse_java_function(self, line, line_number, current_class):
-        """解析Java函数和方法"""
-        patterns_to_try = []
-
-        if current_class:
-            patterns_to_try.append(self.patterns['java']['method'])
-        patterns_to_try.append(self.patterns['java']['function'])
-
-        for pattern in patterns_to_try:
-            match = re.match(pattern, line)
-            if match:
-                modifiers = match.group(1).strip()
-                return_type = match.group(2).strip()
-                func_name = match.group(3)
-                params = match.group(4) if match.lastindex > 3 else ""
-
-                return {
-                    'name': func_name,
-                    'parameters': params,
-                    'return_type': return_type,
-                    'modifiers': modifiers,
-                    'line_number': line_number + 1,
-                    'is_method': current_class is not None
-                }
-        return None
-
-    def _parse_c_cpp_function(self, line, line_number, current_class,language):
-        """解析C/C++函数"""
-        # 如果是C++，可能有类方法
-        if current_class and language == 'c_cpp':
-            # 简化处理，假设在类定义后的函数都是方法
-            match = re.match(self.patterns['c_cpp']['function'], line)
-            if match:
-                return_type = match.group(1).strip()
-                func_name = match.group(2)
-                params = match.group(3) if match.lastindex > 2 else ""
-
-                return {
-                    'name': func_name,
-                    'parameters': params,
-                    'return_type': return_type,
-                    'line_number': line_number + 1,
-                    'is_method': True
-                }
-        else:
-            # 普通函数
-            match = re.match(self.patterns['c_cpp']['function'], line)
-            if match:
-                return_type = match.group(1).strip()
-                func_name = match.group(2)
-                params = match.group(3) if match.lastindex > 2 else ""
-
-                return {
-                    'name': func_name,
-                    'parameters': params,
-                    'return_type': return_type,
-                    'line_number': line_number + 1,
-                    'is_method': False
-                }
-        return None
-
-    def _parse_javascript_function(self, line, line_number, current_class):
-        """解析JavaScript函数和方法"""
-        patterns_to_try = []
-
-        if current_class:
-            patterns_to_try.append(self.patterns['javascript']['method'])
-
-        patterns_to_try.extend([
-            self.patterns['javascript']['function'],
-            self.patterns['javascript']['arrow_function']
-        ])
-
-        for pattern in patterns_to_try:
-            match = re.match(pattern, line)
-            if match:
-                func_name = match.group(1)
-                params = match.group(2) if match.lastindex > 1 else ""
-
-                # JavaScript是动态类型语言，通常没有明确的返回类型声明
-                return_type = self._infer_javascript_return_type(func_name)
-
-                return {
-                    'name': func_name,
-                    'parameters': params,
-                    'return_type': return_type,
-                    'line_number': line_number + 1,
-                    'is_method': current_class is not None and pattern != self.patterns['javascript']['arrow_function']
-                }
-        return None
-
-    def _parse_typescript_function(self, line, line_number, current_class):
-        """解析TypeScript函数和方法"""
-        patterns_to_try = []
-
-        if current_class:
-            patterns_to_try.append(self.patterns['typescript']['method'])
-
-        patterns_to_try.extend([
-            self.patterns['typescript']['function'],
-            self.patterns['typescript']['arrow_function']
-        ])
-
-        for pattern in patterns_to_try:
-            match = re.match(pattern, line)
-            if match:
-                func_name = match.group(1)
-                params = match.group(2) if match.lastindex > 1 else ""
-                return_type = match.group(3) if match.lastindex > 2 else None
-
-                return {
-                    'name': func_name,
-                    'parameters': params,
-                    'return_type': return_type,
-                    'line_number': line_number + 1,
-                    'is_method': current_class is not None and pattern != self.patterns['typescript']['arrow_function']
-                }
-        return None
+        except Exception as e:
+            return {'error': str(e)}
 
-    def _parse_go_file(self, filepath):
+    def _parse_go_file(self, filepath, lines=None):
         """专门解析Go语言文件"""
         try:
-            with open(filepath, 'r', encoding='utf-8') as file:
-                content = file.readlines()
+            if lines is None:
+                with open(filepath, 'r', encoding='utf-8') as file:
+                    content = file.readlines()
+            else:
+                content = lines
 
             result = {
                 'filename': os.path.basename(filepath),
@@ -579,17 +462,17 @@ class CodeParser:
                     if '*/' in line:
                         in_comment_block = False
                     continue
-                if in_comment_block:
-                    continue
 
                 # 跳过空行和单行注释
                 if not line or line.startswith('//'):
                     continue
 
+                # package、import、函数和方法定义一次匹配
+                hit = self._go_line.match(line)
+
                 # 解析package声明
-                package_match = re.match(r'^package\s+(\w+)', line)
-                if package_match:
-                    result['package'] = package_match.group(1)
+                if hit and hit[0] == 'package':
+                    result['package'] = hit[1][0]
                     continue
 
                 # 检查是否进入多行import块
@@ -604,7 +487,7 @@ class CodeParser:
                         continue
 
                     # 解析import路径 - 更宽松的匹配
-                    import_match = re.search(r'["`]([^"`]+)["`]', line)
+                    import_match = self._go_import_path.search(line)
                     if import_match:
                         result['imports'].append({
                             'type': 'import',
@@ -613,226 +496,47 @@ class CodeParser:
                         })
                     continue
 
+                if hit is None:
+                    continue
+                kind, groups = hit
+
                 # 解析单行import语句
-                import_match = re.match(r'^import\s+(?:"([^"]+)"|`([^`]+)`|([^\s;]+))', line)
-                if import_match:
-                    import_path = import_match.group(1) or import_match.group(2) or import_match.group(3)
+                if kind == 'import':
+                    import_path = groups[0] or groups[1] or groups[2]
                     if import_path:
                         result['imports'].append({
                             'type': 'import',
                             'path': import_path,
                             'line_number': i + 1
                         })
-                    continue
 
                 # 解析函数定义
-                func_match = re.match(r'^func\s+(\w+)\s*\(([^)]*)\)\s*(?:\(([^)]*)\))?\s*(?:\{|$)', line)
-                if func_match:
-                    func_name = func_match.group(1)
-                    params = func_match.group(2).strip()
-                    return_types = func_match.group(3).strip() if func_match.group(3) else ""
-
+                elif kind == 'function':
                     result['functions'].append({
-                        'name': func_name,
-                        'parameters': params,
-                        'return_types': return_types,
+                        'name': groups[0],
+                        'parameters': groups[1].strip(),
+                        'return_types': groups[2].strip() if groups[2] else "",
                         'line_number': i + 1,
                         'type': 'function'
                     })
-                    continue
 
                 # 解析方法定义（带接收器）
-                method_match = re.match(r'^func\s+\(([^)]+)\)\s+(\w+)\s*\(([^)]*)\)\s*(?:\(([^)]*)\))?\s*(?:\{|$)',
-                                        line)
-                if method_match:
-                    receiver = method_match.group(1).strip()
-                    method_name = method_match.group(2)
-                    params = method_match.group(3).strip()
-                    return_types = method_match.group(4).strip() if method_match.group(4) else ""
-
+                else:
                     result['methods'].append({
-                        'name': method_name,
-                        'receiver': receiver,
-                        'parameters': params,
-                        'return_types': return_types,
+                        'name': groups[1],
+                        'receiver': groups[0].strip(),
+                        'parameters': groups[2].strip(),
+                        'return_types': groups[3].strip() if groups[3] else "",
                         'line_number': i + 1,
                         'type': 'method'
                     })
-                    continue
 
             return result
 
         except Exception as e:
             return {'error': str(e), 'file': filepath}
-    def _parse_go_function(self, line, line_number, current_class):
-        """解析Go函数和方法 - 修复版本"""
-        # Go没有类的概念，所以current_class应该总是None
-        # 普通函数
-        func_match = re.match(r'^func\s+(\w+)\s*\(([^)]*)\)\s*(?:\(([^)]*)\))?\s*\{', line)
-        if func_match:
-            func_name = func_match.group(1)
-            params = func_match.group(2).strip()
-            return_types = func_match.group(3).strip() if func_match.group(3) else ""
-
-            return {
-                'name': func_name,
-                'parameters': params,
-                'return_types': return_types,
-                'line_number': line_number + 1,
-                'is_method': False
-            }
-
-        # 方法（带接收器）
-        method_match = re.match(r'^func\s+\(([^)]+)\)\s+(\w+)\s*\(([^)]*)\)\s*(?:\(([^)]*)\))?\s*\{', line)
-        if method_match:
-            receiver = method_match.group(1).strip()
-            method_name = method_match.group(2)
-            params = method_match.group(3).strip()
-            return_types = method_match.group(4).strip() if method_match.group(4) else ""
-
-            return {
-                'name': method_name,
-                'parameters': params,
-                'receiver': receiver,
-                'return_types': return_types,
-                'line_number': line_number + 1,
-                'is_method': True
-            }
-
-        return None
-    def _parse_rust_function(self, line, line_number, current_class):
-        """解析Rust函数"""
-        match = re.match(self.patterns['rust']['function'], line)
-        if match:
-            func_name = match.group(1)
-            params = match.group(2) if match.lastindex > 1 else ""
-            return_type = match.group(3) if match.lastindex > 2 else None
-
-            return {
-                'name': func_name,
-                'parameters': params,
-                'return_type': return_type,
-                'line_number': line_number + 1,
-                'is_method': False
-            }
-        return None
-
-    def _parse_php_function(self, line, line_number, current_class):
-        """解析PHP函数和方法"""
-        match = re.match(self.patterns['php']['function'], line)
-        if match:
-            func_name = match.group(1)
-            params = match.group(2) if match.lastindex > 1 else ""
-            return_type = match.group(3) if match.lastindex > 2 else None
-
-            return {
-                'name': func_name,
-                'parameters': params,
-                'return_type': return_type,
-                'line_number': line_number + 1,
-                'is_method': current_class is not None
-            }
-        return None
-
-    def _parse_swift_function(self, line, line_number, current_class):
-        """解析Swift函数和方法"""
-        match = re.match(self.patterns['swift']['function'], line)
-        if match:
-            func_name = match.group(1)
-            params = match.group(2) if match.lastindex > 1 else ""
-            return_type = match.group(3) if match.lastindex > 2 else None
-
-            return {
-                'name': func_name,
-                'parameters': params,
-                'return_type': return_type,
-                'line_number': line_number + 1,
-                'is_method': current_class is not None
-            }
-        return None
-
-    def _parse_csharp_function(self, line, line_number, current_class):
-        """解析C#函数和方法"""
-        match = re.match(self.patterns['csharp']['method'], line)
-        if match:
-            modifiers = match.group(1).strip()
-            return_type = match.group(2).strip()
-            func_name = match.group(3)
-            params = match.group(4) if match.lastindex > 3 else ""
-
-            return {
-                'name': func_name,
-                'parameters': params,
-                'return_type': return_type,
-                'modifiers': modifiers,
-                'line_number': line_number + 1,
-                'is_method': current_class is not None
-            }
-        return None
-
-    def _parse_html_element(self, line, line_number):
-        """解析HTML元素"""
-        match = re.match(self.patterns['html']['tag'], line)
-        if match:
-            tag_name = match.group(1)
-
-            # 跳过自闭合标签和结束标签
-            if tag_name.startswith('/') or line.endswith('/>'):
-                return None
-
-            return {
-                'name': tag_name,
-                'type': 'html_tag',
-                'line_number': line_number + 1
-            }
 
-        # 检查script标签
-        script_match = re.match(self.patterns['html']['script'], line)
-        if script_match:
-            return {
-                'name': 'script',
-                'type': 'script_tag',
-                'line_number': line_number + 1
-            }
-
-        # 检查style标签
-        style_match = re.match(self.patterns['html']['style'], line)
-        if style_match:
-            return {
-                'name': 'style',
-                'type': 'style_tag',
-                'line_number': line_number + 1
-            }
-
-        return None
-
-    def _parse_css_selector(self, line, line_number):
-        """解析CSS选择器"""
-        match = re.match(self.patterns['css']['selector'], line)
-        if match:
-            selector = match.group(1).strip()
-
-            return {
-                'name': selector,
-                'type': 'css_selector',
-                'line_number': line_number + 1
-            }
-
-        return None
-
-    def _infer_javascript_return_type(self, func_name):
-        """根据函数名推断JavaScript返回类型"""
-        if func_name.startswith('get') or func_name.startswith('is') or func_name.startswith('has'):
-            return 'boolean'
-        elif func_name.startswith('create') or func_name.startswith('make'):
-            return 'object'
-        elif func_name.startswith('calculate') or func_name.startswith('compute'):
-            return 'number'
-        elif func_name.startswith('to') and len(func_name) > 2:
-            return func_name[2:].lower()  # toString -> string, toNumber -> number
-        return 'any'
-
-    def print_results(self, result, output_file=None):
+    def format_results(self, result):
         """将解析结果转换为LLM易于理解的JSON格式"""
 
         # 构建基础结果结构
@@ -848,14 +552,6 @@ class CodeParser:
                 "message": result['error'],
                 "file": result.get('file', '')
             }
-
-            # 输出到控制台
-            print(json.dumps(output_data, indent=2, ensure_ascii=False))
-
-            # 保存到文件（如果指定了输出文件）
-            if output_file:
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump(output_data, f, indent=2, ensure_ascii=False)
             return output_data
 
         # 构建成功解析的数据结构
@@ -901,6 +597,8 @@ class CodeParser:
                 if func.get('return_types'):
                     func_info["return_type"] = func['return_types']  # 统一使用return_type
                     func_info["signature"] += f" -> ({func['return_types']})"
+                if func.get('end_line'):
+                    func_info["end_line"] = func['end_line']
                 parsed_data["functions"].append(func_info)
 
             for method in result.get('methods', []):
@@ -915,6 +613,8 @@ class CodeParser:
                 if method.get('return_types'):
                     method_info["return_type"] = method['return_types']  # 统一使用return_type
                     method_info["signature"] += f" -> ({method['return_types']})"
+                if method.get('end_line'):
+                    method_info["end_line"] = method['end_line']
                 parsed_data["methods"].append(method_info)
 
         # 处理其他语言（Java、Python等）
@@ -928,6 +628,10 @@ class CodeParser:
                 }
                 if cls.get('inheritance'):
                     class_info["inheritance"] = cls['inheritance']
+                # tree-sitter 解析器提供结束行和外层类
+                for key in ('end_line', 'parent'):
+                    if cls.get(key):
+                        class_info[key] = cls[key]
 
                 for method in cls.get('methods', []):
                     method_info = {
@@ -945,6 +649,8 @@ class CodeParser:
                     if method.get('receiver'):
                         method_info["receiver"] = method['receiver']
                         method_info["signature"] = f"({method['receiver']}) {method_info['signature']}"
+                    if method.get('end_line'):
+                        method_info["end_line"] = method['end_line']
 
                     class_info["methods"].append(method_info)
                     # 同时添加到顶层的methods列表中
@@ -970,6 +676,8 @@ class CodeParser:
                     func_info["signature"] = f"({func['receiver']}) {func_info['signature']}"
                 if func.get('type'):
                     func_info["function_type"] = func['type']
+                if func.get('end_line'):
+                    func_info["end_line"] = func['end_line']
 
                 parsed_data["functions"].append(func_info)
 
@@ -983,6 +691,11 @@ class CodeParser:
 
         output_data["parsed_data"] = parsed_data
         output_data["statistics"] = stats
+        return output_data
+
+    def print_results(self, result, output_file=None):
+        """将解析结果转换为JSON格式，输出到控制台并可选保存到文件"""
+        output_data = self.format_results(result)
 
         # 输出到控制台
         print(json.dumps(output_data, indent=2, ensure_ascii=False))
@@ -1007,9 +720,9 @@ def get_analysis_default_root_path():
     # 确保缓存目录存在，如果不存在则创建
     try:
         os.makedirs(analysis_dir, exist_ok=True)
-        print(f"缓存目录已就绪: {analysis_dir}")
+        logger.debug(f"缓存目录已就绪: {analysis_dir}")
     except OSError as e:
-        print(f"无法创建缓存目录 {analysis_dir}: {e}")
+        logger.error(f"无法创建缓存目录 {analysis_dir}: {e}")
     return analysis_dir
 
 def extract_dependencies(imports: List[Dict]) -> List[str]:
@@ -1034,100 +747,111 @@ def extract_dependencies(imports: List[Dict]) -> List[str]:
             dependencies.add(imp["path"])
     return list(dependencies)  # 只取前10个依赖
 
-def extract_key_info(project_data: Dict) -> Dict:
-    """从项目数据中提取关键信息（简洁版）"""
+def _safe_get(data, *keys, default=None):
+    """安全获取嵌套字典的值"""
+    for key in keys:
+        try:
+            data = data[key]
+        except (KeyError, TypeError):
+            return default
+    return data
+
+
+def summarize_file_analysis(file_info: Dict) -> Dict:
+    """Condensed summary of one file entry of the project analysis (see ``extract_key_info``)."""
+    analysis = _safe_get(file_info, "analysis_result", default={})
+    parsed_data = _safe_get(analysis, "parsed_data", default={})
+
+    file_summary = {
+        "file_name": _safe_get(file_info, "file_name", default="unknown"),
+        "language": _safe_get(analysis, "metadata", "language", default="unknown"),
+        "key_classes": [],
+        "key_functions": [],
+        "imports_count": _safe_get(analysis, "statistics", "total_imports", default=0),
+        "dependencies": extract_dependencies(_safe_get(parsed_data, "imports", default=[]))
+    }
+
+    # 处理类信息
+    for cls in _safe_get(parsed_data, "classes", default=[]):
+        class_info = {
+            "name": _safe_get(cls, "name", default="unknown"),
+            "methods": [_safe_get(method, "name", default="unknown")
+                        for method in _safe_get(cls, "methods", default=[])[:50]],
+            "method_count": len(_safe_get(cls, "methods", default=[]))
+        }
+        file_summary["key_classes"].append(class_info)
+
+    # 处理函数信息
+    for func in _safe_get(parsed_data, "functions", default=[]):
+        func_info = {
+            "name": _safe_get(func, "name", default="unknown"),
+            "parameters": _safe_get(func, "parameters", default=""),
+            "return_type": _safe_get(func, "return_type", default="unknown")
+        }
+        file_summary["key_functions"].append(func_info)
+    return file_summary
 
-    def safe_get(data, *keys, default=None):
-        """安全获取嵌套字典的值"""
-        for key in keys:
-            try:
-                data = data[key]
-            except (KeyError, TypeError):
-                return default
-        return data
 
+def extract_key_info(project_data: Dict) -> Dict:
+    """从项目数据中提取关键信息（简洁版）"""
     simplified_data = {
-        "project_name": safe_get(project_data, "project_name", default=""),
-        "total_files": safe_get(project_data, "total_files", default=0),
+        "project_name": _safe_get(project_data, "project_name", default=""),
+        "total_files": _safe_get(project_data, "total_files", default=0),
         "modules": {}
     }
 
-    for file_info in safe_get(project_data, "files", default=[]):
-        analysis = safe_get(file_info, "analysis_result", default={})
-        parsed_data = safe_get(analysis, "parsed_data", default={})
-
-        file_type = safe_get(file_info, "file_type", default="unknown")
-        file_name = safe_get(file_info, "file_name", default="unknown")
-
+    for file_info in _safe_get(project_data, "files", default=[]):
+        file_type = _safe_get(file_info, "file_type", default="unknown")
         if file_type not in simplified_data["modules"]:
             simplified_data["modules"][file_type] = {"file_count": 0, "files": []}
 
-        file_summary = {
-            "file_name": file_name,
-            "language": safe_get(analysis, "metadata", "language", default="unknown"),
-            "key_classes": [],
-            "key_functions": [],
-            "imports_count": safe_get(analysis, "statistics", "total_imports", default=0),
-            "dependencies": extract_dependencies(safe_get(parsed_data, "imports", default=[]))
-        }
-
-        # 处理类信息
-        for cls in safe_get(parsed_data, "classes", default=[]):
-            class_info = {
-                "name": safe_get(cls, "name", default="unknown"),
-                "methods": [safe_get(method, "name", default="unknown")
-                            for method in safe_get(cls, "methods", default=[])[:50]],
-                "method_count": len(safe_get(cls, "methods", default=[]))
-            }
-            file_summary["key_classes"].append(class_info)
-
-        # 处理函数信息
-        for func in safe_get(parsed_data, "functions", default=[]):
-            func_info = {
-                "name": safe_get(func, "name", default="unknown"),
-                "parameters": safe_get(func, "parameters", default=""),
-                "return_type": safe_get(func, "return_type", default="unknown")
-            }
-            file_summary["key_functions"].append(func_info)
-
-        simplified_data["modules"][file_type]["files"].append(file_summary)
+        simplified_data["modules"][file_type]["files"].append(summarize_file_analysis(file_info))
         simplified_data["modules"][file_type]["file_count"] += 1
 
     return simplified_data
 
 
-def get_structural_analysis(project_directory):
+# Budget of the condensed analysis served for a prompt, in bytes of JSON
+MAX_STRUCTURAL_ANALYSIS_BYTES = 400 * 1024
+
+
+def get_structural_analysis(project_directory, modules=None, max_bytes=MAX_STRUCTURAL_ANALYSIS_BYTES):
+    """
+    The condensed analysis saved by ``parse_project``, read from its per-file summaries.
+
+    Args:
+        project_directory (str): Analyzed project.
+        modules (list, optional): File types to include, e.g. [".py", ".ts"]; all by default.
+        max_bytes (int): Summaries beyond this many bytes are left out and the result is
+            marked ``"truncated": true``; 0 for no limit.
+    """
     if not os.path.isabs(project_directory):
         project_directory = os.path.abspath(project_directory)
     # 检查目录是否存在
     if not os.path.isdir(project_directory):
         print(f"Error: Directory '{project_directory}' does not exist or is not a directory")
         exit(1)
-    output_extract_filename = f"{os.path.basename(project_directory)}_project_extract_analysis.json"
-    output_extract_path = os.path.join(get_analysis_default_root_path(), output_extract_filename)
+    project_name = os.path.basename(project_directory)
+    store = AnalysisStore.open(get_analysis_default_root_path(), project_name)
+    if store is not None:
+        try:
+            return store.summaries(modules, max_bytes)
+        except (OSError, ValueError) as e:
+            print(f"Error reading analysis of '{project_name}': {e}", file=sys.stderr)
+            return {}
 
-    # 4. 读取并返回内容
+    # Analysis saved as one JSON document before the per-file artifacts
+    output_extract_filename = f"{project_name}_project_extract_analysis.json"
+    output_extract_path = os.path.join(get_analysis_default_root_path(), output_extract_filename)
     if not os.path.isfile(output_extract_path):
         print(f"Warning: Analysis file '{output_extract_path}' not found, returning empty dict.")
         return {}
 
     try:
-        # 检查文件大小
-        file_size = os.path.getsize(output_extract_path)
-        max_size = 400 * 1024  # 400 KiB
-
-        if file_size > max_size:
-            print(f"Warning: Analysis file '{output_extract_path}' is too large ({file_size} bytes), "
-                  f"reading only first {max_size} bytes.")
-            with open(output_extract_path, "r", encoding="utf-8") as f:
-                # 只读取前400KiB内容
-                partial_content = f.read(max_size)
-                # 尝试解析部分内容为JSON
-                data = json.loads(partial_content)
-        else:
-            with open(output_extract_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-
+        with open(output_extract_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if modules is not None:
+            data["modules"] = {k: v for k, v in data.get("modules", {}).items() if k in modules}
         return data
     except (OSError, json.JSONDecodeError) as e:
         print(f"Error reading or parsing '{output_extract_path}': {e}", file=sys.stderr)
@@ -1195,6 +919,9 @@ def get_java_callgraph(query: str,repo_name: str,):
     #获取向量
     if  os.path.getsize(summarize_path) > 500 * 1024:
         print("==================get_java_callgraph============="+query)
+        # Imported here: the vector search pulls in faiss and the embedder clients
+        from api.config import is_ollama_embedder
+        from api.tools.transfor_tokens import similarity_search
         summarize_filename_faiss_store = f"{repo_name}_faiss_store"
         faiss_store_path = os.path.join(get_analysis_default_root_path(), summarize_filename_faiss_store)
         the_similarity_search =  similarity_search(summarize_path,query,faiss_store_path,30,is_ollama_embedder())
@@ -1288,118 +1015,247 @@ def extract_owner_repo(repo_url):
 
     return f"{owner}_{repo}"
 
-def parse_project(project_directory):
-    # 获取当前脚本文件所在的目录
-    # 确保项目目录是绝对路径
-    if not os.path.isabs(project_directory):
-        project_directory = os.path.abspath(project_directory)
+# Structural parser engines: the line-regex CodeParser, the tree-sitter TreeSitterParser,
+# or tree-sitter when it is installed
+CODE_PARSER_ENGINES = ("regex", "tree_sitter", "auto")
 
-    code_parser = CodeParser()
-
-    # 定义支持的文件后缀映射
-    language_map = {
-        '.py': 'python',
-        '.java': 'java',
-        '.c': 'c_cpp',
-        '.h': 'c_cpp',
-        '.cpp': 'c_cpp',
-        '.hpp': 'c_cpp',
-        '.js': 'javascript',
-        '.jsx': 'javascript',
-        '.ts': 'typescript',
-        '.tsx': 'typescript',
-        '.go': 'go',
-        '.rs': 'rust',
-        '.php': 'php',
-        '.swift': 'swift',
-        '.cs': 'csharp'
-    }
 
-    # 获取所有支持的后缀名
-    supported_extensions = set(language_map.keys())
+def create_code_parser(engine="regex"):
+    """
+    A parser for ``engine`` (``code_parser.engine`` in repo.json).
 
-    # 检查目录是否存在
-    if not os.path.isdir(project_directory):
-        print(f"Error: Directory '{project_directory}' does not exist or is not a directory")
-        exit(1)
+    tree-sitter is an optional dependency: without it, ``tree_sitter`` falls back to the
+    regex parser with a warning and ``auto`` falls back silently.
+    """
+    if engine not in CODE_PARSER_ENGINES:
+        raise ValueError(f"Unknown code parser engine '{engine}', expected one of {CODE_PARSER_ENGINES}")
+    if engine == "regex":
+        return CodeParser()
+    from api.tools.tree_sitter_parser import TreeSitterParser, tree_sitter_available
+    if tree_sitter_available():
+        return TreeSitterParser()
+    if engine == "tree_sitter":
+        logger.warning("tree-sitter is not installed, using the regex code parser")
+    return CodeParser()
+
+
+def code_parser_signature(engine="regex"):
+    """
+    The parser ``engine`` resolves to in this environment, with its grammars.
 
-    # 创建项目级的JSON数据结构
-    project_data = {
-        "project_name": os.path.basename(project_directory),
-        "project_path": project_directory,
-        "total_files": 0,
-        "processed_files": 0,
-        "files": []
-    }
+    ``auto`` (and ``tree_sitter`` without the bindings) depends on what is installed, so
+    cached analysis results are keyed on this rather than on the configured engine.
+    """
+    parser = create_code_parser(engine)
+    if type(parser) is CodeParser:
+        return type(parser).__name__
+    return f"{type(parser).__name__}:{','.join(parser.available_grammars())}"
+
+
+# Below this many files a process pool costs more to start than it saves
+MIN_PARALLEL_PARSE_FILES = 200
+
+# One parser per engine in each worker process, created on first use
+_worker_parsers = {}
 
-    # 遍历目录下的所有文件
+
+def list_project_files(project_directory):
+    """Supported source files under ``project_directory``, in a stable (sorted) walk order."""
+    file_paths = []
     for root, dirs, files in os.walk(project_directory):
-        for file in files:
-            # 获取文件扩展名
-            _, ext = os.path.splitext(file)
-
-            # 检查是否是支持的文件类型
-            if ext.lower() in supported_extensions:
-                file_path = os.path.join(root, file)
-                project_data["total_files"] += 1
-
-                try:
-                    print("=" * 50)
-                    print(f"Processing: {file_path}")
-                    result = code_parser.parse_code(file_path)
-                    file_json = code_parser.print_results(result)
-
-                    # 将文件信息添加到项目数据中
-                    file_data = {
-                        "file_path": file_path,
-                        "file_name": file,
-                        "relative_path": os.path.relpath(file_path, project_directory),
-                        "file_type": ext.lower(),
-                        "language": language_map.get(ext.lower(), "unknown"),
-                        "analysis_result": file_json  # 假设file_json已经是字典格式
-                    }
+        dirs.sort()
+        for file in sorted(files):
+            if os.path.splitext(file)[1].lower() in PROJECT_LANGUAGE_MAP:
+                file_paths.append(os.path.join(root, file))
+    return file_paths
+
+
+def analyze_file(file_path, project_directory, code_parser=None):
+    """Parse one file into its entry of the project analysis; failures become an entry with an error."""
+    ext = os.path.splitext(file_path)[1].lower()
+    file_data = {
+        "file_path": file_path,
+        "file_name": os.path.basename(file_path),
+        "relative_path": os.path.relpath(file_path, project_directory),
+        "file_type": ext,
+        "language": PROJECT_LANGUAGE_MAP.get(ext, "unknown"),
+    }
+    try:
+        code_parser = code_parser or CodeParser()
+        file_data["analysis_result"] = code_parser.format_results(code_parser.parse_code(file_path))
+    except Exception as e:
+        logger.warning(f"Error processing file {file_path}: {e}")
+        file_data.update(error=str(e), status="failed")
+    return file_data
 
-                    project_data["files"].append(file_data)
-                    project_data["processed_files"] += 1
-
-                    print(f"Successfully processed: {file_path}")
-                    print()
-
-                except Exception as e:
-                    error_data = {
-                        "file_path": file_path,
-                        "file_name": file,
-                        "relative_path": os.path.relpath(file_path, project_directory),
-                        "file_type": ext.lower(),
-                        "language": language_map.get(ext.lower(), "unknown"),
-                        "error": str(e),
-                        "status": "failed"
-                    }
-                    project_data["files"].append(error_data)
-                    print(f"Error processing file {file_path}: {str(e)}")
-                    print("Continuing with next file...\n")
-                    continue
 
-    # 保存项目级JSON到文件
-    output_filename = f"{os.path.basename(project_directory)}_project_analysis.json"
-    output_path = os.path.join(get_analysis_default_root_path(), output_filename)
+def _analyze_files(file_paths, project_directory, engine="regex"):
+    """Worker task: analyze a chunk of files with the process's parser."""
+    parser = _worker_parsers.get(engine)
+    if parser is None:
+        parser = _worker_parsers[engine] = create_code_parser(engine)
+    return [analyze_file(file_path, project_directory, parser) for file_path in file_paths]
 
-    output_extract_filename = f"{os.path.basename(project_directory)}_project_extract_analysis.json"
-    output_extract_path = os.path.join(get_analysis_default_root_path(), output_extract_filename)
-    extract_value = extract_key_info(project_data)
 
-    for fp, dt in ((output_path, project_data),
-                   (output_extract_path, extract_value)):
+def analyze_project_files(project_directory, file_paths, workers=0, chunk_size=64, progress=None,
+                          engine="regex"):
+    """
+    Analyze ``file_paths`` and return their entries in the same order.
+
+    Args:
+        project_directory (str): Root the relative paths are computed from.
+        file_paths (list): Files to analyze.
+        workers (int): Worker processes; 0 picks one per CPU, 1 analyzes in this process.
+        chunk_size (int): Files sent to a worker per task.
+        progress (callable, optional): Called as ``progress(done, total)`` after each chunk.
+        engine (str): Parser engine, see ``create_code_parser``.
+    """
+    total = len(file_paths)
+    chunk_size = max(1, chunk_size)
+    chunks = [file_paths[i:i + chunk_size] for i in range(0, total, chunk_size)]
+    workers = min(workers if workers > 0 else (os.cpu_count() or 1), len(chunks))
+    if total < MIN_PARALLEL_PARSE_FILES:
+        workers = 1
+
+    if workers <= 1:
+        results = (_analyze_files(chunk, project_directory, engine) for chunk in chunks)
+        pool = None
+    else:
+        # spawn keeps the workers independent of the (multi-threaded) server process
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        # map yields chunks in submission order, so the merged result does not depend on scheduling
+        results = pool.map(_analyze_files, chunks, [project_directory] * len(chunks), [engine] * len(chunks))
+
+    file_entries = []
+    try:
+        for chunk_entries in results:
+            file_entries.extend(chunk_entries)
+            if progress is not None:
+                progress(len(file_entries), total)
+            logger.debug(f"Analyzed {len(file_entries)}/{total} files of {project_directory}")
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return file_entries
+
+
+def _remove_legacy_analysis(analysis_dir, project_name):
+    """Delete the single-document analysis JSON that the per-file artifacts replace."""
+    for suffix in ("_project_analysis.json", "_project_extract_analysis.json"):
+        path = os.path.join(analysis_dir, f"{project_name}{suffix}")
+        if os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Could not remove {path}: {e}")
+
+
+def update_project_analysis(project_directory, workers=0, chunk_size=64, progress=None, engine="regex",
+                            use_cache=True) -> Tuple[Dict, AnalysisCacheStats]:
+    """
+    Analyze the structure of every supported source file of a project and save the
+    full and the condensed analysis under ~/.adalflow/analysis, one JSON line per file
+    with an index (see ``AnalysisWriter``).
+
+    With ``use_cache``, per-file results are kept in ``{name}_analysis_cache.json`` next
+    to them and only files whose content changed since the last run are parsed, in chunks
+    on a process pool (see ``analyze_project_files``). The result lists files in sorted
+    path order whatever the number of workers; when no file changed the saved artifacts
+    are left as they are.
+
+    Returns:
+        tuple: The condensed analysis (``extract_key_info``) and the cache counters.
+
+    Raises:
+        Exception: Whatever prevented writing the artifacts; the cache is left unchanged.
+    """
+    # 确保项目目录是绝对路径
+    if not os.path.isabs(project_directory):
+        project_directory = os.path.abspath(project_directory)
+
+    # 检查目录是否存在
+    if not os.path.isdir(project_directory):
+        raise NotADirectoryError(f"Directory '{project_directory}' does not exist or is not a directory")
+
+    start = time.perf_counter()
+    analysis_dir = get_analysis_default_root_path()
+    cache_path = analysis_cache_path(analysis_dir, project_directory)
+    signature = code_parser_signature(engine)
+    cache = AnalysisCache.load(cache_path, signature) if use_cache else AnalysisCache(engine=signature)
+    stats = AnalysisCacheStats()
+
+    file_paths = list_project_files(project_directory)
+    relative_paths = [os.path.relpath(file_path, project_directory) for file_path in file_paths]
+    file_entries = [None] * len(file_paths)
+    pending = []
+    for i, (file_path, relative_path) in enumerate(zip(file_paths, relative_paths)):
+        entry, digest, st = cache.lookup(relative_path, file_path, stats) if use_cache else (None, None, None)
+        if entry is not None:
+            # The project may have moved since the entry was cached
+            file_entries[i] = dict(entry, file_path=file_path)
+        else:
+            pending.append((i, digest, st))
+    stats.reused = len(file_paths) - len(pending)
+    stats.parsed = len(pending)
+    stats.removed = cache.prune(relative_paths)
+
+    parsed = analyze_project_files(project_directory, [file_paths[i] for i, _, _ in pending],
+                                   workers, chunk_size, progress, engine)
+    for (i, digest, st), entry in zip(pending, parsed):
+        file_entries[i] = entry
+        # Failures may be transient (unreadable file), so they are parsed again next time
+        if use_cache and digest is not None and "error" not in entry:
+            cache.store(relative_paths[i], digest, st, entry)
+
+    # 逐个文件写入分析结果，同时汇总简洁版
+    project_name = os.path.basename(project_directory)
+    extract_value = {"project_name": project_name, "total_files": len(file_paths), "modules": {}}
+    unchanged = use_cache and not stats.parsed and not stats.removed
+    write = not (unchanged and os.path.exists(analysis_store_paths(analysis_dir, project_name)[2]))
+    writer = None
+    try:
+        if write:
+            writer = AnalysisWriter(analysis_dir, project_name, project_directory)
+        for entry in file_entries:
+            file_type = entry.get("file_type", "unknown")
+            summary = summarize_file_analysis(entry)
+            module = extract_value["modules"].setdefault(file_type, {"file_count": 0, "files": []})
+            module["files"].append(summary)
+            module["file_count"] += 1
+            if writer is not None:
+                writer.add(entry, file_type, summary)
+        if writer is not None:
+            writer.close()
+            _remove_legacy_analysis(analysis_dir, project_name)
+    except Exception as e:
+        if writer is not None:
+            writer.abort()
+        # The cache is not saved either: it would mark these files as analyzed while the
+        # artifacts on disk still hold the previous analysis
+        logger.error(f"Error saving analysis of {project_directory}: {e}")
+        raise
+    if cache.changed:
         try:
-            if os.path.exists(fp):
-                os.remove(fp)
-            with open(fp, 'w', encoding='utf-8') as f:
-                json.dump(dt, f, indent=2, ensure_ascii=False)
+            cache.save(cache_path)
         except Exception as e:
-            print(f"Error saving JSON file {fp}: {e}")
-    return extract_value
+            logger.error(f"Error saving analysis cache {cache_path}: {e}")
+
+    processed = sum(1 for entry in file_entries if "error" not in entry)
+    logger.info(f"Analyzed {processed}/{len(file_paths)} files of {project_directory} "
+                f"in {time.perf_counter() - start:.2f}s: {stats.summary()}")
+    return extract_value, stats
 
 
+def parse_project(project_directory, workers=0, chunk_size=64, progress=None, engine="regex", use_cache=True):
+    """
+    Analyze a project and save its analysis artifacts, see ``update_project_analysis``.
+
+    Returns:
+        dict: The condensed analysis (``extract_key_info``).
+    """
+    extract_value, _ = update_project_analysis(project_directory, workers, chunk_size, progress, engine, use_cache)
+    return extract_value
+
 
 if __name__ == "__main__":
 
@@ -0,0 +1,153 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryCacheStats:
+    """Counters of a QueryEmbeddingCache."""
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    expirations: int = 0
+    evictions: int = 0
+    errors: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+class QueryEmbeddingCache:
+    """
+    Thread-safe LRU cache of query embeddings with a time-to-live.
+
+    Keys are typically (embedder signature, query text). A miss computes the embedding
+    once; callers asking for the same key while that request is in flight wait for its
+    result instead of sending their own. Failures are passed to every waiter and are
+    not cached.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = QueryCacheStats()
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for ``key``, or compute it, sharing the computation with concurrent callers."""
+        return self.get_or_compute_many([key], lambda missing: [compute()])[0]
+
+    def get_or_compute_many(self, keys: Sequence[Hashable], compute_many: Callable[[List[Hashable]], Sequence]) -> List[Any]:
+        """
+        Values for ``keys`` in order, computing all missing ones with a single ``compute_many`` call.
+
+        ``compute_many`` receives the keys that are neither cached nor in flight elsewhere
+        (each once) and must return one value per key.
+        """
+        results: List[Any] = [None] * len(keys)
+        pending: List[Tuple[int, Future]] = []
+        owned: "OrderedDict[Hashable, Future]" = OrderedDict()
+        with self._lock:
+            now = self._clock()
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None:
+                    value, expires_at = entry
+                    if expires_at > now:
+                        self._entries.move_to_end(key)
+                        self.stats.hits += 1
+                        results[i] = value
+                        continue
+                    del self._entries[key]
+                    self.stats.expirations += 1
+
+                future = self._in_flight.get(key)
+                if future is None:
+                    future = Future()
+                    self._in_flight[key] = future
+                    owned[key] = future
+                    self.stats.misses += 1
+                else:
+                    self.stats.coalesced += 1
+                pending.append((i, future))
+
+        if owned:
+            try:
+                values = list(compute_many(list(owned)))
+                if len(values) != len(owned):
+                    raise ValueError(f"Expected {len(owned)} values, got {len(values)}")
+            except BaseException as e:
+                with self._lock:
+                    for key in owned:
+                        self._in_flight.pop(key, None)
+                    self.stats.errors += 1
+                for future in owned.values():
+                    future.set_exception(e)
+                raise
+
+            with self._lock:
+                expires_at = self._clock() + self.ttl_seconds
+                for key, value in zip(owned, values):
+                    self._in_flight.pop(key, None)
+                    if self.max_entries > 0:
+                        self._entries[key] = (value, expires_at)
+                        self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.stats.evictions += 1
+            for future, value in zip(owned.values(), values):
+                future.set_result(value)
+
+        for i, future in pending:
+            results[i] = future.result()
+        return results
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = self.stats.as_dict()
+            metrics.update(entries=len(self._entries), in_flight=len(self._in_flight), max_entries=self.max_entries)
+        lookups = metrics["hits"] + metrics["misses"] + metrics["coalesced"]
+        metrics["hit_rate"] = round((metrics["hits"] + metrics["coalesced"]) / lookups, 3) if lookups else 0.0
+        return metrics
+
+
+_shared_cache: Optional[QueryEmbeddingCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_query_embedding_cache(config: Optional[Dict] = None) -> Optional[QueryEmbeddingCache]:
+    """
+    Process-wide QueryEmbeddingCache, or None when disabled.
+
+    Args:
+        config (dict, optional): ``query_cache`` section of embedder.json with
+            ``enabled``, ``max_entries`` and ``ttl_seconds``.
+    """
+    global _shared_cache
+    config = config or {}
+    if not config.get("enabled", True):
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = QueryEmbeddingCache(
+                max_entries=int(config.get("max_entries", 1024)),
+                ttl_seconds=float(config.get("ttl_seconds", 3600)),
+            )
+        return _shared_cache
@@ -0,0 +1,191 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def store_version(store_dir: str) -> Optional[Tuple[int, int]]:
+    """
+    Identify the current contents of a vector store directory.
+
+    Writers swap in a new directory, so the header's inode and mtime change on every
+    rebuild or refresh. Returns None when there is no store yet.
+    """
+    try:
+        st = os.stat(os.path.join(store_dir, "header.json"))
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns
+
+
+@dataclass
+class CacheEntry:
+    """A prepared retrieval index and the store version it was built from."""
+    value: Any
+    version: Hashable
+    nbytes: int
+
+
+@dataclass
+class CacheStats:
+    """Counters of a RetrieverCache."""
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+    evictions: int = 0
+    builds: int = 0
+    build_errors: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+@dataclass
+class _BuildLock:
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    waiters: int = 0
+
+
+class RetrieverCache:
+    """
+    Thread-safe LRU cache of prepared retrieval indexes shared by all requests of a process.
+
+    Entries are keyed by repository, file filters and embedder configuration, and carry
+    the version of the store they were built from; a lookup with a different version
+    drops the entry. Eviction keeps the estimated total size under ``max_bytes`` and the
+    number of entries under ``max_entries``. Concurrent misses for the same key build
+    the index once and the other callers wait for that result.
+    """
+
+    def __init__(self, max_bytes: int = 2 * 1024 ** 3, max_entries: int = 8):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._build_locks: Dict[Hashable, _BuildLock] = {}
+
+    def get(self, key: Hashable, version: Hashable = None) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version != version:
+                self._remove(key)
+                self.stats.invalidations += 1
+                entry = None
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry.value
+
+    def put(self, key: Hashable, value: Any, version: Hashable = None, nbytes: int = 0) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if nbytes > self.max_bytes:
+                logger.warning(f"Retriever index of {nbytes} bytes exceeds the cache budget, not caching it")
+                return
+            self._entries[key] = CacheEntry(value=value, version=version, nbytes=nbytes)
+            self._total_bytes += nbytes
+            while self._entries and (self._total_bytes > self.max_bytes or len(self._entries) > self.max_entries):
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= evicted.nbytes
+                self.stats.evictions += 1
+                logger.info(f"Evicted retriever index {evicted_key} from cache")
+
+    def get_or_build(self, key: Hashable, version_func: Callable[[], Hashable],
+                     build: Callable[[], Tuple[Any, int]]) -> Any:
+        """
+        Return the cached value for ``key``, building it at most once per version.
+
+        Args:
+            key: Cache key.
+            version_func: Returns the current version of the underlying store. It is called
+                again after ``build`` because building may rewrite the store.
+            build: Returns ``(value, estimated_nbytes)``.
+        """
+        value = self.get(key, version_func())
+        if value is not None:
+            return value
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, _BuildLock())
+            build_lock.waiters += 1
+        try:
+            with build_lock.lock:
+                # Another request may have built it while we waited
+                with self._lock:
+                    entry = self._entries.get(key)
+                if entry is not None and entry.version == version_func():
+                    with self._lock:
+                        self._entries.move_to_end(key)
+                    return entry.value
+                try:
+                    value, nbytes = build()
+                except Exception:
+                    with self._lock:
+                        self.stats.build_errors += 1
+                    raise
+                with self._lock:
+                    self.stats.builds += 1
+                self.put(key, value, version_func(), nbytes)
+                return value
+        finally:
+            with self._lock:
+                build_lock.waiters -= 1
+                if build_lock.waiters == 0:
+                    self._build_locks.pop(key, None)
+
+    def invalidate(self, key: Hashable = None) -> None:
+        """Drop one entry, or every entry when ``key`` is None."""
+        with self._lock:
+            keys = list(self._entries) if key is None else [key]
+            for k in keys:
+                if k in self._entries:
+                    self._remove(k)
+                    self.stats.invalidations += 1
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.nbytes
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats.hits + self.stats.misses
+            return {
+                **self.stats.as_dict(),
+                "hit_rate": round(self.stats.hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "total_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+            }
+
+
+_shared_cache: Optional[RetrieverCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_retriever_cache(config: Optional[Dict] = None) -> RetrieverCache:
+    """
+    Process-wide RetrieverCache, created on first use.
+
+    Args:
+        config (dict, optional): ``retriever_cache`` section of embedder.json with
+            ``max_memory_mb`` and ``max_entries``.
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            config = config or {}
+            _shared_cache = RetrieverCache(
+                max_bytes=int(config.get("max_memory_mb", 2048)) * 1024 * 1024,
+                max_entries=int(config.get("max_entries", 8)),
+            )
+        return _shared_cache
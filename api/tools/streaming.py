@@ -0,0 +1,158 @@
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    """Items processed by one pipeline stage and the time spent in it."""
+    name: str
+    items: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class PipelineStats:
+    """Per-stage counters of a streaming pipeline run."""
+    stages: List[StageStats] = field(default_factory=list)
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        return {s.name: {"items": s.items, "seconds": round(s.seconds, 3)} for s in self.stages}
+
+
+class _Stop(Exception):
+    pass
+
+
+def _put(q: queue.Queue, item: Any, stop: threading.Event) -> None:
+    # Blocks while the queue is full (back-pressure) but notices when the pipeline is aborted
+    while True:
+        if stop.is_set():
+            raise _Stop()
+        try:
+            q.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+def _get(q: queue.Queue, stop: threading.Event) -> Any:
+    while True:
+        if stop.is_set():
+            raise _Stop()
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+
+
+def run_pipeline(source: Iterable, stages: Sequence[Callable[[Any], Any]], sink: Callable[[Any], None],
+                 queue_size: int = 2, stage_names: Sequence[str] = None) -> PipelineStats:
+    """
+    Push items from ``source`` through ``stages`` into ``sink`` with bounded queues in between.
+
+    The source and every stage run on their own thread, and ``sink`` runs on the calling
+    thread. Each queue holds at most ``queue_size`` items, so a slow stage stalls the ones
+    before it instead of letting work pile up in memory; at most about
+    ``(len(stages) + 1) * (queue_size + 1)`` items are alive at any time. A stage may return
+    None to drop an item. The first exception raised anywhere stops all threads and is
+    re-raised here.
+
+    Returns:
+        PipelineStats: Items and seconds per stage.
+    """
+    names = list(stage_names or [getattr(stage, "__name__", f"stage{i}") for i, stage in enumerate(stages)])
+    stats = PipelineStats([StageStats("source")] + [StageStats(name) for name in names] + [StageStats("sink")])
+    queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in range(len(stages) + 1)]
+    stop = threading.Event()
+    errors: List[BaseException] = []
+
+    def fail(error: BaseException) -> None:
+        if not errors:
+            errors.append(error)
+        stop.set()
+
+    def produce() -> None:
+        source_stats = stats.stages[0]
+        try:
+            iterator = iter(source)
+            while True:
+                start = time.perf_counter()
+                item = next(iterator, _DONE)
+                source_stats.seconds += time.perf_counter() - start
+                if item is _DONE:
+                    break
+                source_stats.items += 1
+                _put(queues[0], item, stop)
+            _put(queues[0], _DONE, stop)
+        except _Stop:
+            pass
+        except BaseException as e:
+            fail(e)
+
+    def work(index: int) -> None:
+        stage, stage_stats = stages[index], stats.stages[index + 1]
+        try:
+            while True:
+                item = _get(queues[index], stop)
+                if item is _DONE:
+                    _put(queues[index + 1], _DONE, stop)
+                    return
+                start = time.perf_counter()
+                result = stage(item)
+                stage_stats.seconds += time.perf_counter() - start
+                stage_stats.items += 1
+                if result is not None:
+                    _put(queues[index + 1], result, stop)
+        except _Stop:
+            pass
+        except BaseException as e:
+            fail(e)
+
+    threads = [threading.Thread(target=produce, name="pipeline-source", daemon=True)]
+    threads += [threading.Thread(target=work, args=(i,), name=f"pipeline-{names[i]}", daemon=True)
+                for i in range(len(stages))]
+    for thread in threads:
+        thread.start()
+
+    sink_stats = stats.stages[-1]
+    try:
+        while True:
+            item = _get(queues[-1], stop)
+            if item is _DONE:
+                break
+            start = time.perf_counter()
+            sink(item)
+            sink_stats.seconds += time.perf_counter() - start
+            sink_stats.items += 1
+    except _Stop:
+        pass
+    except BaseException as e:
+        fail(e)
+    finally:
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+    logger.info(f"Pipeline stats: {stats.as_dict()}")
+    return stats
+
+
+def batched(items: Iterable, size: int) -> Iterable[List]:
+    """Yield lists of up to ``size`` consecutive items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,83 @@
+import logging
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENCODING = "cl100k_base"
+
+# Rough approximation used when tiktoken is unavailable or exact counts are not needed
+CHARS_PER_TOKEN = 4
+
+# tiktoken releases the GIL while encoding, so a few threads speed up large batches
+DEFAULT_COUNT_THREADS = min(8, os.cpu_count() or 1)
+
+_encoders: Dict[str, object] = {}
+_encoders_lock = threading.Lock()
+
+
+def get_encoder(name: str = DEFAULT_ENCODING):
+    """
+    The tiktoken encoding ``name``, loaded once per process.
+
+    Returns:
+        tiktoken.Encoding or None: None if the encoding cannot be loaded (e.g. offline
+        without a cached copy); the failure is remembered so it is only logged once.
+    """
+    encoder = _encoders.get(name)
+    if encoder is not None or name in _encoders:
+        return encoder
+    with _encoders_lock:
+        if name not in _encoders:
+            try:
+                import tiktoken
+                _encoders[name] = tiktoken.get_encoding(name)
+            except Exception as e:
+                logger.warning(f"Could not load tiktoken encoding {name}, estimating tokens from length: {e}")
+                _encoders[name] = None
+        return _encoders[name]
+
+
+@lru_cache(maxsize=None)
+def encoding_name_for_model(model: str) -> str:
+    """Name of the tiktoken encoding of an OpenAI model, or the default encoding if it is unknown."""
+    try:
+        import tiktoken
+        return tiktoken.model.encoding_name_for_model(model)
+    except Exception:
+        return DEFAULT_ENCODING
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count approximated from the length of ``text``, without tokenizing it."""
+    return len(text) // CHARS_PER_TOKEN
+
+
+def count_tokens(text: str, encoding_name: str = DEFAULT_ENCODING, estimate: bool = False) -> int:
+    """
+    Number of tokens of ``text``.
+
+    Args:
+        text (str): Text to count.
+        encoding_name (str): tiktoken encoding to count with.
+        estimate (bool): Approximate from the text length instead of tokenizing, for
+            size checks where an exact count is wasted work.
+    """
+    encoder = None if estimate else get_encoder(encoding_name)
+    if encoder is None:
+        return estimate_tokens(text)
+    # Special-token markers in source files are counted as ordinary text
+    return len(encoder.encode_ordinary(text))
+
+
+def count_tokens_many(texts: Sequence[str], encoding_name: str = DEFAULT_ENCODING,
+                      num_threads: int = DEFAULT_COUNT_THREADS) -> List[int]:
+    """Token counts of ``texts`` in order, tokenized as one batch on ``num_threads`` threads."""
+    encoder = get_encoder(encoding_name)
+    if encoder is None:
+        return [estimate_tokens(text) for text in texts]
+    if len(texts) <= 1 or num_threads <= 1:
+        return [len(encoder.encode_ordinary(text)) for text in texts]
+    return [len(tokens) for tokens in encoder.encode_ordinary_batch(list(texts), num_threads=num_threads)]
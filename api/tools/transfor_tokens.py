@@ -13,12 +13,15 @@ from pathlib import Path
 from typing import List, Dict, Optional
 
 import openai
-import ollama
 import faiss
 import numpy as np
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document as LcDocument
 
+from api.tools.ollama_batch import OllamaBatchConfig, OllamaBatchEmbedder
+from api.tools.embedding_cache import get_embedding_cache
+from api.tools.ann_index import AnnIndexConfig, apply_search_params, build_ann_index
+
 # ---------- 配置 ----------
 CONFIG_DIR = os.environ.get('DEEPWIKI_CONFIG_DIR', None)
 if CONFIG_DIR:
@@ -43,6 +46,10 @@ for k, v in EMBED_CFG["initialize_kwargs"].items():
 # ---------- 1. Embedding 客户端 ----------
 class BaseEmbedder:
     """统一接口：list[str] -> np.ndarray"""
+    # 嵌入缓存的 key：与主流程一致，用 "client_class/model" 和 dimensions
+    cache_model: str = ""
+    cache_dimensions = None
+
     def embed_documents(self, texts: List[str]) -> np.ndarray:
         raise NotImplementedError
 
@@ -51,6 +58,8 @@ class OpenAIEmbedder(BaseEmbedder):
         self.client = openai.OpenAI(**cfg["initialize_kwargs"])
         self.batch = cfg["batch_size"]
         self.model_kwargs = cfg["model_kwargs"]
+        self.cache_model = f"{cfg.get('client_class')}/{self.model_kwargs.get('model')}"
+        self.cache_dimensions = self.model_kwargs.get("dimensions")
 
     def embed_documents(self, texts: List[str]) -> np.ndarray:
         vecs = []
@@ -64,9 +73,16 @@ class OpenAIEmbedder(BaseEmbedder):
 class OllamaEmbedder(BaseEmbedder):
     def __init__(self, cfg: dict):
         self.model = cfg["model_kwargs"]["model"]
+        self.cache_model = f"{cfg.get('client_class')}/{self.model}"
+        self.cache_dimensions = cfg["model_kwargs"].get("dimensions")
+        # 批量 + 并发调用 /api/embed，带重试
+        self.client = OllamaBatchEmbedder(self.model, config=OllamaBatchConfig.from_dict(cfg))
 
     def embed_documents(self, texts: List[str]) -> np.ndarray:
-        vecs = [ollama.embeddings(model=self.model, prompt=t)["embedding"] for t in texts]
+        vecs = self.client.embed(texts)
+        failed = sum(1 for v in vecs if v is None)
+        if failed:
+            raise RuntimeError(f"Ollama embedding failed for {failed}/{len(texts)} texts")
         return np.array(vecs, dtype="float32")
 
 def get_embedder(use_ollama: bool = False) -> BaseEmbedder:
@@ -101,6 +117,7 @@ class LocalFAISSStore:
     @staticmethod
     def load(folder: str) -> "LocalFAISSStore":
         index = faiss.read_index(os.path.join(folder, "index.bin"))
+        apply_search_params(index, AnnIndexConfig.from_dict(RETRIEVER_CFG.get("index")))
         with open(os.path.join(folder, "docs.json"), encoding="utf8") as f:
             d = json.load(f)
         return LocalFAISSStore(index, d["texts"], d["metas"])
@@ -123,11 +140,17 @@ def build_vector_store(json_file: str, save_dir: str, use_ollama: bool = False):
 
     print(f"[3] 向量化 ...")
     embedder = get_embedder(use_ollama)
-    vecs = embedder.embed_documents(chunks)
-    d = vecs.shape[1]
-    index = faiss.IndexFlatIP(d)   # 内积相似度（OpenAI 向量已归一化）
-    faiss.normalize_L2(vecs)       # 必须归一化
-    index.add(vecs)
+    cache = get_embedding_cache(CFG.get("embedding_cache"))
+    if cache is not None:
+        # 相同文本块只向服务端请求一次，跨仓库 / 分支复用
+        vecs = cache.embed(chunks, embedder.cache_model, embedder.cache_dimensions, embedder.embed_documents)
+        vecs = np.array(vecs, dtype="float32")
+        print(f"   嵌入缓存命中率 {cache.stats.hit_rate}")
+    else:
+        vecs = embedder.embed_documents(chunks)
+    faiss.normalize_L2(vecs)       # 必须归一化，内积即余弦相似度
+    # 索引类型（Flat / IVF-Flat / IVF-PQ / HNSW）由 embedder.json 的 retriever.index 决定
+    index = build_ann_index(vecs, AnnIndexConfig.from_dict(RETRIEVER_CFG.get("index")))
 
     print(f"[4] 保存到 {save_dir}")
     store = LocalFAISSStore(index, chunks, [{} for _ in chunks])
@@ -142,6 +165,8 @@ def semantic_search(query: str, store: LocalFAISSStore, top_k: int = 20):
     D, I = store.index.search(qvec, top_k)
     results = []
     for score, idx in zip(D[0], I[0]):
+        if idx < 0:   # IVF 探查的桶内不足 top_k 条时补 -1
+            continue
         results.append({
             "score": float(score),
             "text" : store.texts[idx],
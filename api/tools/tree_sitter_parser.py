@@ -0,0 +1,430 @@
+import importlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from api.tools.project_parser import CodeParser, infer_javascript_return_type
+
+logger = logging.getLogger(__name__)
+
+# Grammar of each language (or file extension, where one language has several grammars):
+# (module of the tree-sitter-<language> wheel, function returning the grammar)
+GRAMMARS = {
+    'python': ('tree_sitter_python', 'language'),
+    'java': ('tree_sitter_java', 'language'),
+    'c_cpp': ('tree_sitter_cpp', 'language'),
+    'javascript': ('tree_sitter_javascript', 'language'),
+    'typescript': ('tree_sitter_typescript', 'language_typescript'),
+    '.tsx': ('tree_sitter_typescript', 'language_tsx'),
+    'go': ('tree_sitter_go', 'language'),
+    'rust': ('tree_sitter_rust', 'language'),
+    'php': ('tree_sitter_php', 'language_php'),
+    'swift': ('tree_sitter_swift', 'language'),
+    'csharp': ('tree_sitter_c_sharp', 'language'),
+}
+
+CLASS_NODES = {
+    'python': {'class_definition'},
+    'java': {'class_declaration', 'interface_declaration', 'enum_declaration', 'record_declaration'},
+    'c_cpp': {'class_specifier', 'struct_specifier'},
+    'javascript': {'class_declaration', 'class'},
+    'typescript': {'class_declaration', 'abstract_class_declaration', 'interface_declaration', 'class'},
+    'rust': {'struct_item', 'enum_item', 'trait_item', 'impl_item'},
+    'php': {'class_declaration', 'interface_declaration', 'trait_declaration'},
+    'swift': {'class_declaration', 'protocol_declaration'},
+    'csharp': {'class_declaration', 'struct_declaration', 'interface_declaration', 'record_declaration'},
+}
+
+FUNCTION_NODES = {
+    'python': {'function_definition'},
+    'java': {'method_declaration', 'constructor_declaration'},
+    'c_cpp': {'function_definition'},
+    'javascript': {'function_declaration', 'generator_function_declaration', 'method_definition'},
+    'typescript': {'function_declaration', 'generator_function_declaration', 'method_definition'},
+    'go': {'function_declaration', 'method_declaration'},
+    'rust': {'function_item'},
+    'php': {'function_definition', 'method_declaration'},
+    'swift': {'function_declaration'},
+    'csharp': {'method_declaration', 'constructor_declaration'},
+}
+
+# Anonymous functions, named after what they are assigned to (JavaScript/TypeScript)
+ANONYMOUS_FUNCTION_NODES = {'arrow_function', 'function_expression', 'function', 'generator_function'}
+_ASSIGNMENT_NAME_FIELDS = {
+    'variable_declarator': ('name', 'value'),
+    'pair': ('key', 'value'),
+    'assignment_expression': ('left', 'right'),
+    'public_field_definition': ('name', 'value'),
+    'field_definition': ('property', 'value'),
+}
+
+_NAMESPACE_NODES = {'namespace_definition', 'namespace_declaration', 'file_scoped_namespace_declaration'}
+
+_HERITAGE_NODES = {
+    'superclass', 'super_interfaces', 'base_class_clause', 'class_heritage', 'base_list', 'base_clause',
+    'inheritance_specifier', 'extends_interfaces',
+}
+
+# Source files kept with their syntax tree, so a changed file is re-parsed incrementally
+DEFAULT_TREE_CACHE_SIZE = 64
+
+
+def tree_sitter_available() -> bool:
+    """True if the tree-sitter bindings are installed (grammars are checked per language)."""
+    try:
+        importlib.import_module('tree_sitter')
+        return True
+    except ImportError:
+        return False
+
+
+def _text(node) -> str:
+    return node.text.decode('utf-8', errors='replace') if node is not None else ''
+
+
+def _field_text(node, field):
+    child = node.child_by_field_name(field)
+    return _text(child) if child is not None else None
+
+
+def _strip_parens(text):
+    """``text`` without surrounding parentheses, on one line."""
+    text = ' '.join((text or '').split())
+    if text.startswith('(') and text.endswith(')'):
+        text = text[1:-1]
+    return text.strip()
+
+
+def _compute_edit(old: bytes, new: bytes):
+    """The single edit turning ``old`` into ``new``: their common prefix and suffix are kept."""
+    limit = min(len(old), len(new))
+    start = 0
+    while start < limit and old[start] == new[start]:
+        start += 1
+    suffix = 0
+    while suffix < limit - start and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+
+    def point(source, offset):
+        row = source.count(b'\n', 0, offset)
+        return row, offset - (source.rfind(b'\n', 0, offset) + 1)
+
+    old_end, new_end = len(old) - suffix, len(new) - suffix
+    return dict(start_byte=start, old_end_byte=old_end, new_end_byte=new_end,
+                start_point=point(old, start), old_end_point=point(old, old_end), new_end_point=point(new, new_end))
+
+
+class TreeSitterParser(CodeParser):
+    """
+    ``CodeParser`` backed by tree-sitter grammars.
+
+    Produces the same ``imports``/``classes``/``functions`` (Go: ``functions``/``methods``/
+    ``package``) schema as the regex parser from a real syntax tree, so multi-line
+    signatures, decorators, nested classes and functions assigned to variables or object
+    keys are found, and every class and function also gets an ``end_line``. Nested
+    classes are listed with a ``parent``.
+
+    Grammars are loaded once per process and one ``tree_sitter.Parser`` per language is
+    reused across files. The last ``tree_cache_size`` files are kept with their tree, so
+    parsing a file again after an edit only re-parses the changed region. Languages whose
+    grammar package is not installed go through the regex parser.
+    """
+
+    _languages = {}
+    _languages_lock = threading.Lock()
+
+    def __init__(self, tree_cache_size=DEFAULT_TREE_CACHE_SIZE):
+        self._parsers = {}
+        self._trees = OrderedDict()
+        self.tree_cache_size = tree_cache_size
+
+    @classmethod
+    def _language(cls, key):
+        if key not in cls._languages:
+            with cls._languages_lock:
+                if key not in cls._languages:
+                    module_name, function = GRAMMARS[key]
+                    try:
+                        import tree_sitter
+                        module = importlib.import_module(module_name)
+                        cls._languages[key] = tree_sitter.Language(getattr(module, function)())
+                    except (ImportError, AttributeError, ValueError) as e:
+                        logger.info(f"No tree-sitter grammar for {key}, using the regex parser: {e}")
+                        cls._languages[key] = None
+        return cls._languages[key]
+
+    @classmethod
+    def available_grammars(cls):
+        """Keys of the ``GRAMMARS`` whose package is installed, loading each of them."""
+        return sorted(key for key in GRAMMARS if cls._language(key) is not None)
+
+    def _grammar_key(self, filepath, language):
+        ext = os.path.splitext(filepath)[1].lower()
+        return ext if ext in GRAMMARS else language
+
+    def supports(self, filepath) -> bool:
+        """True if ``filepath`` is parsed with a tree-sitter grammar rather than the regex fallback."""
+        language = self.detect_language(filepath)
+        return language in GRAMMARS and self._language(self._grammar_key(filepath, language)) is not None
+
+    def parse_tree(self, filepath, source: bytes):
+        """Syntax tree of ``source``, re-parsing incrementally from the last tree of ``filepath``."""
+        import tree_sitter
+
+        key = self._grammar_key(filepath, self.detect_language(filepath))
+        parser = self._parsers.get(key)
+        if parser is None:
+            parser = self._parsers[key] = tree_sitter.Parser(self._language(key))
+
+        cached = self._trees.pop(filepath, None)
+        if cached is not None and cached[0] == source:
+            tree = cached[1]
+        elif cached is not None:
+            old_source, old_tree = cached
+            old_tree.edit(**_compute_edit(old_source, source))
+            tree = parser.parse(source, old_tree)
+        else:
+            tree = parser.parse(source)
+
+        if self.tree_cache_size > 0:
+            self._trees[filepath] = (source, tree)
+            while len(self._trees) > self.tree_cache_size:
+                self._trees.popitem(last=False)
+        return tree
+
+    def parse_code(self, filepath, lines=None):
+        """Parse a source file; ``lines`` holds its content when it is already in memory."""
+        if not self.supports(filepath):
+            return super().parse_code(filepath, lines)
+        try:
+            if lines is None:
+                with open(filepath, 'rb') as file:
+                    source = file.read()
+            else:
+                source = ''.join(lines).encode('utf-8')
+
+            language = self.detect_language(filepath)
+            tree = self.parse_tree(filepath, source)
+            return _TreeWalker(language).walk(tree.root_node, os.path.basename(filepath))
+        except Exception as e:
+            return {'error': str(e), 'file': filepath}
+
+
+class _TreeWalker:
+    """Collects the records of one syntax tree into the CodeParser result schema."""
+
+    def __init__(self, language):
+        self.language = language
+        self.class_nodes = CLASS_NODES.get(language, set())
+        self.function_nodes = FUNCTION_NODES.get(language, set())
+
+    def walk(self, root, filename):
+        if self.language == 'go':
+            result = {'filename': filename, 'language': 'go', 'imports': [], 'functions': [], 'methods': [],
+                      'package': None}
+        else:
+            result = {'filename': filename, 'language': self.language, 'imports': [], 'classes': [],
+                      'functions': []}
+        self.result = result
+
+        # Depth-first in source order without recursion: (node, enclosing class, decorators)
+        stack = [(root, None, None)]
+        while stack:
+            node, current_class, decorators = stack.pop()
+            children = self._visit(node, current_class, decorators)
+            if children:
+                stack.extend(reversed(children))
+        return result
+
+    def _visit(self, node, current_class, decorators):
+        """Record ``node`` if it is a definition or import; returns the children to visit next."""
+        node_type = node.type
+        if node_type == 'decorated_definition':
+            definition = node.child_by_field_name('definition')
+            names = [_text(child) for child in node.named_children if child.type == 'decorator']
+            return [(definition, current_class, names)] if definition is not None else []
+
+        import_record = self._import(node)
+        if import_record is not None:
+            self.result['imports'].append(import_record)
+            return []
+        if node_type == 'package_clause':
+            self.result['package'] = _text(node.named_children[0]) if node.named_children else None
+            return []
+
+        if node_type in _NAMESPACE_NODES:
+            # Recorded like the regex parser does, then searched for the classes inside
+            self.result['imports'].append({'type': 'namespace', 'name': _field_text(node, 'name'),
+                                           'line_number': node.start_point[0] + 1})
+            return [(child, current_class, None) for child in node.named_children]
+
+        body = node.child_by_field_name('body') if node_type in self.class_nodes else None
+        if body is not None:
+            record = self._class(node, current_class)
+            if record['name']:
+                self.result['classes'].append(record)
+                return [(child, record, None) for child in body.named_children]
+
+        if node_type in self.function_nodes:
+            self._add_function(self._function(node, current_class, decorators), current_class)
+            return []
+
+        fields = _ASSIGNMENT_NAME_FIELDS.get(node_type)
+        if fields is not None:
+            value = node.child_by_field_name(fields[1])
+            if value is not None and value.type in ANONYMOUS_FUNCTION_NODES:
+                record = self._function(value, current_class, None, name=_field_text(node, fields[0]))
+                self._add_function(record, current_class)
+                return []
+
+        if node_type in ANONYMOUS_FUNCTION_NODES or node_type == 'lambda':
+            # Function bodies hold locals, not the structure of the file
+            return []
+        if node_type == 'call_expression' and self.language in ('javascript', 'typescript'):
+            required = self._require(node)
+            if required is not None:
+                self.result['imports'].append(required)
+                return []
+        return [(child, current_class, None) for child in node.named_children]
+
+    def _add_function(self, record, current_class):
+        if self.language == 'go':
+            (self.result['methods'] if record['type'] == 'method' else self.result['functions']).append(record)
+        elif current_class is not None:
+            current_class['methods'].append(record)
+        else:
+            self.result['functions'].append(record)
+
+    def _class(self, node, current_class):
+        if node.type == 'impl_item':
+            name = _field_text(node, 'type')
+            inheritance = _field_text(node, 'trait')
+        else:
+            name = _field_text(node, 'name')
+            superclasses = node.child_by_field_name('superclasses')
+            if superclasses is not None:
+                inheritance = _strip_parens(_text(superclasses))
+            else:
+                parts = [_text(child).lstrip(':').strip() for child in node.named_children
+                         if child.type in _HERITAGE_NODES]
+                inheritance = ' '.join(parts) or None
+        record = {
+            'name': name,
+            'inheritance': inheritance,
+            'methods': [],
+            'line_number': node.start_point[0] + 1,
+            'end_line': node.end_point[0] + 1,
+        }
+        if current_class is not None:
+            record['parent'] = current_class['name']
+        return record
+
+    def _function(self, node, current_class, decorators, name=None):
+        language = self.language
+        declarator = node
+        if language == 'c_cpp':
+            # int *ns::run(int a) -> pointer_declarator -> function_declarator -> qualified_identifier
+            declarator = node.child_by_field_name('declarator')
+            while declarator is not None and declarator.type != 'function_declarator':
+                declarator = declarator.child_by_field_name('declarator')
+            declarator = declarator or node
+            name = name or _field_text(declarator, 'declarator')
+        name = name or _field_text(node, 'name') or ''
+
+        parameters_node = declarator.child_by_field_name('parameters')
+        if parameters_node is not None:
+            parameters = _strip_parens(_text(parameters_node))
+        else:
+            parameters = ', '.join(_text(child) for child in node.named_children if child.type == 'parameter')
+
+        start, end = node.start_point[0] + 1, node.end_point[0] + 1
+        if language == 'go':
+            record = {
+                'name': name,
+                'parameters': parameters,
+                'return_types': _strip_parens(_field_text(node, 'result')),
+                'line_number': start,
+                'end_line': end,
+                'type': 'method' if node.type == 'method_declaration' else 'function',
+            }
+            if node.type == 'method_declaration':
+                record['receiver'] = _strip_parens(_field_text(node, 'receiver'))
+            return record
+
+        if language == 'javascript':
+            return_type = infer_javascript_return_type(name)
+        else:
+            return_type = None
+            for field in ('return_type', 'returns', 'type'):
+                return_type = _field_text(node, field)
+                if return_type is not None:
+                    break
+            if return_type is not None:
+                return_type = ' '.join(return_type.lstrip(':').split())
+
+        record = {
+            'name': name,
+            'parameters': parameters,
+            'return_type': return_type,
+            'line_number': start,
+            'end_line': end,
+            'is_method': current_class is not None,
+        }
+        modifiers = [_text(child) for child in node.named_children if child.type in ('modifiers', 'modifier')]
+        if modifiers:
+            record['modifiers'] = ' '.join(' '.join(modifiers).split())
+        if decorators:
+            record['decorators'] = decorators
+        return record
+
+    def _import(self, node):
+        """Import record of ``node`` in the regex parser's per-language shape, or None."""
+        node_type, line_number = node.type, node.start_point[0] + 1
+        language = self.language
+        if language == 'python' and node_type == 'import_statement':
+            return {'type': 'import', 'module': _text(node)[len('import'):].strip(), 'line_number': line_number}
+        if language == 'python' and node_type == 'import_from_statement':
+            module = _field_text(node, 'module_name')
+            names = ', '.join(_text(child) for child in node.children_by_field_name('name'))
+            if not names:
+                names = '*' if any(child.type == 'wildcard_import' for child in node.named_children) else ''
+            return {'type': 'from_import', 'module': module, 'imports': names, 'line_number': line_number}
+        if language == 'java' and node_type == 'import_declaration':
+            path = _text(node)[len('import'):].strip().rstrip(';').strip()
+            if path.startswith('static '):
+                path = path[len('static '):].strip()
+            return {'type': 'import', 'package': path, 'line_number': line_number}
+        if language == 'c_cpp' and node_type == 'preproc_include':
+            return {'type': 'include', 'file': _field_text(node, 'path').strip('<>"'), 'line_number': line_number}
+        if language in ('javascript', 'typescript') and node_type == 'import_statement':
+            clause = next((child for child in node.named_children if child.type == 'import_clause'), None)
+            source = _field_text(node, 'source') or ''
+            return {'type': 'import', 'imports': _text(clause) if clause is not None else '*',
+                    'module': source.strip('\'"'), 'line_number': line_number}
+        if language == 'go' and node_type == 'import_spec':
+            return {'type': 'import', 'path': (_field_text(node, 'path') or '').strip('"`'),
+                    'line_number': line_number}
+        if language == 'rust' and node_type == 'use_declaration':
+            return {'type': 'use', 'module': _field_text(node, 'argument'), 'line_number': line_number}
+        if language == 'rust' and node_type == 'mod_item':
+            return {'type': 'mod', 'name': _field_text(node, 'name'), 'line_number': line_number}
+        if language == 'php' and node_type == 'namespace_use_declaration':
+            return {'type': 'use', 'name': _text(node)[len('use'):].strip().rstrip(';').strip(),
+                    'line_number': line_number}
+        if language == 'swift' and node_type == 'import_declaration':
+            return {'type': 'import', 'module': _text(node)[len('import'):].strip(), 'line_number': line_number}
+        if language == 'csharp' and node_type == 'using_directive':
+            return {'type': 'using', 'namespace': _text(node)[len('using'):].strip().rstrip(';').strip(),
+                    'line_number': line_number}
+        return None
+
+    def _require(self, node):
+        function = node.child_by_field_name('function')
+        arguments = node.child_by_field_name('arguments')
+        if function is None or _text(function) != 'require' or arguments is None:
+            return None
+        strings = [child for child in arguments.named_children if child.type == 'string']
+        if not strings:
+            return None
+        return {'type': 'require', 'module': _text(strings[0]).strip('\'"`'), 'line_number': node.start_point[0] + 1}
@@ -0,0 +1,756 @@
+import json
+import logging
+import mmap
+import os
+import shutil
+import time
+import uuid
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to an exclusively created lock file
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+STORE_VERSION = 1
+
+HEADER_FILE = "header.json"
+VECTORS_FILE = "vectors.bin"
+SCALES_FILE = "scales.bin"
+LENGTHS_FILE = "lengths.bin"
+TEXTS_FILE = "texts.bin"
+TEXT_OFFSETS_FILE = "text_offsets.bin"
+META_FILE = "meta.bin"
+META_OFFSETS_FILE = "meta_offsets.bin"
+VALIDATION_FILE = "validation.json"
+VALID_ROWS_FILE = "valid_rows.bin"
+CHECKPOINT_FILE = "checkpoint.json"
+COMPLETED_FILE = "completed.tsv"
+
+# Seconds between attempts to take a store build lock held by another writer
+LOCK_POLL_SECONDS = 0.5
+
+# Rows scanned at a time when validating, bounds the temporary float32 copy
+VALIDATION_CHUNK_ROWS = 65536
+
+SUPPORTED_DTYPES = ("float32", "float16", "int8")
+# int8 rows hold round(v / scale) with a float32 scale per row, max(|v|) / 127
+INT8_MAX = 127
+
+
+def store_path_for(db_path: str) -> str:
+    """Directory of the vector store that replaces a pickled database, e.g. repo.pkl -> repo.store."""
+    base, _ = os.path.splitext(db_path)
+    return f"{base}.store"
+
+
+def _vector_length(vector) -> int:
+    if vector is None:
+        return 0
+    try:
+        return len(vector)
+    except TypeError:
+        return 0
+
+
+def _modal_length(documents: Iterable) -> Optional[int]:
+    counts: Dict[int, int] = {}
+    for doc in documents:
+        length = _vector_length(getattr(doc, "vector", None))
+        if length:
+            counts[length] = counts.get(length, 0) + 1
+    if not counts:
+        return None
+    return max(counts, key=counts.get)
+
+
+def quantize_int8(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Scalar-quantize float rows to int8 with one scale per row.
+
+    Returns:
+        tuple: (int8 codes, float32 scales). Rows with non-finite values get a NaN scale,
+        so they still fail validation after dequantization.
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    finite = np.isfinite(matrix).all(axis=1)
+    safe = np.where(finite[:, None], matrix, 0)
+    scales = (np.abs(safe).max(axis=1) / INT8_MAX if safe.size else np.zeros(len(matrix))).astype(np.float32)
+    divisor = np.where(scales > 0, scales, 1)[:, None]
+    codes = np.clip(np.rint(safe / divisor), -INT8_MAX, INT8_MAX).astype(np.int8)
+    scales[~finite] = np.nan
+    return codes, scales
+
+
+def _map_file(path: str):
+    """Read-only mmap of a file, or empty bytes for an empty file (which cannot be mapped)."""
+    if os.path.getsize(path) == 0:
+        return b""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+@dataclass
+class EmbeddingValidation:
+    """Rows of a vector matrix that hold usable embeddings, and why the others were rejected."""
+    valid_rows: np.ndarray
+    target_dim: int
+    total: int
+    missing: int = 0
+    wrong_size: int = 0
+    non_finite: int = 0
+    zero_norm: int = 0
+
+    @property
+    def valid(self) -> int:
+        return int(self.valid_rows.size)
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "total": self.total, "valid": self.valid, "target_dim": self.target_dim,
+            "missing": self.missing, "wrong_size": self.wrong_size,
+            "non_finite": self.non_finite, "zero_norm": self.zero_norm,
+        }
+
+
+def validate_embeddings(vectors: np.ndarray, lengths: np.ndarray,
+                        scales: Optional[np.ndarray] = None) -> EmbeddingValidation:
+    """
+    Find the rows of ``vectors`` with a usable embedding.
+
+    The expected size is the most common non-zero length. A row is kept when its
+    original length matches it and its values are finite with a non-zero norm.
+
+    Args:
+        vectors: ``(count, dim)`` matrix; only rows whose length equals ``dim`` hold data.
+        lengths: Original embedding length of every row, 0 when there was none.
+        scales: Per-row scales of an int8 matrix.
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    total = int(lengths.size)
+    dim = vectors.shape[1] if vectors.ndim == 2 else 0
+    nonzero = lengths[lengths > 0]
+    target_dim = int(np.bincount(nonzero).argmax()) if nonzero.size else 0
+    if target_dim and target_dim != dim:
+        logger.warning(f"Most common embedding size {target_dim} differs from the stored width {dim}")
+
+    sized = (lengths == dim) & (lengths > 0)
+    finite = np.ones(total, dtype=bool)
+    norms = np.zeros(total, dtype=np.float32)
+    for start in range(0, total, VALIDATION_CHUNK_ROWS):
+        block = np.asarray(vectors[start:start + VALIDATION_CHUNK_ROWS], dtype=np.float32)
+        if scales is not None:
+            block = block * np.asarray(scales[start:start + len(block)], dtype=np.float32)[:, None]
+        finite[start:start + len(block)] = np.isfinite(block).all(axis=1)
+        block = np.where(np.isfinite(block), block, 0)
+        norms[start:start + len(block)] = np.einsum("ij,ij->i", block, block)
+
+    valid = sized & finite & (norms > 0)
+    return EmbeddingValidation(
+        valid_rows=np.flatnonzero(valid).astype(np.int64),
+        target_dim=dim,
+        total=total,
+        missing=int(np.count_nonzero(lengths == 0)),
+        wrong_size=int(np.count_nonzero((lengths > 0) & (lengths != dim))),
+        non_finite=int(np.count_nonzero(sized & ~finite)),
+        zero_norm=int(np.count_nonzero(sized & finite & (norms == 0))),
+    )
+
+
+def _write_validation(path: str, validation: EmbeddingValidation) -> None:
+    rows_tmp = os.path.join(path, f"{VALID_ROWS_FILE}.tmp")
+    validation.valid_rows.tofile(rows_tmp)
+    os.replace(rows_tmp, os.path.join(path, VALID_ROWS_FILE))
+    summary_tmp = os.path.join(path, f"{VALIDATION_FILE}.tmp")
+    with open(summary_tmp, "w", encoding="utf-8") as f:
+        json.dump(validation.summary(), f)
+    os.replace(summary_tmp, os.path.join(path, VALIDATION_FILE))
+
+
+def _default_document_factory(**kwargs):
+    from adalflow.core.types import Document
+    return Document(**kwargs)
+
+
+class VectorStore:
+    """
+    Read side of the on-disk vector store.
+
+    A store is a directory holding a contiguous ``(count, dim)`` vector matrix, the
+    original embedding length of every row, and offset-indexed UTF-8 texts and JSON
+    metadata. Everything is memory-mapped, so opening a store is O(1) regardless of its
+    size and worker processes serving the same repository share pages through the OS
+    page cache instead of each holding an unpickled copy.
+
+    The matrix is float32, float16 or int8; int8 rows come with a float32 scale each in
+    ``scales``. ``float_vectors`` returns rows as float32 whatever the storage type.
+    """
+
+    def __init__(self, path: str, header: Dict, vectors: np.ndarray, lengths: np.ndarray,
+                 text_offsets: np.ndarray, texts, meta_offsets: np.ndarray, meta,
+                 scales: Optional[np.ndarray] = None):
+        self.path = path
+        self.header = header
+        self.vectors = vectors
+        self.scales = scales
+        self.lengths = lengths
+        self._text_offsets = text_offsets
+        self._texts = texts
+        self._meta_offsets = meta_offsets
+        self._meta = meta
+        self._validation: Optional[EmbeddingValidation] = None
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.isfile(os.path.join(path, HEADER_FILE))
+
+    @classmethod
+    def open(cls, path: str) -> "VectorStore":
+        with open(os.path.join(path, HEADER_FILE), "r", encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported vector store version {header.get('version')} in {path}")
+
+        count, dim = header["count"], header["dim"]
+        dtype = np.dtype(header["dtype"])
+        if count and dim:
+            vectors = np.memmap(os.path.join(path, VECTORS_FILE), dtype=dtype, mode="r", shape=(count, dim))
+        else:
+            vectors = np.zeros((count, dim), dtype=dtype)
+        if count:
+            lengths = np.memmap(os.path.join(path, LENGTHS_FILE), dtype=np.int32, mode="r", shape=(count,))
+        else:
+            lengths = np.zeros(0, dtype=np.int32)
+        text_offsets = np.memmap(os.path.join(path, TEXT_OFFSETS_FILE), dtype=np.int64, mode="r", shape=(count + 1,))
+        meta_offsets = np.memmap(os.path.join(path, META_OFFSETS_FILE), dtype=np.int64, mode="r", shape=(count + 1,))
+        scales = None
+        if dtype == np.int8:
+            if count:
+                scales = np.memmap(os.path.join(path, SCALES_FILE), dtype=np.float32, mode="r", shape=(count,))
+            else:
+                scales = np.zeros(0, dtype=np.float32)
+        texts = _map_file(os.path.join(path, TEXTS_FILE))
+        meta = _map_file(os.path.join(path, META_FILE))
+        return cls(path, header, vectors, lengths, text_offsets, texts, meta_offsets, meta, scales)
+
+    @classmethod
+    def write(cls, path: str, documents: List, dtype: str = "float32", embedder: Optional[Dict] = None) -> "VectorStore":
+        """
+        Write ``documents`` (split chunks with vectors) to a new store at ``path``.
+
+        The matrix width is the most common embedding length, so a few malformed
+        embeddings do not change the layout; their real length is kept in ``lengths``.
+        """
+        writer = VectorStoreWriter(path, dim=_modal_length(documents), dtype=dtype, embedder=embedder)
+        writer.add(documents)
+        return writer.commit()
+
+    def __len__(self) -> int:
+        return self.header["count"]
+
+    @property
+    def dim(self) -> int:
+        return self.header["dim"]
+
+    @property
+    def embedder(self) -> Dict:
+        return self.header.get("embedder", {})
+
+    def text(self, index: int) -> str:
+        start, end = self._text_offsets[index], self._text_offsets[index + 1]
+        return self._texts[start:end].decode("utf-8")
+
+    def metadata(self, index: int) -> Dict[str, Any]:
+        start, end = self._meta_offsets[index], self._meta_offsets[index + 1]
+        return json.loads(self._meta[start:end])
+
+    def iter_metadata(self):
+        """Metadata records of all rows in order, without touching texts or vectors."""
+        for index in range(len(self)):
+            yield self.metadata(index)
+
+    def float_vectors(self, rows=slice(None)) -> np.ndarray:
+        """Rows of the matrix as float32 (dequantized for int8 stores); ``rows`` is anything numpy can index with."""
+        matrix = np.array(self.vectors[rows], dtype=np.float32)
+        if self.scales is not None:
+            matrix *= np.asarray(self.scales[rows], dtype=np.float32)[..., None]
+        return matrix
+
+    def vector(self, index: int) -> np.ndarray:
+        return self.float_vectors(index)[:int(self.lengths[index])]
+
+    def document(self, index: int, factory: Callable = _default_document_factory):
+        record = self.metadata(index)
+        length = int(self.lengths[index])
+        vector = self.float_vectors(index).tolist() if length == self.dim else []
+        return factory(
+            text=self.text(index),
+            meta_data=record.get("meta_data"),
+            vector=vector,
+            id=record.get("id"),
+            order=record.get("order"),
+            parent_doc_id=record.get("parent_doc_id"),
+            estimated_num_tokens=record.get("estimated_num_tokens"),
+        )
+
+    def documents(self, factory: Callable = _default_document_factory, rows: Optional[np.ndarray] = None) -> "StoredDocuments":
+        return StoredDocuments(self, factory, rows)
+
+    def validation(self) -> EmbeddingValidation:
+        """
+        Embedding validation of this store, computed when the store was written.
+
+        Stores written without it are validated on first use and the result is saved
+        next to the vectors, so it runs once per index build rather than per request.
+        """
+        if self._validation is not None:
+            return self._validation
+        summary_path = os.path.join(self.path, VALIDATION_FILE)
+        try:
+            with open(summary_path, "r", encoding="utf-8") as f:
+                summary = json.load(f)
+            valid_rows = np.fromfile(os.path.join(self.path, VALID_ROWS_FILE), dtype=np.int64)
+            if valid_rows.size != summary["valid"]:
+                raise ValueError("valid row count does not match the summary")
+            summary.pop("valid")
+            self._validation = EmbeddingValidation(valid_rows=valid_rows, **summary)
+        except (OSError, ValueError, KeyError, TypeError):
+            self._validation = validate_embeddings(self.vectors, self.lengths, self.scales)
+            try:
+                _write_validation(self.path, self._validation)
+            except OSError as e:
+                logger.warning(f"Could not save embedding validation for {self.path}: {e}")
+        return self._validation
+
+    def raw_record(self, index: int):
+        """Undecoded text and metadata bytes of one row, used when copying rows between stores."""
+        text = self._texts[self._text_offsets[index]:self._text_offsets[index + 1]]
+        meta = self._meta[self._meta_offsets[index]:self._meta_offsets[index + 1]]
+        return bytes(text), bytes(meta)
+
+
+class StoredDocuments(Sequence):
+    """
+    Lazy list of Documents backed by a VectorStore; a Document is built only when accessed.
+
+    With ``rows`` the list is a view over those store rows, in that order.
+    """
+
+    def __init__(self, store: VectorStore, factory: Callable = _default_document_factory,
+                 rows: Optional[np.ndarray] = None):
+        self.store = store
+        self.rows = rows
+        self._factory = factory
+
+    def __len__(self) -> int:
+        return len(self.store) if self.rows is None else int(self.rows.size)
+
+    def _row(self, index: int) -> int:
+        return index if self.rows is None else int(self.rows[index])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.store.document(self._row(i), self._factory) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("document index out of range")
+        return self.store.document(self._row(index), self._factory)
+
+
+def partial_path_for(path: str) -> str:
+    """Directory a resumable writer builds ``path`` in until it is committed."""
+    return f"{path}.partial"
+
+
+def lock_path_for(path: str) -> str:
+    """File locked while a writer builds ``path``."""
+    return f"{path}.lock"
+
+
+class StoreLockedError(RuntimeError):
+    """Another writer kept building the same store for longer than the lock timeout."""
+
+
+class StoreBuildLock:
+    """
+    Exclusive lock on building the store at ``path``, across threads and processes.
+
+    Taken with ``flock`` on ``<path>.lock``, so the OS releases it when a writer's process
+    dies and its checkpoint can be resumed. The lock is re-entrant per object: a caller
+    can hold it while handing it to writers that acquire and release it again.
+    """
+
+    def __init__(self, path: str):
+        self.path = lock_path_for(path)
+        self._fd = None
+        self._depth = 0
+
+    def acquire(self, timeout: Optional[float] = None) -> "StoreBuildLock":
+        """Take the lock, waiting up to ``timeout`` seconds (None: no limit) for another holder."""
+        if self._depth:
+            self._depth += 1
+            return self
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            fd = self._try_lock()
+            if fd is not None:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                raise StoreLockedError(f"{self.path} is held by another writer")
+            time.sleep(LOCK_POLL_SECONDS)
+        self._fd = fd
+        self._depth = 1
+        return self
+
+    def _try_lock(self) -> Optional[int]:
+        if fcntl is None:
+            try:
+                return os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+            except FileExistsError:
+                return None
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        return fd
+
+    def release(self) -> None:
+        if not self._depth:
+            return
+        self._depth -= 1
+        if self._depth:
+            return
+        if fcntl is None:
+            os.remove(self.path)
+        else:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+    @property
+    def held(self) -> bool:
+        return self._depth > 0
+
+    def __enter__(self) -> "StoreBuildLock":
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.release()
+
+
+class VectorStoreWriter:
+    """
+    Append-only writer for a VectorStore.
+
+    Rows are streamed to files in a temporary directory next to the target, and
+    ``commit`` swaps the finished directory into place, so readers never see a partially
+    written store and existing memory maps stay valid.
+
+    A ``resumable`` writer builds in a fixed ``<path>.partial`` directory and can record
+    checkpoints; after a crash, ``resume`` reopens it at the last checkpoint.
+
+    ``dtype`` sets the precision vectors are stored in: float32, float16 (half the size)
+    or int8 scalar-quantized with a per-row scale (a quarter of the size).
+
+    A writer holds the ``StoreBuildLock`` of ``path`` from construction (or ``resume``)
+    until ``commit``, ``abort`` or ``close``, waiting up to ``lock_timeout`` seconds for
+    another writer of the same store to finish. Pass ``lock`` to keep holding it across
+    several writers.
+    """
+
+    def __init__(self, path: str, dim: Optional[int] = None, dtype: str = "float32", embedder: Optional[Dict] = None,
+                 resumable: bool = False, lock: Optional[StoreBuildLock] = None,
+                 lock_timeout: Optional[float] = None):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported vector dtype '{dtype}', expected one of {SUPPORTED_DTYPES}")
+        # Taken before touching the build directory, which may belong to another writer
+        self._lock = (lock or StoreBuildLock(path)).acquire(lock_timeout)
+        self.path = path
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.embedder = embedder or {}
+        self.resumable = resumable
+        self.count = 0
+        self._text_offset = 0
+        self._meta_offset = 0
+        self._completed = 0
+
+        if resumable:
+            self._tmp_path = partial_path_for(path)
+            shutil.rmtree(self._tmp_path, ignore_errors=True)
+        else:
+            self._tmp_path = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+        try:
+            os.makedirs(self._tmp_path)
+            self._open_files("wb")
+        except Exception:
+            self._close_files()
+            self._release_lock()
+            raise
+        np.zeros(1, dtype=np.int64).tofile(self._text_offsets)
+        np.zeros(1, dtype=np.int64).tofile(self._meta_offsets)
+
+    def _open_files(self, mode: str) -> None:
+        def open_file(name):
+            return open(os.path.join(self._tmp_path, name), mode)
+        self._vectors = open_file(VECTORS_FILE)
+        self._lengths = open_file(LENGTHS_FILE)
+        self._texts = open_file(TEXTS_FILE)
+        self._text_offsets = open_file(TEXT_OFFSETS_FILE)
+        self._meta = open_file(META_FILE)
+        self._meta_offsets = open_file(META_OFFSETS_FILE)
+        self._scales = open_file(SCALES_FILE) if self.dtype == np.int8 else None
+        self._completed_log = open_file(COMPLETED_FILE) if self.resumable else None
+
+    def _files(self):
+        files = (self._vectors, self._lengths, self._texts, self._text_offsets, self._meta, self._meta_offsets)
+        return files + tuple(handle for handle in (self._scales, self._completed_log) if handle)
+
+    def _close_files(self) -> None:
+        """Close every file opened so far, also after ``_open_files`` failed halfway."""
+        for name in ("_vectors", "_lengths", "_texts", "_text_offsets", "_meta", "_meta_offsets", "_scales",
+                     "_completed_log"):
+            handle = getattr(self, name, None)
+            if handle:
+                handle.close()
+
+    def _release_lock(self) -> None:
+        if self._lock is not None:
+            self._lock.release()
+            self._lock = None
+
+    @classmethod
+    def resume(cls, path: str, dtype: str = "float32", embedder: Optional[Dict] = None,
+               lock: Optional[StoreBuildLock] = None,
+               lock_timeout: Optional[float] = None) -> Optional[Tuple["VectorStoreWriter", Dict[str, str]]]:
+        """
+        Reopen an interrupted resumable build of ``path`` at its last checkpoint.
+
+        Anything written after that checkpoint is truncated away. Returns the writer and
+        the completed items recorded by ``checkpoint``, or None when there is no usable
+        checkpoint for this dtype and embedder. The build lock is taken first, so a build
+        still running elsewhere is waited for rather than resumed alongside.
+        """
+        lock = (lock or StoreBuildLock(path)).acquire(lock_timeout)
+        resumed = cls._resume_locked(path, dtype, embedder, lock)
+        if resumed is None:
+            lock.release()
+        return resumed
+
+    @classmethod
+    def _resume_locked(cls, path: str, dtype: str, embedder: Optional[Dict],
+                       lock: StoreBuildLock) -> Optional[Tuple["VectorStoreWriter", Dict[str, str]]]:
+        tmp_path = partial_path_for(path)
+        try:
+            with open(os.path.join(tmp_path, CHECKPOINT_FILE), "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (state.get("version") != STORE_VERSION or state.get("dtype") != dtype
+                or state.get("embedder") != (embedder or {})):
+            logger.info(f"Discarding checkpoint in {tmp_path}: written with different settings")
+            return None
+
+        writer = cls.__new__(cls)
+        writer.path = path
+        writer.dim = state["dim"]
+        writer.dtype = np.dtype(dtype)
+        writer.embedder = embedder or {}
+        writer.resumable = True
+        writer.count = state["count"]
+        writer._text_offset = state["text_offset"]
+        writer._meta_offset = state["meta_offset"]
+        writer._completed = state["completed"]
+        writer._tmp_path = tmp_path
+        writer._lock = lock
+        try:
+            writer._open_files("r+b")
+            sizes = {
+                writer._vectors: writer.count * (writer.dim or 0) * writer.dtype.itemsize,
+                writer._lengths: writer.count * 4,
+                writer._texts: writer._text_offset,
+                writer._text_offsets: (writer.count + 1) * 8,
+                writer._meta: writer._meta_offset,
+                writer._meta_offsets: (writer.count + 1) * 8,
+            }
+            if writer._scales:
+                sizes[writer._scales] = writer.count * 4
+            for handle, size in sizes.items():
+                handle.truncate(size)
+                handle.seek(size)
+
+            writer._completed_log.seek(0)
+            lines = writer._completed_log.read().split(b"\n")[:writer._completed]
+            completed = {}
+            for line in lines:
+                key, _, value = line.decode("utf-8", "surrogateescape").partition("\t")
+                completed[key] = value
+            writer._completed_log.seek(0)
+            writer._completed_log.truncate(sum(len(line) + 1 for line in lines))
+            writer._completed_log.seek(0, os.SEEK_END)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not resume from {tmp_path}: {e}")
+            writer._close_files()
+            return None
+        logger.info(f"Resuming {path} from checkpoint: {writer.count} rows, {len(completed)} completed items")
+        return writer, completed
+
+    def checkpoint(self, completed: Dict[str, str]) -> None:
+        """
+        Make everything written so far durable and record ``completed`` items with it.
+
+        Only resumable writers keep checkpoints; for others this is a no-op.
+        """
+        if not self.resumable:
+            return
+        lines = [f"{key}\t{value}\n" for key, value in completed.items()]
+        self._completed_log.write("".join(lines).encode("utf-8", "surrogateescape"))
+        self._completed += len(lines)
+        self.flush()
+        state = {
+            "version": STORE_VERSION,
+            "count": self.count,
+            "dim": self.dim,
+            "dtype": self.dtype.name,
+            "embedder": self.embedder,
+            "text_offset": self._text_offset,
+            "meta_offset": self._meta_offset,
+            "completed": self._completed,
+        }
+        tmp_file = os.path.join(self._tmp_path, f"{CHECKPOINT_FILE}.tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, os.path.join(self._tmp_path, CHECKPOINT_FILE))
+
+    def add(self, documents: Iterable) -> int:
+        """Append split chunks with vectors. Returns the number of rows written."""
+        documents = list(documents)
+        if not documents:
+            return 0
+        if self.dim is None:
+            self.dim = _modal_length(documents) or 0
+
+        matrix = np.zeros((len(documents), self.dim), dtype=np.float32)
+        lengths = np.zeros(len(documents), dtype=np.int32)
+        texts, metas = [], []
+        for row, doc in enumerate(documents):
+            vector = getattr(doc, "vector", None)
+            length = _vector_length(vector)
+            lengths[row] = length
+            if length == self.dim and length:
+                matrix[row] = np.asarray(vector, dtype=np.float32)
+            texts.append((doc.text or "").encode("utf-8"))
+            metas.append(json.dumps({
+                "id": str(doc.id) if doc.id is not None else None,
+                "meta_data": doc.meta_data,
+                "order": doc.order,
+                "parent_doc_id": str(doc.parent_doc_id) if doc.parent_doc_id is not None else None,
+                "estimated_num_tokens": doc.estimated_num_tokens,
+            }, ensure_ascii=False).encode("utf-8"))
+        return self._append(*self._encode(matrix), lengths, texts, metas)
+
+    def _encode(self, matrix: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Float rows in the storage precision, with their scales for int8."""
+        if self.dtype == np.int8:
+            return quantize_int8(matrix)
+        return np.asarray(matrix, dtype=self.dtype), None
+
+    def copy_from(self, store: VectorStore, indices: Iterable[int]) -> int:
+        """Append rows of an existing store without decoding them into Documents."""
+        indices = np.asarray(list(indices), dtype=np.int64)
+        if indices.size == 0:
+            return 0
+        if self.dim is None:
+            self.dim = store.dim
+        if store.dim != self.dim:
+            raise ValueError(f"Cannot copy rows of width {store.dim} into a store of width {self.dim}")
+        if store.vectors.dtype == self.dtype:
+            # Same precision: copy the stored rows (and int8 scales) as they are
+            matrix = np.asarray(store.vectors[indices])
+            scales = np.asarray(store.scales[indices]) if store.scales is not None else None
+        else:
+            matrix, scales = self._encode(store.float_vectors(indices))
+        lengths = np.asarray(store.lengths[indices], dtype=np.int32)
+        texts, metas = zip(*(store.raw_record(int(i)) for i in indices))
+        return self._append(matrix, scales, lengths, list(texts), list(metas))
+
+    def _append(self, matrix: np.ndarray, scales: Optional[np.ndarray], lengths: np.ndarray,
+                texts: List[bytes], metas: List[bytes]) -> int:
+        matrix.tofile(self._vectors)
+        if self._scales:
+            np.asarray(scales, dtype=np.float32).tofile(self._scales)
+        lengths.tofile(self._lengths)
+        for data, handle, offsets, attr in ((texts, self._texts, self._text_offsets, "_text_offset"),
+                                            (metas, self._meta, self._meta_offsets, "_meta_offset")):
+            sizes = np.fromiter((len(item) for item in data), dtype=np.int64, count=len(data))
+            ends = getattr(self, attr) + np.cumsum(sizes)
+            handle.write(b"".join(data))
+            ends.tofile(offsets)
+            setattr(self, attr, int(ends[-1]))
+        self.count += len(texts)
+        return len(texts)
+
+    def flush(self) -> None:
+        for handle in self._files():
+            handle.flush()
+            os.fsync(handle.fileno())
+
+    def commit(self) -> VectorStore:
+        """Finish writing and atomically replace any existing store at ``path``."""
+        try:
+            return self._commit()
+        finally:
+            self._release_lock()
+
+    def _commit(self) -> VectorStore:
+        self.flush()
+        for handle in self._files():
+            handle.close()
+        for name in (CHECKPOINT_FILE, COMPLETED_FILE):
+            if os.path.exists(os.path.join(self._tmp_path, name)):
+                os.remove(os.path.join(self._tmp_path, name))
+        header = {
+            "version": STORE_VERSION,
+            "count": self.count,
+            "dim": self.dim or 0,
+            "dtype": self.dtype.name,
+            "embedder": self.embedder,
+        }
+        with open(os.path.join(self._tmp_path, HEADER_FILE), "w", encoding="utf-8") as f:
+            json.dump(header, f)
+        # Validate once per build, before the store becomes visible
+        VectorStore.open(self._tmp_path).validation()
+
+        # Swap directories: open memory maps keep pointing at the old files until closed
+        old_path = None
+        if os.path.exists(self.path):
+            old_path = f"{self.path}.old-{uuid.uuid4().hex[:8]}"
+            os.rename(self.path, old_path)
+        os.rename(self._tmp_path, self.path)
+        if old_path:
+            shutil.rmtree(old_path, ignore_errors=True)
+        logger.info(f"Wrote {self.count} vectors ({self.dim}-d {self.dtype.name}) to {self.path}")
+        return VectorStore.open(self.path)
+
+    def abort(self) -> None:
+        """Discard everything written so far, including checkpoints."""
+        self._close_files()
+        shutil.rmtree(self._tmp_path, ignore_errors=True)
+        self._release_lock()
+
+    def close(self) -> None:
+        """Stop writing but keep the last checkpoint of a resumable writer for ``resume``."""
+        self._close_files()
+        self._release_lock()
@@ -15,7 +15,8 @@ from api.openai_client import OpenAIClient
 from api.openrouter_client import OpenRouterClient
 from api.azureai_client import AzureAIClient
 from api.dashscope_client import DashscopeClient
-from api.rag import RAG
+from api.rag import RAG, research_followup_queries
+from api.tools.context_packer import ContextPacker
 
 # Configure logging
 from api.logging_config import setup_logging
@@ -180,46 +181,41 @@ async def handle_websocket_chat(websocket: WebSocket):
         # Only retrieve documents if input is not too large
         context_text = ""
         retrieved_documents = None
+        rag_documents = []
 
         if not input_too_large:
             try:
-                # If filePath exists, modify the query for RAG to focus on the file
+                # If filePath exists, search the question within that file only
                 rag_query = query
+                rag_filters = None
                 if request.filePath:
-                    # Use the file path to get relevant context about the file
-                    rag_query = f"Contexts related to {request.filePath}"
-                    logger.info(f"Modified RAG query to focus on file: {request.filePath}")
+                    rag_filters = {"path_prefixes": [request.filePath]}
+                    logger.info(f"Restricting RAG retrieval to file: {request.filePath}")
+
+                # Later Deep Research iterations also search the previous iteration's next steps
+                rag_followups = []
+                if is_deep_research and research_iteration > 1:
+                    previous_response = next((msg.content for msg in reversed(request.messages) if msg.role == "assistant"), "")
+                    rag_followups = research_followup_queries(previous_response)
 
                 # Try to perform RAG retrieval
                 try:
                     # This will use the actual RAG implementation
-                    retrieved_documents = request_rag(rag_query, language=request.language)
+                    if rag_followups:
+                        # One embedding call and one batched search for all query variants
+                        retrieved_documents = [request_rag.retrieve_many([rag_query] + rag_followups, filters=rag_filters)]
+                        logger.info(f"Retrieved for {len(retrieved_documents[0].queries)} query variants")
+                    else:
+                        retrieved_documents = request_rag(rag_query, language=request.language, filters=rag_filters)
+                    if rag_filters and not (retrieved_documents and getattr(retrieved_documents[0], "documents", None)):
+                        # The file may not be indexed (e.g. too large); look for context about it instead
+                        rag_query = f"Contexts related to {request.filePath}"
+                        retrieved_documents = request_rag(rag_query, language=request.language)
 
                     if retrieved_documents and retrieved_documents[0].documents:
-                        # Format context for the prompt in a more structured way
-                        documents = retrieved_documents[0].documents
-                        logger.info(f"Retrieved {len(documents)} documents")
-
-                        # Group documents by file path
-                        docs_by_file = {}
-                        for doc in documents:
-                            file_path = doc.meta_data.get('file_path', 'unknown')
-                            if file_path not in docs_by_file:
-                                docs_by_file[file_path] = []
-                            docs_by_file[file_path].append(doc)
-
-                        # Format context text with file path grouping
-                        context_parts = []
-                        for file_path, docs in docs_by_file.items():
-                            # Add file header with metadata
-                            header = f"## File Path: {file_path}\n\n"
-                            # Add document content
-                            content = "\n\n".join([doc.text for doc in docs])
-
-                            context_parts.append(f"{header}{content}")
-
-                        # Join all parts with clear separation
-                        context_text = "\n\n" + "-" * 10 + "\n\n".join(context_parts)
+                        # Packed into the prompt within the model's token budget below
+                        rag_documents = retrieved_documents[0].documents
+                        logger.info(f"Retrieved {len(rag_documents)} documents")
                     else:
                         logger.warning("No documents retrieved from RAG")
                 except Exception as e:
@@ -228,7 +224,7 @@ async def handle_websocket_chat(websocket: WebSocket):
 
             except Exception as e:
                 logger.error(f"Error retrieving documents: {str(e)}")
-                context_text = ""
+                rag_documents = []
 
         # Get repository information
         repo_url = request.repo_url
@@ -408,8 +404,15 @@ This file contains...
         if conversation_history:
             prompt += f"<conversation_history>\n{conversation_history}</conversation_history>\n\n"
 
+        # Fixed sections get a share of the model's context budget, retrieved chunks the rest
+        packer = ContextPacker.for_model(
+            configs.get("context_budget"),
+            request.model or configs["providers"].get(request.provider, {}).get("default_model"),
+        )
+
         # Check if filePath is provided and fetch file content if it exists
         if file_content:
+            file_content = packer.pack_text("file_content", file_content)
             # Add file content to the prompt after conversation history
             prompt += f"<currentFileContent path=\"{request.filePath}\">\n{file_content}\n</currentFileContent>\n\n"
 
@@ -425,9 +428,10 @@ This file contains...
             the_repo_name = extract_owner_repo(repo_url)
             summarize_json = get_summarize_json(the_repo_name)
             java_callgraph_json = get_java_callgraph(last_message.content,repo_name)
-        summarize_json_string = json.dumps(summarize_json, ensure_ascii=False, indent=2)
-        java_callgraph_json_string = json.dumps(java_callgraph_json, ensure_ascii=False, indent=2)
-        print("====================================》"+summarize_json_string)
+        # Compact JSON that loses whole files or call graph nodes, never half a value, to fit
+        summarize_json_string = packer.pack_json("project_summary", summarize_json)
+        java_callgraph_json_string = packer.pack_json("call_graph", java_callgraph_json)
+        logger.debug(f"Project summary section: {len(summarize_json_string)} characters")
         summarize_text = '';
         if java_callgraph_json_string.strip():
             summarize_text =  f"""#You are also skilled at understanding and summarizing project structures, proficient in reading call chains and code comments, and capable of organizing the overall framework and key modules of a project through relevant documentation. The materials are provided in the form of JSON strings:
@@ -443,6 +447,9 @@ This file contains...
              """
 
 
+        context_text = packer.pack_documents(rag_documents)
+        logger.info(f"Prompt context token usage: {packer.report()}")
+
         if context_text.strip():
             prompt += f"{CONTEXT_START}\n{context_text}\n{summarize_text}\n{CONTEXT_END}\n\n"
         else:
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the retriever's approximate-nearest-neighbour index options.
+
+Builds clustered synthetic embeddings (200k vectors of dim 256 by default, similar in
+shape to code-chunk embeddings), then reports build time, per-query latency, memory
+and recall@k of IVF-Flat, IVF-PQ and HNSW against the exact flat index.
+
+Usage: python benchmarks/bench_ann_index.py [--vectors 200000] [--dim 256] [--top-k 30]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import faiss
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.tools.ann_index import AnnIndexConfig, build_ann_index, index_nbytes
+
+
+def make_vectors(n: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    """Normalized vectors drawn around ``clusters`` random centres."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f[f >= 0]) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ANN index types against exact search")
+    parser.add_argument("--vectors", type=int, default=200_000, help="Number of indexed vectors")
+    parser.add_argument("--dim", type=int, default=256, help="Embedding dimensions")
+    parser.add_argument("--queries", type=int, default=500, help="Number of queries")
+    parser.add_argument("--top-k", type=int, default=30, help="Neighbours per query")
+    parser.add_argument("--clusters", type=int, default=1000, help="Clusters in the synthetic data")
+    args = parser.parse_args()
+
+    vectors = make_vectors(args.vectors, args.dim, args.clusters)
+    queries = make_vectors(args.queries, args.dim, args.clusters, seed=1)
+    print(f"{args.vectors} vectors, dim {args.dim}, {args.queries} queries, top_k {args.top_k}")
+
+    settings = [
+        ("flat", {}),
+        ("ivf_flat", {"nprobe": 8}),
+        ("ivf_flat", {"nprobe": 32}),
+        ("ivf_pq", {"nprobe": 16}),
+        ("ivf_pq", {"nprobe": 64}),
+        ("hnsw", {"ef_search": 64}),
+        ("hnsw", {"ef_search": 256}),
+    ]
+    truth = None
+    print(f"{'index':<28}{'build s':>10}{'ms/query':>10}{'MB':>10}{'recall@k':>10}")
+    for index_type, knobs in settings:
+        config = AnnIndexConfig(type=index_type, min_vectors=0, **knobs)
+        start = time.perf_counter()
+        index = build_ann_index(vectors, config)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, found = index.search(queries, args.top_k)
+        latency = (time.perf_counter() - start) * 1000 / args.queries
+        if truth is None:
+            truth = found
+        label = index_type + "".join(f" {k}={v}" for k, v in knobs.items())
+        print(f"{label:<28}{build_time:>10.2f}{latency:>10.3f}"
+              f"{index_nbytes(index) / 1024 ** 2:>10.1f}{recall_at_k(found, truth):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
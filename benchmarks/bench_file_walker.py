@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the repository walker used by read_all_documents.
+
+Builds a synthetic tree (100k files by default, a share of them under node_modules
+and build directories) and compares the single-pass walker with the previous
+one-recursive-glob-per-extension enumeration.
+
+Usage: python benchmarks/bench_file_walker.py [--files 100000] [--keep DIR]
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.tools.file_walker import CODE_EXTENSIONS, DOC_EXTENSIONS, clean_dir_pattern, iter_repository_files
+
+EXCLUDED_DIRS = ["./node_modules/", "./build/", "./dist/", "./.git/", "./__pycache__/"]
+FILE_EXTENSIONS = [".py", ".js", ".ts", ".md", ".json", ".png", ".txt", ".go"]
+
+
+def build_tree(root: str, total_files: int, files_per_dir: int = 50) -> None:
+    """Create a tree where roughly 40% of the files live in excluded directories."""
+    n_dirs = max(1, total_files // files_per_dir)
+    for d in range(n_dirs):
+        bucket = d % 10
+        if bucket < 3:
+            top = os.path.join(root, "node_modules", f"pkg{d}", "lib")
+        elif bucket == 3:
+            top = os.path.join(root, "build", f"out{d}")
+        else:
+            top = os.path.join(root, "src", f"mod{d // 100}", f"sub{d}")
+        os.makedirs(top, exist_ok=True)
+        for f in range(files_per_dir):
+            ext = FILE_EXTENSIONS[(d + f) % len(FILE_EXTENSIONS)]
+            with open(os.path.join(top, f"file{f}{ext}"), "w") as fh:
+                fh.write("x")
+
+
+def legacy_glob_walk(root: str) -> int:
+    """The previous enumeration: one recursive glob per extension, filtered afterwards."""
+    excluded = [clean_dir_pattern(d) for d in EXCLUDED_DIRS]
+    count = 0
+    for ext in list(CODE_EXTENSIONS) + list(DOC_EXTENSIONS) + [".json"]:
+        for file_path in glob.glob(f"{root}/**/*{ext}", recursive=True):
+            parts = os.path.normpath(os.path.relpath(file_path, root)).split(os.sep)
+            if any(d in parts for d in excluded):
+                continue
+            count += 1
+    return count
+
+
+def single_pass_walk(root: str) -> int:
+    return sum(1 for _ in iter_repository_files(root, excluded_dirs=EXCLUDED_DIRS))
+
+
+def timed(func, root: str, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(root)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark repository file enumeration")
+    parser.add_argument("--files", type=int, default=100_000, help="Number of synthetic files to create")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per strategy (best time is reported)")
+    parser.add_argument("--keep", help="Build the tree in this directory and keep it")
+    args = parser.parse_args()
+
+    root = args.keep or tempfile.mkdtemp(prefix="walk_bench_")
+    try:
+        if not os.listdir(root):
+            start = time.perf_counter()
+            build_tree(root, args.files)
+            print(f"Built {args.files} files in {time.perf_counter() - start:.1f}s under {root}")
+
+        legacy_time, legacy_count = timed(legacy_glob_walk, root, args.repeat)
+        walk_time, walk_count = timed(single_pass_walk, root, args.repeat)
+
+        print(f"{'strategy':<24}{'files':>10}{'seconds':>12}")
+        print(f"{'glob per extension':<24}{legacy_count:>10}{legacy_time:>12.3f}")
+        print(f"{'single-pass scandir':<24}{walk_count:>10}{walk_time:>12.3f}")
+        print(f"speedup: {legacy_time / walk_time:.1f}x")
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Tests for the configurable FAISS index factory used by the retriever.
+
+Usage: python -m pytest test/test_ann_index.py
+"""
+
+import os
+import sys
+
+import faiss
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.tools.ann_index import (
+    AnnIndexConfig, build_ann_index, describe_index, index_nbytes, load_or_build_ann_index, rerank,
+    search_hits,
+)
+
+
+def _vectors(n=2000, dim=32):
+    vectors = np.random.default_rng(0).standard_normal((n, dim)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+class TestAnnIndex:
+    """Tests for AnnIndexConfig, build_ann_index and load_or_build_ann_index"""
+
+    def test_small_repositories_use_flat(self):
+        config = AnnIndexConfig.from_dict({"type": "hnsw", "min_vectors": 10000})
+        index = build_ann_index(_vectors(100), config)
+        assert isinstance(index, faiss.IndexFlatIP)
+
+    def test_unknown_type_is_rejected(self):
+        with pytest.raises(ValueError):
+            AnnIndexConfig.from_dict({"type": "lsh"})
+
+    @pytest.mark.parametrize("index_type", ["ivf_flat", "ivf_pq", "hnsw"])
+    def test_index_types_find_the_query_itself(self, index_type):
+        vectors = _vectors()
+        config = AnnIndexConfig(type=index_type, min_vectors=0, nprobe=64, pq_m=12)
+        index = build_ann_index(vectors, config)
+        assert index.ntotal == len(vectors)
+        _, found = index.search(vectors[:20], 5)
+        assert (found[:, 0] == np.arange(20)).mean() >= 0.9
+
+    def test_trained_index_is_saved_and_reused(self, tmp_path):
+        vectors = _vectors()
+        config = AnnIndexConfig(type="ivf_flat", min_vectors=0, nprobe=4)
+        load_or_build_ann_index(vectors, config, str(tmp_path))
+        saved = os.listdir(str(tmp_path))
+        assert len(saved) == 1 and saved[0].startswith("ann-ivf_flat-")
+
+        # Query-time knobs are applied to the loaded index without rebuilding it
+        index = load_or_build_ann_index(vectors, AnnIndexConfig(type="ivf_flat", min_vectors=0, nprobe=8), str(tmp_path))
+        assert describe_index(index)["nprobe"] == 8
+        assert os.listdir(str(tmp_path)) == saved
+
+        load_or_build_ann_index(vectors, AnnIndexConfig(type="hnsw", min_vectors=0), str(tmp_path))
+        assert [name.split("-")[1] for name in os.listdir(str(tmp_path))] == ["hnsw"]
+
+    @pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "hnsw"])
+    def test_quantized_indexes_are_smaller(self, index_type):
+        vectors = _vectors()
+        full = build_ann_index(vectors, AnnIndexConfig(type=index_type, min_vectors=0, nprobe=64))
+        quantized = build_ann_index(vectors, AnnIndexConfig(type=index_type, min_vectors=0, nprobe=64,
+                                                            precision="int8"))
+        assert index_nbytes(quantized) < index_nbytes(full)
+        _, found = quantized.search(vectors[:20], 5)
+        assert (found[:, 0] == np.arange(20)).mean() >= 0.9
+
+    def test_rerank_restores_exact_order(self):
+        vectors = _vectors(200)
+        queries = vectors[:3]
+        candidates = np.array([[5, 0, 7, -1], [1, 9, -1, -1], [-1, -1, -1, -1]])
+        distances, ids = rerank(candidates, queries, 2, lambda rows: vectors[rows])
+
+        assert ids[0, 0] == 0 and ids[1, 0] == 1
+        np.testing.assert_allclose(distances[0, 0], 1.0, rtol=1e-5)
+        assert list(ids[2]) == [-1, -1]
+        assert np.all(distances[0, :-1] >= distances[0, 1:])
+
+    def test_short_ivf_row_does_not_cut_other_queries(self):
+        rng = np.random.default_rng(0)
+        center = np.zeros(32, dtype=np.float32)
+        center[0] = 1
+        # A dense cluster and a few scattered vectors: the lists probed for -center are nearly empty
+        vectors = np.vstack([center + 0.05 * rng.standard_normal((1500, 32)),
+                             rng.standard_normal((40, 32))]).astype(np.float32)
+        faiss.normalize_L2(vectors)
+        index = build_ann_index(vectors, AnnIndexConfig(type="ivf_flat", min_vectors=0, nlist=16, nprobe=1))
+        queries = np.vstack([center, -center]).astype(np.float32)
+
+        distances, ids = index.search(queries, 20)
+        assert (ids[1] == -1).any()
+        hits = search_hits(distances, ids)
+
+        assert len(hits[0][0]) == 20 and 0 < len(hits[1][0]) < 20
+        for query, batched in zip(queries, hits):
+            assert batched == search_hits(*index.search(query[None, :], 20))[0]
+        assert all(0 <= score <= 1 for _, scores in hits for score in scores)
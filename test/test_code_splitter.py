@@ -0,0 +1,85 @@
+"""
+Tests for the code-aware splitter that cuts source files at definition boundaries.
+
+Usage: python -m pytest test/test_code_splitter.py
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.tools.code_splitter import find_boundaries, split_code
+
+
+PYTHON_SOURCE = '''import os
+
+
+def first(a):
+    return a + 1
+
+
+# Helper kept with its comment
+@decorator
+def second(b):
+    return b * 2
+
+
+class Thing:
+    def method(self):
+        return os.sep
+'''
+
+JAVA_SOURCE = '''package demo;
+
+public class Greeter {
+    public String greet(String name) {
+        String text = format(name);
+        return text;
+    }
+
+    private String format(String name) {
+        return "Hello " + name;
+    }
+}
+'''
+
+
+class TestCodeSplitter:
+    """Tests for split_code"""
+
+    def test_boundaries_include_leading_comments_and_decorators(self):
+        lines = PYTHON_SOURCE.splitlines(keepends=True)
+        starts = [lines[i].strip() for i in find_boundaries(lines, "module.py")]
+
+        assert starts == ["def first(a):", "# Helper kept with its comment", "class Thing:", "def method(self):"]
+
+    def test_statements_are_not_boundaries(self):
+        lines = JAVA_SOURCE.splitlines(keepends=True)
+        starts = [lines[i].strip() for i in find_boundaries(lines, "Greeter.java")]
+
+        assert "return text;" not in starts and "String text = format(name);" not in starts
+        assert "private String format(String name) {" in starts
+
+    def test_chunks_follow_definitions_without_overlap(self):
+        chunks = split_code(PYTHON_SOURCE, "module.py", chunk_size=12, chunk_overlap=0)
+
+        assert "".join(chunks) == PYTHON_SOURCE
+        assert any(chunk.lstrip().startswith("# Helper kept with its comment\n@decorator\ndef second")
+                   for chunk in chunks)
+        for chunk in chunks:
+            assert "def first" not in chunk or "return a + 1" in chunk
+
+    def test_long_definitions_are_split_by_lines(self):
+        body = "".join(f"    value_{i} = compute({i})\n" for i in range(40))
+        source = f"def long_function():\n{body}    return value_0\n"
+        chunks = split_code(source, "long.py", chunk_size=30, chunk_overlap=6)
+
+        assert len(chunks) > 1
+        assert all(len(chunk.split()) <= 30 for chunk in chunks)
+        # Consecutive pieces share chunk_overlap words: two lines of three words
+        assert chunks[0].splitlines()[-2:] == chunks[1].splitlines()[:2]
+
+    def test_unsupported_files_fall_back(self):
+        assert split_code("# Title\n\nSome text\n", "README.md") is None
+        assert split_code("x = 1\ny = 2\n", "script.py") is None
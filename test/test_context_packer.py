@@ -0,0 +1,121 @@
+"""
+Tests for the token-budgeted prompt context packer.
+
+Usage: python -m pytest test/test_context_packer.py
+"""
+
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.tools.context_packer import ContextPacker, GAP_MARK, merge_file_chunks
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def truncate_words(text, max_tokens):
+    return " ".join(text.split()[:max_tokens])
+
+
+def chunk(text, file_path="a.py", order=None):
+    return SimpleNamespace(text=text, meta_data={"file_path": file_path}, order=order)
+
+
+def make_packer(total, shares=None):
+    return ContextPacker(total, shares or {}, count_tokens=count_words, truncate=truncate_words)
+
+
+class TestContextPacker:
+    """Tests for ContextPacker"""
+
+    def test_packs_best_ranked_chunks_within_budget(self):
+        packer = make_packer(30)
+        documents = [
+            chunk("alpha " * 10, "a.py"),
+            chunk("beta " * 15, "b.py"),
+            chunk("gamma " * 5, "c.py"),
+        ]
+        text = packer.pack_documents(documents)
+
+        assert "alpha" in text and "gamma" in text and "beta" not in text
+        usage = packer.usage["documents"]
+        assert usage.items == 2 and usage.dropped == 1
+        assert usage.tokens <= 30
+
+    def test_merges_overlapping_neighbours_and_marks_gaps(self):
+        first = chunk("def load(path):\n    with open(path) as f:\n        return f.read()", order=0)
+        second = chunk("with open(path) as f:\n        return f.read()\n\ndef save(path, data):", order=1)
+        distant = chunk("def close():", order=5)
+
+        merged = merge_file_chunks([distant, second, first])
+
+        assert merged.count("with open(path)") == 1
+        assert merged.startswith("def load(path):")
+        assert merged.endswith(GAP_MARK + "def close():")
+
+    def test_fixed_sections_are_truncated_to_their_share(self):
+        packer = make_packer(100, {"file_content": 0.2})
+        text = packer.pack_text("file_content", "word " * 50)
+
+        usage = packer.usage["file_content"]
+        assert usage.truncated and usage.tokens <= 20
+        assert text.endswith("[truncated]")
+        assert packer.section_budget("documents") == 100 - usage.tokens
+
+    def test_budget_per_model_and_report(self):
+        config = {"default_tokens": 50, "models": {"big": 500}, "sections": {"call_graph": 0.1}}
+        assert ContextPacker.for_model(config, "big").total_tokens == 500
+        packer = ContextPacker.for_model(config, "unknown", count_tokens=count_words, truncate=truncate_words)
+        assert packer.total_tokens == 50
+
+        packer.pack_text("call_graph", "a b c")
+        packer.pack_documents([chunk("x " * 100)])
+        report = packer.report()
+        assert report["call_graph"]["tokens"] == 3
+        assert report["documents"]["truncated"]
+        assert report["total"]["budget"] == 50 and report["total"]["tokens"] <= 50
+
+    def test_json_sections_drop_whole_file_summaries(self):
+        packer = ContextPacker(400, {"project_summary": 0.5}, count_tokens=len, truncate=lambda t, n: t[:n])
+        summary = {"project_name": "demo", "total_files": 30, "modules": {
+            ".py": {"file_count": 20, "files": [{"file": f"m{i}.py", "classes": ["Model"]} for i in range(20)]},
+            ".js": {"file_count": 10, "files": [{"file": f"v{i}.js", "functions": ["render"]} for i in range(10)]},
+        }}
+        text = packer.pack_json("project_summary", summary)
+
+        packed = json.loads(text)
+        usage = packer.usage["project_summary"]
+        assert usage.truncated and len(text) == usage.tokens <= 200
+        assert packed["truncated"] is True and packed["modules"][".js"]["file_count"] == 10
+        kept = packed["modules"][".py"]["files"] + packed["modules"][".js"]["files"]
+        assert kept == summary["modules"][".py"]["files"][:len(kept)]
+        assert usage.items == len(kept) and usage.dropped == 30 - len(kept)
+
+    def test_json_call_graph_keeps_edges_between_kept_nodes(self):
+        packer = ContextPacker(300, {"call_graph": 1.0}, count_tokens=len, truncate=lambda t, n: t[:n])
+        graph = {
+            "nodes_by_file": {"A.java": [f"A.m{i}" for i in range(10)], "B.java": [f"B.m{i}" for i in range(10)]},
+            "edges": [[f"A.m{i}", f"B.m{i}"] for i in range(10)] + [[f"A.m{i}", f"A.m{i + 1}"] for i in range(9)],
+        }
+        packed = json.loads(packer.pack_json("call_graph", graph))
+
+        nodes = {node for file_nodes in packed["nodes_by_file"].values() for node in file_nodes}
+        assert 0 < len(nodes) < 20 and packed["truncated"] is True
+        assert packed["edges"] and all(a in nodes and b in nodes for a, b in packed["edges"])
+
+        fits = make_packer(1000, {"call_graph": 1.0})
+        assert json.loads(fits.pack_json("call_graph", graph)) == graph
+        assert not fits.usage["call_graph"].truncated
+
+    def test_json_lists_drop_lowest_ranked_entries(self):
+        packer = ContextPacker(100, {"call_graph": 1.0}, count_tokens=len, truncate=lambda t, n: t[:n])
+        results = [{"score": 1.0 - i / 10, "text": f"chain {i}"} for i in range(10)]
+        packed = json.loads(packer.pack_json("call_graph", results))
+
+        assert packed == results[:len(packed)] and packer.usage["call_graph"].dropped == 10 - len(packed)
+        assert packer.pack_json("call_graph", {}) == ""
@@ -0,0 +1,53 @@
+"""
+Tests for the persistent, content-addressed embedding cache.
+
+Usage: python -m pytest test/test_embedding_cache.py
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.tools.embedding_cache import EmbeddingCache, embedding_cache_key
+
+
+class TestEmbeddingCache:
+    """Tests for EmbeddingCache"""
+
+    def test_key_depends_on_model_dimensions_and_text(self):
+        key = embedding_cache_key("OpenAIClient/m", 256, "text")
+        assert key == embedding_cache_key("OpenAIClient/m", 256, "text")
+        assert key != embedding_cache_key("OpenAIClient/m", 512, "text")
+        assert key != embedding_cache_key("OllamaClient/m", 256, "text")
+        assert key != embedding_cache_key("OpenAIClient/m", 256, "text ")
+
+    def test_embed_only_calls_provider_for_missing_texts(self, tmp_path):
+        cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+        calls = []
+
+        def embed(texts):
+            calls.append(list(texts))
+            return [[float(len(t)), 1.0] for t in texts]
+
+        assert cache.embed(["a", "bb", "a"], "m", 2, embed) == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+        assert calls == [["a", "bb"]]
+        assert cache.embed(["bb", "ccc"], "m", 2, embed) == [[2.0, 1.0], [3.0, 1.0]]
+        assert calls[-1] == ["ccc"]
+        assert cache.stats.hits == 1
+
+        # Persistent across instances
+        reopened = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+        assert reopened.get_many([embedding_cache_key("m", 2, "ccc")]) == [[3.0, 1.0]]
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        # Each two-float vector takes 8 bytes; the budget holds three of them
+        cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_bytes=28)
+        keys = [embedding_cache_key("m", 2, str(i)) for i in range(4)]
+        cache.put_many(keys[:3], [[1.0, 2.0]] * 3)
+        cache._conn.execute("UPDATE embeddings SET last_used = 0 WHERE key = ?", (keys[0],))
+        cache.put_many(keys[3:], [[1.0, 2.0]])
+
+        assert cache.get_many(keys[:1]) == [None]
+        summary = cache.summary()
+        assert summary["entries"] == 3 and summary["evictions"] == 1
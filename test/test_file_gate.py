@@ -0,0 +1,72 @@
+"""
+Tests for the pre-read file gate and the ingest report.
+
+Usage: python -m pytest test/test_file_gate.py
+"""
+
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.tools.file_gate import (
+    SKIP_BINARY, SKIP_MINIFIED, SKIP_TOO_LARGE, FileGateConfig, check_file,
+)
+from api.tools.file_walker import iter_repository_files
+from api.tools.ingest import ConcurrentIngestor, IngestConfig, IngestReport
+
+
+def _write(root, name, content):
+    mode = "wb" if isinstance(content, bytes) else "w"
+    with open(os.path.join(root, name), mode) as f:
+        f.write(content)
+
+
+class TestFileGate:
+    """Tests for check_file and the gated ConcurrentIngestor"""
+
+    def test_reasons(self, tmp_path):
+        root = str(tmp_path)
+        _write(root, "main.py", "def f():\n    return 1\n" * 50)
+        _write(root, "README.md", ("A long paragraph without line breaks. " * 100 + "\n") * 3)
+        _write(root, "big.json", "[" + "1, " * 400 + "1]\n")
+        _write(root, "bundle.js", "var a=1;" * 2000)
+        _write(root, "app.min.js", "var a=1;\n")
+        _write(root, "blob.py", b"\x00\x01\x02binary")
+        config = FileGateConfig(max_bytes_by_extension={".json": 1000})
+
+        reasons = {f.relative_path: (check_file(f, config) or (None,))[0] for f in iter_repository_files(root)}
+
+        assert reasons == {
+            "main.py": None,
+            "README.md": None,
+            "big.json": SKIP_TOO_LARGE,
+            "bundle.js": SKIP_MINIFIED,
+            "app.min.js": SKIP_MINIFIED,
+            "blob.py": SKIP_BINARY,
+        }
+        assert check_file(next(iter_repository_files(root, code_extensions=[".js"], doc_extensions=[])),
+                          FileGateConfig(enabled=False)) is None
+
+    def test_gated_files_are_not_read_and_reported(self, tmp_path):
+        root = str(tmp_path)
+        _write(root, "main.py", "def f():\n    return 1\n")
+        _write(root, "bundle.js", "var a=1;" * 2000)
+        records, stats = ConcurrentIngestor(IngestConfig(read_workers=2), gate=FileGateConfig()).run(
+            iter_repository_files(root))
+
+        skipped = [r for r in records if r.skip_reason]
+        assert [r.repo_file.relative_path for r in skipped] == ["bundle.js"]
+        assert skipped[0].content is None and skipped[0].error is None
+        assert stats.skipped == 1 and stats.read_errors == 0
+
+        report = IngestReport()
+        report.add_indexed(1)
+        report.add_skipped("bundle.js", skipped[0].skip_reason, skipped[0].skip_detail)
+        path = os.path.join(root, "report.json")
+        report.save(path)
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+        assert saved["indexed"] == 1 and saved["skipped"] == {SKIP_MINIFIED: 1}
+        assert saved["files"][0]["path"] == "bundle.js"
@@ -0,0 +1,100 @@
+"""
+Tests for the single-pass repository walker used by read_all_documents.
+
+Usage: python -m pytest test/test_file_walker.py
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.tools.file_walker import clean_dir_pattern, iter_repository_files
+
+
+def _touch(root, relative_path, content="x"):
+    path = os.path.join(root, *relative_path.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    root = str(tmp_path)
+    for rel in [
+        "main.py",
+        "README.md",
+        "config.json",
+        "image.png",
+        "src/app.js",
+        "src/app.min.js",
+        "src/utils/helpers.ts",
+        "node_modules/pkg/index.js",
+        "build/out.js",
+        ".git/hooks/pre-commit.py",
+        ".github/workflow.yml",
+        "docs/guide.md",
+        "tests/test_main.py",
+    ]:
+        _touch(root, rel)
+    return root
+
+
+def _relative_paths(files):
+    return [f.relative_path.replace(os.sep, "/") for f in files]
+
+
+class TestFileWalker:
+    """Tests for iter_repository_files"""
+
+    def test_clean_dir_pattern_keeps_hidden_prefix(self):
+        assert clean_dir_pattern("./node_modules/") == "node_modules"
+        assert clean_dir_pattern("./.git/") == ".git"
+        assert clean_dir_pattern("src/generated/") == "src/generated"
+
+    def test_exclusion_mode_prunes_dirs_and_filters_files(self, repo):
+        files = list(iter_repository_files(
+            repo,
+            excluded_dirs=["./node_modules/", "./build/", "./docs/"],
+            excluded_files=["*.min.js", "config.json"],
+        ))
+        assert _relative_paths(files) == [
+            "README.md",
+            "main.py",
+            "src/app.js",
+            "src/utils/helpers.ts",
+            "tests/test_main.py",
+        ]
+
+    def test_code_flag_and_extension(self, repo):
+        files = {f.relative_path.replace(os.sep, "/"): f for f in iter_repository_files(repo)}
+        assert files["main.py"].is_code is True
+        assert files["main.py"].extension == ".py"
+        assert files["README.md"].is_code is False
+        # Each file is reported exactly once, even for extensions listed twice before
+        assert list(files).count("config.json") == 1
+        assert "image.png" not in files
+
+    def test_hidden_entries_are_skipped(self, repo):
+        paths = _relative_paths(iter_repository_files(repo))
+        assert not any(p.startswith(".git") for p in paths)
+
+    def test_inclusion_mode(self, repo):
+        paths = _relative_paths(iter_repository_files(repo, included_dirs=["./src/"]))
+        assert paths == ["src/app.js", "src/app.min.js", "src/utils/helpers.ts"]
+
+        paths = _relative_paths(iter_repository_files(repo, included_files=["main.py"]))
+        assert paths == ["main.py", "tests/test_main.py"]
+
+    def test_multi_component_dir_rule(self, repo):
+        paths = _relative_paths(iter_repository_files(repo, excluded_dirs=["src/utils"]))
+        assert "src/utils/helpers.ts" not in paths
+        assert "src/app.js" in paths
+
+    def test_walker_is_lazy(self, repo):
+        walker = iter_repository_files(repo)
+        first = next(walker)
+        assert first.relative_path == "README.md"
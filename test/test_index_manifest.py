@@ -0,0 +1,94 @@
+"""
+Tests for the per-file index manifest used for incremental re-indexing.
+
+Usage: python -m pytest test/test_index_manifest.py
+"""
+
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.tools.file_walker import iter_repository_files
+from api.tools.index_manifest import IndexManifest, compute_fingerprints, manifest_path_for
+
+
+def _write(root, name, content):
+    with open(os.path.join(root, name), "w") as f:
+        f.write(content)
+
+
+def _chunk(chunk_id, file_path):
+    return SimpleNamespace(id=chunk_id, meta_data={"file_path": file_path})
+
+
+class TestIndexManifest:
+    """Tests for IndexManifest and compute_fingerprints"""
+
+    def test_manifest_path_for(self):
+        assert manifest_path_for("/db/owner_repo.pkl") == "/db/owner_repo.manifest.json"
+
+    def test_diff_groups_files(self):
+        manifest = IndexManifest.from_documents(
+            {"model": "m"},
+            {"a.py": "git:1", "b.py": "git:2", "c.py": "git:3"},
+            [_chunk("x", "a.py"), _chunk("y", "a.py"), _chunk("z", "b.py")],
+        )
+        assert manifest.files["a.py"].chunk_ids == ["x", "y"]
+
+        diff = manifest.diff({"a.py": "git:1", "b.py": "git:changed", "d.py": "git:4"})
+        assert diff.unchanged == ["a.py"]
+        assert diff.modified == ["b.py"]
+        assert diff.added == ["d.py"]
+        assert diff.deleted == ["c.py"]
+        assert diff.changed == ["d.py", "b.py"]
+        assert diff.has_changes
+
+    def test_save_and_load_round_trip(self, tmp_path):
+        path = str(tmp_path / "repo.manifest.json")
+        manifest = IndexManifest.from_documents({"model": "m", "dimensions": 256}, {"a.py": "git:1"}, [_chunk("x", "a.py")])
+        manifest.save(path)
+
+        loaded = IndexManifest.load(path)
+        assert loaded.embedder == {"model": "m", "dimensions": 256}
+        assert loaded.files["a.py"].chunk_ids == ["x"]
+        assert not loaded.diff({"a.py": "git:1"}).has_changes
+
+    def test_fingerprints_use_blob_sha_for_clean_files(self, tmp_path):
+        root = str(tmp_path)
+        _write(root, "clean.py", "print('clean')\n")
+        _write(root, "dirty.py", "print('dirty')\n")
+        git = ["git", "-C", root, "-c", "user.email=dev@example.com", "-c", "user.name=dev"]
+        subprocess.run(git + ["init", "-q"], check=True)
+        subprocess.run(git + ["add", "."], check=True)
+        subprocess.run(git + ["commit", "-q", "-m", "init"], check=True)
+        _write(root, "dirty.py", "print('changed')\n")
+        _write(root, "new.py", "print('new')\n")
+
+        fingerprints = compute_fingerprints(root, iter_repository_files(root))
+        assert fingerprints["clean.py"].startswith("git:")
+        assert fingerprints["dirty.py"].startswith("stat:")
+        assert fingerprints["new.py"].startswith("stat:")
+
+    def test_fingerprints_in_subdirectory_of_checkout(self, tmp_path):
+        root = str(tmp_path)
+        sub = tmp_path / "sub"
+        sub.mkdir()
+        _write(str(sub), "f.txt", "original\n")
+        _write(str(sub), "g.txt", "kept\n")
+        git = ["git", "-C", root, "-c", "user.email=dev@example.com", "-c", "user.name=dev"]
+        subprocess.run(git + ["init", "-q"], check=True)
+        subprocess.run(git + ["add", "."], check=True)
+        subprocess.run(git + ["commit", "-q", "-m", "init"], check=True)
+        _write(str(sub), "f.txt", "edited\n")
+
+        fingerprints = compute_fingerprints(str(sub), iter_repository_files(str(sub)))
+        assert fingerprints["f.txt"].startswith("stat:")
+        assert fingerprints["g.txt"].startswith("git:")
+
+    def test_fingerprints_outside_git(self, tmp_path):
+        _write(str(tmp_path), "a.py", "x")
+        fingerprints = compute_fingerprints(str(tmp_path), iter_repository_files(str(tmp_path)))
+        assert fingerprints["a.py"].startswith("stat:")
@@ -0,0 +1,96 @@
+"""
+Tests for the concurrent read and token counting stage of the ingestion pipeline.
+
+Usage: python -m pytest test/test_ingest.py
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import api.tools.ingest as ingest
+from api.tools.file_walker import iter_repository_files
+from api.tools.ingest import ConcurrentIngestor, IngestConfig
+
+
+def _make_repo(root, count):
+    for i in range(count):
+        with open(os.path.join(root, f"file{i:03d}.py"), "w", encoding="utf-8") as f:
+            f.write("def f():\n    return 1\n" * (i + 1))
+
+
+class TestConcurrentIngestor:
+    """Tests for ConcurrentIngestor"""
+
+    def test_order_is_preserved_with_many_readers(self, tmp_path):
+        _make_repo(str(tmp_path), 40)
+        files = list(iter_repository_files(str(tmp_path)))
+        records, stats = ConcurrentIngestor(IngestConfig(read_workers=8, token_workers=1)).run(files)
+
+        assert [r.repo_file for r in records] == files
+        assert stats.files == 40
+        assert stats.read_workers == 8
+        assert all(r.token_count > 0 for r in records)
+        # Token counts grow with file size
+        assert records[-1].token_count > records[0].token_count
+
+    def test_unreadable_file_is_reported(self, tmp_path):
+        _make_repo(str(tmp_path), 2)
+        with open(os.path.join(str(tmp_path), "binary.py"), "wb") as f:
+            f.write(b"\xff\xfe\x00\x81")
+        records, stats = ConcurrentIngestor(IngestConfig(read_workers=2)).run(iter_repository_files(str(tmp_path)))
+
+        failed = [r for r in records if r.error]
+        assert [r.repo_file.relative_path for r in failed] == ["binary.py"]
+        assert stats.read_errors == 1
+
+    def test_process_pool_matches_serial_counts(self, tmp_path, monkeypatch):
+        _make_repo(str(tmp_path), 12)
+        files = list(iter_repository_files(str(tmp_path)))
+        serial, _ = ConcurrentIngestor(IngestConfig(read_workers=1, token_workers=1)).run(files)
+
+        monkeypatch.setattr(ingest, "MIN_PARALLEL_TOKENIZE_CHARS", 0)
+        parallel, stats = ConcurrentIngestor(IngestConfig(token_workers=2, token_batch_size=3)).run(files)
+
+        assert stats.token_workers == 2
+        assert [r.token_count for r in parallel] == [r.token_count for r in serial]
+        assert set(stats.as_dict()) >= {"walk_seconds", "read_seconds", "tokenize_seconds", "total_seconds"}
+
+    def test_large_files_get_estimated_counts(self, tmp_path):
+        _make_repo(str(tmp_path), 3)
+        files = list(iter_repository_files(str(tmp_path)))
+        exact, _ = ConcurrentIngestor(IngestConfig(read_workers=1, token_workers=1)).run(files)
+        estimated, _ = ConcurrentIngestor(IngestConfig(read_workers=1, token_workers=1,
+                                                       estimate_tokens_above_chars=40)).run(files)
+
+        # Only the first file is shorter than 40 characters
+        assert estimated[0].token_count == exact[0].token_count
+        assert [r.token_count for r in estimated[1:]] == [len(r.content) // 4 for r in estimated[1:]]
+
+    def test_context_manager_reuses_pools_across_runs(self, tmp_path, monkeypatch):
+        _make_repo(str(tmp_path), 12)
+        files = list(iter_repository_files(str(tmp_path)))
+        started = []
+
+        class CountingPool(ingest.ProcessPoolExecutor):
+            def __init__(self, *args, **kwargs):
+                started.append(kwargs["max_workers"])
+                super().__init__(*args, **kwargs)
+
+        monkeypatch.setattr(ingest, "ProcessPoolExecutor", CountingPool)
+        monkeypatch.setattr(ingest, "MIN_PARALLEL_TOKENIZE_CHARS", 0)
+        config = IngestConfig(read_workers=4, token_workers=2, token_batch_size=3)
+        with ConcurrentIngestor(config) as ingestor:
+            first, _ = ingestor.run(files[:6])
+            second, _ = ingestor.run(files[6:])
+            assert ingestor._read_pool is not None and ingestor._token_pool is not None
+        assert started == [2]
+        assert ingestor._read_pool is None and ingestor._token_pool is None
+
+        serial, _ = ConcurrentIngestor(IngestConfig(read_workers=1, token_workers=1)).run(files)
+        assert [r.token_count for r in first + second] == [r.token_count for r in serial]
+
+        # Without the context manager every run shuts its pools down
+        ConcurrentIngestor(config).run(files)
+        assert started == [2, 2]
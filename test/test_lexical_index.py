@@ -0,0 +1,46 @@
+"""
+Tests for the BM25 lexical index and rank fusion used by hybrid retrieval.
+
+Usage: python -m pytest test/test_lexical_index.py
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.tools.lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize_code
+
+
+class TestLexicalIndex:
+    """Tests for tokenize_code, LexicalIndex and reciprocal_rank_fusion"""
+
+    def test_tokenize_splits_identifiers(self):
+        assert tokenize_code("def get_java_callgraph(x):") == ["def", "get_java_callgraph", "get", "java", "callgraph"]
+        assert tokenize_code("HTTPServer MAX_EMBEDDING_TOKENS") == [
+            "httpserver", "http", "server", "max_embedding_tokens", "max", "embedding", "tokens",
+        ]
+
+    def test_search_ranks_exact_identifier_first(self, tmp_path):
+        texts = [
+            "def build_graph(nodes): return nodes",
+            "MAX_EMBEDDING_TOKENS = 8192  # limit for the embedding model",
+            "the embedding model returns vectors for each chunk of text",
+            "",
+            "class JavaParser:\n    def get_java_callgraph(self): pass",
+        ]
+        index = LexicalIndex.build(str(tmp_path), texts)
+        assert len(index) == 5
+
+        rows, scores = index.search("MAX_EMBEDDING_TOKENS", top_k=2)
+        assert rows.tolist()[0] == 1 and scores[0] > scores[1]
+        rows, _ = index.search("where is getJavaCallgraph defined", top_k=3)
+        assert rows.tolist()[0] == 4
+        assert index.search("nothing matches this", top_k=3)[0].size == 0
+
+        reopened = LexicalIndex.open(str(tmp_path))
+        assert reopened.search("callgraph", top_k=1)[0].tolist() == [4]
+
+    def test_reciprocal_rank_fusion(self):
+        fused = reciprocal_rank_fusion([[1, 2, 3], [3, 4]], k=60, limit=3)
+        assert [item for item, _ in fused] == [3, 1, 2]
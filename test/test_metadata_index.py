@@ -0,0 +1,68 @@
+"""
+Tests for metadata-filtered retrieval: the per-chunk metadata index and subset search.
+
+Usage: python -m pytest test/test_metadata_index.py
+"""
+
+import os
+import sys
+
+import faiss
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.tools.ann_index import AnnIndexConfig, build_ann_index, exact_search, search_with_selector
+from api.tools.metadata_index import MetadataIndex, RetrievalFilter
+
+RECORDS = [
+    {"file_path": "src/app/main.py", "type": "py", "is_code": True, "is_implementation": True},
+    {"file_path": "src/app/main.py", "type": "py", "is_code": True, "is_implementation": True},
+    {"file_path": "src/app/test_main.py", "type": "py", "is_code": True, "is_implementation": False},
+    {"file_path": "src/web/index.ts", "type": "ts", "is_code": True, "is_implementation": True},
+    {"file_path": "docs/guide.md", "type": "md", "is_code": False, "is_implementation": False},
+    {"file_path": "srcgen/out.py", "type": "py", "is_code": True, "is_implementation": True},
+]
+
+
+class TestMetadataIndex:
+    """Tests for RetrievalFilter, MetadataIndex and filtered search"""
+
+    def test_filters(self):
+        index = MetadataIndex.from_records(RECORDS)
+
+        def rows(**kwargs):
+            return np.flatnonzero(index.mask(RetrievalFilter.from_dict(kwargs))).tolist()
+
+        assert rows(path_prefixes="src/app/main.py") == [0, 1]
+        assert rows(path_prefixes=["src/"]) == [0, 1, 2, 3]
+        assert rows(globs=["*.md"]) == [4]
+        assert rows(languages=["python"], is_implementation=True) == [0, 1, 5]
+        assert rows(languages=["ts"]) == [3]
+        assert rows(is_code=False) == [4]
+        assert RetrievalFilter.from_dict(None).is_empty
+
+    def test_saved_index_round_trip(self, tmp_path):
+        MetadataIndex.build(str(tmp_path), RECORDS)
+        index = MetadataIndex.open(str(tmp_path))
+        assert len(index) == len(RECORDS)
+        assert np.flatnonzero(index.mask(RetrievalFilter(path_prefixes=["docs"]))).tolist() == [4]
+
+    def test_search_stays_within_allowed_ids(self):
+        vectors = np.random.default_rng(0).standard_normal((1000, 16)).astype(np.float32)
+        faiss.normalize_L2(vectors)
+        allowed = np.zeros(1000, dtype=bool)
+        allowed[200:260] = True
+        queries = vectors[[230, 7]]
+
+        for index_type in ["flat", "ivf_flat", "hnsw"]:
+            index = build_ann_index(vectors, AnnIndexConfig(type=index_type, min_vectors=0))
+            _, ids = search_with_selector(index, queries, 5, allowed)
+            assert all(allowed[i] for i in ids.ravel() if i >= 0)
+            assert ids[0, 0] == 230
+
+        ids_in = np.flatnonzero(allowed)
+        distances, ids = exact_search(vectors[ids_in], ids_in, queries, 70)
+        assert ids[0, 0] == 230
+        assert (ids[:, 60:] == -1).all()
+        assert set(ids[1, :60]) == set(ids_in)
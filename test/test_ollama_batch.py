@@ -0,0 +1,99 @@
+"""
+Tests for the batched Ollama embedding client.
+
+Usage: python -m pytest test/test_ollama_batch.py
+"""
+
+import json
+import os
+import sys
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.tools.ollama_batch import OllamaBatchConfig, OllamaBatchEmbedder, resolve_ollama_host
+
+
+class _Response:
+    def __init__(self, status_code, payload=None, text=""):
+        self.status_code = status_code
+        self._payload = payload or {}
+        self.text = text
+        self.headers = {}
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class _FakeSession:
+    """Embeds each text as [len(text)]; fails the first ``fail_first`` requests with 429."""
+
+    def __init__(self, fail_first=0, legacy=False):
+        self.fail_first = fail_first
+        self.legacy = legacy
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def post(self, url, json, timeout):
+        with self._lock:
+            self.calls.append((url, json))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            fail = len(self.calls) <= self.fail_first
+        try:
+            if fail:
+                return _Response(429)
+            if url.endswith("/api/embed"):
+                if self.legacy:
+                    return _Response(404, text="404 page not found")
+                return _Response(200, {"embeddings": [[float(len(t))] for t in json["input"]]})
+            return _Response(200, {"embedding": [float(len(json["prompt"]))]})
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+class TestOllamaBatchEmbedder:
+    """Tests for OllamaBatchEmbedder"""
+
+    def test_resolve_host(self):
+        assert resolve_ollama_host("localhost:11434/api/") == "http://localhost:11434"
+
+    def test_batches_keep_input_order(self):
+        session = _FakeSession()
+        config = OllamaBatchConfig(batch_size=3, concurrency=2)
+        embedder = OllamaBatchEmbedder("m", host="http://ollama", config=config, session=session)
+        texts = ["a" * i for i in range(1, 11)]
+        assert embedder.embed(texts) == [[float(i)] for i in range(1, 11)]
+        assert len(session.calls) == 4
+        assert session.max_in_flight <= 2
+
+    def test_retries_rate_limited_requests(self):
+        session = _FakeSession(fail_first=2)
+        config = OllamaBatchConfig(batch_size=10, concurrency=1, max_retries=3, backoff_seconds=0)
+        embedder = OllamaBatchEmbedder("m", host="http://ollama", config=config, session=session)
+        assert embedder.embed(["ab", "c"]) == [[2.0], [1.0]]
+        assert len(session.calls) == 3
+
+    def test_falls_back_to_legacy_endpoint(self):
+        session = _FakeSession(legacy=True)
+        embedder = OllamaBatchEmbedder("m", host="http://ollama", session=session)
+        assert embedder.embed(["ab", "c"]) == [[2.0], [1.0]]
+        assert session.calls[-1][0] == "http://ollama/api/embeddings"
+
+    def test_ollama_config_sets_batching_on_active_embedder(self):
+        # embedder.json is replaced by this file to switch to Ollama; the pipeline reads its "embedder" section
+        path = os.path.join(os.path.dirname(__file__), '..', 'api', 'config', 'embedder.ollama.json.bak')
+        with open(path, encoding="utf-8") as f:
+            embedder = json.load(f)["embedder"]
+
+        config = OllamaBatchConfig.from_dict(embedder)
+        assert embedder["client_class"] == "OllamaClient"
+        assert (config.batch_size, config.concurrency, config.max_retries) == (
+            embedder["batch_size"], embedder["concurrency"], embedder["max_retries"])
@@ -0,0 +1,58 @@
+"""
+Tests for building a repository's vector store in DatabaseManager.prepare_db_index.
+
+Usage: python -m pytest test/test_prepare_db_index.py
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api import data_pipeline
+from api.data_pipeline import DatabaseManager
+from api.tools.vector_store import partial_path_for
+
+
+def _failing_manager(tmp_path, monkeypatch, resumable):
+    repo_dir = tmp_path / "repo"
+    repo_dir.mkdir()
+    (repo_dir / "main.py").write_text("def main():\n    return 0\n")
+    databases = tmp_path / "databases"
+    databases.mkdir()
+
+    manager = DatabaseManager()
+    manager.repo_paths = {
+        "save_repo_dir": str(repo_dir),
+        "save_db_file": str(databases / "repo.pkl"),
+        "save_store_dir": str(databases / "repo.store"),
+        "save_manifest_file": str(databases / "repo.manifest.json"),
+    }
+    ingest = dict(data_pipeline.configs.get("ingest", {}), resumable=resumable)
+    monkeypatch.setitem(data_pipeline.configs, "ingest", ingest)
+
+    def failing_stream(*args, **kwargs):
+        raise RuntimeError("embedding failed")
+    monkeypatch.setattr(data_pipeline, "stream_files_to_store", failing_stream)
+    return manager, databases
+
+
+class TestPrepareDbIndex:
+    """Tests for DatabaseManager.prepare_db_index"""
+
+    def test_failed_build_removes_temporary_store(self, tmp_path, monkeypatch):
+        manager, databases = _failing_manager(tmp_path, monkeypatch, resumable=False)
+        with pytest.raises(RuntimeError):
+            manager.prepare_db_index()
+
+        assert not [name for name in os.listdir(str(databases)) if ".tmp-" in name]
+        assert not os.path.exists(manager.repo_paths["save_store_dir"])
+
+    def test_failed_resumable_build_keeps_checkpoint(self, tmp_path, monkeypatch):
+        manager, _ = _failing_manager(tmp_path, monkeypatch, resumable=True)
+        with pytest.raises(RuntimeError):
+            manager.prepare_db_index()
+
+        assert os.path.isdir(partial_path_for(manager.repo_paths["save_store_dir"]))
@@ -0,0 +1,171 @@
+"""
+Tests for CodeParser and the parallel project analysis behind the structural-analysis endpoint.
+
+Usage: python -m pytest test/test_project_parser.py
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.tools import project_parser
+from api.tools.analysis_store import AnalysisStore, AnalysisWriter
+from api.tools.project_parser import (
+    CodeParser, PatternSet, analyze_project_files, get_structural_analysis, list_project_files, parse_project,
+    update_project_analysis,
+)
+
+
+def _write_project(root, count=12):
+    for i in range(count):
+        package = root / f"pkg{i % 3}"
+        package.mkdir(exist_ok=True)
+        (package / f"module_{i}.py").write_text(f"import os\n\n\nclass Thing{i}:\n    def run(self):\n        return {i}\n")
+    (root / "notes.txt").write_text("not source code\n")
+
+
+class TestProjectParser:
+    """Tests for parse_project, the analysis cache and analyze_project_files"""
+
+    def test_parallel_analysis_matches_serial(self, tmp_path, monkeypatch):
+        _write_project(tmp_path)
+        files = list_project_files(str(tmp_path))
+        assert len(files) == 12 and files == sorted(files)
+
+        monkeypatch.setattr(project_parser, "MIN_PARALLEL_PARSE_FILES", 0)
+        calls = []
+        serial = analyze_project_files(str(tmp_path), files, workers=1)
+        parallel = analyze_project_files(str(tmp_path), files, workers=2, chunk_size=5,
+                                         progress=lambda done, total: calls.append((done, total)))
+
+        assert parallel == serial
+        assert calls == [(5, 12), (10, 12), (12, 12)]
+        assert serial[0]["analysis_result"]["parsed_data"]["classes"][0]["name"] == "Thing0"
+
+    def test_parse_project_saves_analysis_without_printing(self, tmp_path, monkeypatch, capsys):
+        monkeypatch.setenv("HOME", str(tmp_path / "home"))
+        project = tmp_path / "project"
+        project.mkdir()
+        _write_project(project, count=3)
+
+        summary = parse_project(str(project), workers=1)
+
+        assert summary["total_files"] == 3
+        assert summary["modules"][".py"]["file_count"] == 3
+        index = tmp_path / "home" / ".adalflow" / "analysis" / "project_project_analysis.index.json"
+        assert json.loads(index.read_text())["processed_files"] == 3
+        assert capsys.readouterr().out == ""
+
+    def test_saved_analysis_is_read_per_module(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("HOME", str(tmp_path / "home"))
+        project = tmp_path / "project"
+        project.mkdir()
+        _write_project(project, count=4)
+        (project / "app.ts").write_text("import React from 'react';\nfunction render(x: number): string {\n")
+
+        summary = parse_project(str(project), workers=1)
+
+        assert get_structural_analysis(str(project)) == summary
+        scripts = get_structural_analysis(str(project), modules=[".ts"])
+        assert list(scripts["modules"]) == [".ts"]
+        assert scripts["modules"][".ts"]["files"][0]["key_functions"][0]["name"] == "render"
+
+        limited = get_structural_analysis(str(project), max_bytes=400)
+        assert limited["truncated"] is True
+        assert limited["modules"][".py"]["file_count"] == 4
+        assert 0 < len(limited["modules"][".py"]["files"]) < 4
+
+        store = AnalysisStore.open(project_parser.get_analysis_default_root_path(), "project")
+        entry = store.file_entry(os.path.join("pkg1", "module_1.py"))
+        assert entry["file_path"] == str(project / "pkg1" / "module_1.py")
+        assert entry["analysis_result"]["parsed_data"]["classes"][0]["name"] == "Thing1"
+        assert [e["relative_path"] for e in store.iter_entries([".ts"])] == ["app.ts"]
+
+    def test_reanalysis_parses_only_changed_files(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("HOME", str(tmp_path / "home"))
+        project = tmp_path / "project"
+        project.mkdir()
+        _write_project(project, count=6)
+
+        first, stats = update_project_analysis(str(project), workers=1)
+        assert (stats.reused, stats.parsed, stats.removed) == (0, 6, 0)
+
+        _, stats = update_project_analysis(str(project), workers=1)
+        assert (stats.reused, stats.parsed) == (6, 0)
+
+        (project / "pkg1" / "module_1.py").write_text("class Renamed:\n    def run(self):\n        pass\n")
+        (project / "pkg2" / "module_2.py").unlink()
+        # Same content with a new mtime is recognised by its hash
+        (project / "pkg0" / "module_3.py").write_text((project / "pkg0" / "module_3.py").read_text())
+        summary, stats = update_project_analysis(str(project), workers=1)
+
+        assert (stats.reused, stats.parsed, stats.removed) == (4, 1, 1)
+        assert stats.hashed >= 2
+        assert summary == parse_project(str(project), workers=1, use_cache=False)
+        names = [cls["name"] for f in summary["modules"][".py"]["files"] for cls in f["key_classes"]]
+        assert "Renamed" in names and "Thing2" not in names
+
+    def test_cache_is_discarded_for_another_engine(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("HOME", str(tmp_path / "home"))
+        project = tmp_path / "project"
+        project.mkdir()
+        _write_project(project, count=2)
+
+        update_project_analysis(str(project), workers=1, engine="regex")
+        _, stats = update_project_analysis(str(project), workers=1, engine="auto")
+        assert stats.parsed == 2
+
+    def test_failed_write_does_not_save_the_cache(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("HOME", str(tmp_path / "home"))
+        project = tmp_path / "project"
+        project.mkdir()
+        (project / "a.py").write_text("class A:\n    pass\n")
+        update_project_analysis(str(project), workers=1)
+
+        (project / "b.py").write_text("class B:\n    pass\n")
+        add = AnalysisWriter.add
+
+        def failing_add(self, entry, module, summary):
+            raise OSError("disk full")
+        monkeypatch.setattr(AnalysisWriter, "add", failing_add)
+        with pytest.raises(OSError):
+            update_project_analysis(str(project), workers=1)
+        assert [f["file_name"] for f in get_structural_analysis(str(project))["modules"][".py"]["files"]] == ["a.py"]
+
+        monkeypatch.setattr(AnalysisWriter, "add", add)
+        _, stats = update_project_analysis(str(project), workers=1)
+        assert (stats.reused, stats.parsed) == (1, 1)
+        assert len(get_structural_analysis(str(project))["modules"][".py"]["files"]) == 2
+
+    def test_pattern_set_tries_patterns_in_order(self):
+        patterns = PatternSet([("call", r"^(\w+)\((\w*)\)"), ("word", r"^(\w+)"), ("any", r"^.")])
+
+        assert patterns.match("run(x)") == ("call", ("run", "x"))
+        assert patterns.match("run x") == ("word", ("run",))
+        assert patterns.match("#") == ("any", ())
+        assert patterns.match("") is None
+
+    def test_parse_code_dispatches_per_language(self):
+        parser = CodeParser()
+        python = parser.parse_code("m.py", lines=[
+            "import os\n", "# def hidden():\n", "class Thing(Base):\n", "    def run(self) -> int:\n",
+        ])
+        assert python["imports"] == [{"type": "import", "module": "os", "line_number": 1}]
+        assert python["classes"][0]["inheritance"] == "Base"
+        assert [method["name"] for method in python["classes"][0]["methods"]] == ["run"]
+
+        script = parser.parse_code("app.ts", lines=[
+            "import React from 'react';\n", "const load = (url: string): Data => {\n",
+        ])
+        assert script["imports"][0] == {"type": "import", "imports": "React", "module": "react", "line_number": 1}
+        assert script["functions"][0]["name"] == "load" and script["functions"][0]["return_type"] == "Data "
+
+        go = parser.parse_code("main.go", lines=[
+            "package main\n", "import (\n", '"fmt"\n', ")\n", "func (s *Server) Start() (err error) {\n",
+        ])
+        assert go["package"] == "main" and go["imports"][0]["path"] == "fmt"
+        assert go["methods"][0]["receiver"] == "s *Server"
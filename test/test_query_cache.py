@@ -0,0 +1,91 @@
+"""
+Tests for the query embedding cache used by the RAG retriever.
+
+Usage: python -m pytest test/test_query_cache.py
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.tools.query_cache import QueryEmbeddingCache
+
+
+class TestQueryEmbeddingCache:
+    """Tests for QueryEmbeddingCache"""
+
+    def test_hits_expire_after_ttl(self):
+        now = [0.0]
+        cache = QueryEmbeddingCache(max_entries=4, ttl_seconds=10, clock=lambda: now[0])
+        calls = []
+        compute = lambda: calls.append(1) or [0.1, 0.2]
+
+        assert cache.get_or_compute("q", compute) == [0.1, 0.2]
+        assert cache.get_or_compute("q", compute) == [0.1, 0.2]
+        assert len(calls) == 1
+        now[0] = 11.0
+        cache.get_or_compute("q", compute)
+        assert len(calls) == 2
+        assert cache.metrics()["expirations"] == 1
+
+    def test_lru_eviction(self):
+        cache = QueryEmbeddingCache(max_entries=2)
+        for key in ["a", "b", "a", "c"]:
+            cache.get_or_compute(key, lambda key=key: key)
+        assert len(cache) == 2
+        assert cache.stats.evictions == 1
+        # "b" was least recently used
+        assert cache.get_or_compute("b", lambda: "recomputed") == "recomputed"
+
+    def test_concurrent_identical_queries_share_one_request(self):
+        cache = QueryEmbeddingCache()
+        calls = []
+        started = threading.Event()
+
+        def slow():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return [1.0]
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("q", slow))) for _ in range(4)]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [[1.0]] * 4
+        assert len(calls) == 1
+        assert cache.stats.coalesced == 3
+
+    def test_errors_are_not_cached(self):
+        cache = QueryEmbeddingCache()
+
+        def fail():
+            raise ValueError("provider down")
+
+        with pytest.raises(ValueError):
+            cache.get_or_compute("q", fail)
+        assert cache.get_or_compute("q", lambda: [2.0]) == [2.0]
+        assert cache.stats.errors == 1
+
+    def test_many_computes_all_misses_in_one_call(self):
+        cache = QueryEmbeddingCache()
+        cache.get_or_compute("a", lambda: "A")
+        batches = []
+
+        def compute_many(keys):
+            batches.append(list(keys))
+            return [key.upper() for key in keys]
+
+        assert cache.get_or_compute_many(["a", "b", "c", "b"], compute_many) == ["A", "B", "C", "B"]
+        assert batches == [["b", "c"]]
+        assert cache.get_or_compute_many(["c"], compute_many) == ["C"]
+        assert len(batches) == 1
@@ -0,0 +1,71 @@
+"""
+Tests for the process-wide retriever cache.
+
+Usage: python -m pytest test/test_retriever_cache.py
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.tools.retriever_cache import RetrieverCache, store_version
+
+
+class TestRetrieverCache:
+    """Tests for RetrieverCache"""
+
+    def test_hit_miss_and_version_invalidation(self):
+        cache = RetrieverCache(max_bytes=100)
+        assert cache.get("repo", version=1) is None
+        cache.put("repo", "index-v1", version=1, nbytes=10)
+        assert cache.get("repo", version=1) == "index-v1"
+        assert cache.get("repo", version=2) is None
+
+        metrics = cache.metrics()
+        assert metrics["hits"] == 1
+        assert metrics["misses"] == 2
+        assert metrics["invalidations"] == 1
+        assert metrics["entries"] == 0
+
+    def test_lru_eviction_by_memory_budget(self):
+        cache = RetrieverCache(max_bytes=100, max_entries=10)
+        cache.put("a", "A", nbytes=40)
+        cache.put("b", "B", nbytes=40)
+        cache.get("a")
+        cache.put("c", "C", nbytes=40)
+        assert cache.get("b") is None
+        assert cache.get("a") == "A"
+        assert cache.get("c") == "C"
+        assert cache.metrics()["total_bytes"] == 80
+        assert cache.stats.evictions == 1
+
+    def test_concurrent_misses_build_once(self):
+        cache = RetrieverCache()
+        calls = []
+
+        def build():
+            calls.append(1)
+            time.sleep(0.05)
+            return "index", 1
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_build("k", lambda: 1, build)))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == ["index"] * 5
+        assert len(calls) == 1
+
+    def test_store_version_changes_when_store_is_replaced(self, tmp_path):
+        store_dir = tmp_path / "repo.store"
+        assert store_version(str(store_dir)) is None
+        store_dir.mkdir()
+        (store_dir / "header.json").write_text("{}")
+        first = store_version(str(store_dir))
+        os.utime(store_dir / "header.json", ns=(1, 1))
+        assert store_version(str(store_dir)) != first
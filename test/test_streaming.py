@@ -0,0 +1,63 @@
+"""
+Tests for the bounded streaming pipeline used while indexing.
+
+Usage: python -m pytest test/test_streaming.py
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.tools.streaming import batched, run_pipeline
+
+
+class TestStreamingPipeline:
+    """Tests for run_pipeline and batched"""
+
+    def test_batched(self):
+        assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+    def test_items_flow_in_order_and_none_is_dropped(self):
+        out = []
+        stats = run_pipeline(range(10), [lambda x: x * 2, lambda x: None if x % 4 else x], out.append,
+                             stage_names=["double", "filter"])
+        assert out == [0, 4, 8, 12, 16]
+        assert stats.as_dict()["double"]["items"] == 10
+        assert stats.as_dict()["sink"]["items"] == 5
+
+    def test_back_pressure_bounds_items_in_flight(self):
+        produced = []
+        consumed = []
+        lock = threading.Lock()
+        max_ahead = []
+
+        def source():
+            for i in range(30):
+                with lock:
+                    produced.append(i)
+                    max_ahead.append(len(produced) - len(consumed))
+                yield i
+
+        def slow_sink(item):
+            time.sleep(0.002)
+            with lock:
+                consumed.append(item)
+
+        run_pipeline(source(), [lambda x: x], slow_sink, queue_size=2)
+        assert consumed == list(range(30))
+        # source queue + stage + its output queue + the sink's item, plus the one being produced
+        assert max(max_ahead) <= 2 * (2 + 1) + 1
+
+    def test_stage_errors_propagate(self):
+        def boom(x):
+            if x == 3:
+                raise ValueError("bad item")
+            return x
+
+        with pytest.raises(ValueError, match="bad item"):
+            run_pipeline(range(100), [boom], lambda x: None)
@@ -0,0 +1,37 @@
+"""
+Tests for the cached tiktoken encoders and token counting helpers.
+
+Usage: python -m pytest test/test_token_counter.py
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import api.tools.token_counter as token_counter
+from api.tools.token_counter import count_tokens, count_tokens_many, estimate_tokens, get_encoder
+
+
+class TestTokenCounter:
+    """Tests for the token counting helpers"""
+
+    def test_encoder_is_loaded_once(self):
+        first = get_encoder("cl100k_base")
+        assert get_encoder("cl100k_base") is first
+        assert "cl100k_base" in token_counter._encoders
+
+    def test_batch_counts_match_single_counts(self):
+        texts = ["def f():\n    return 1\n" * i for i in range(1, 20)] + ["<|endoftext|> marker", ""]
+        expected = [count_tokens(text) for text in texts]
+
+        assert count_tokens_many(texts, num_threads=4) == expected
+        assert count_tokens_many(texts, num_threads=1) == expected
+
+    def test_estimate_skips_tokenization(self, monkeypatch):
+        def no_encoder(name):
+            raise AssertionError("estimates must not load an encoder")
+
+        monkeypatch.setattr(token_counter, "get_encoder", no_encoder)
+        text = "x" * 4000
+        assert count_tokens(text, estimate=True) == estimate_tokens(text) == 1000
@@ -0,0 +1,137 @@
+"""
+Tests for the optional tree-sitter code parser engine.
+
+Usage: python -m pytest test/test_tree_sitter_parser.py
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.tools.project_parser import CodeParser, code_parser_signature, create_code_parser, update_project_analysis
+
+tree_sitter = pytest.importorskip("tree_sitter")
+pytest.importorskip("tree_sitter_python")
+
+from api.tools.tree_sitter_parser import TreeSitterParser
+
+
+PYTHON_SOURCE = '''import os
+from typing import (
+    Dict,
+    List,
+)
+
+
+@cached
+@traced(level=2)
+def load(
+    path: str,
+    limit: int = 10,
+) -> Dict[str, List[int]]:
+    return {}
+
+
+class Outer(Base):
+    class Inner:
+        def method(self):
+            return os.sep
+
+    async def run(self, value):
+        return value
+'''
+
+
+def _lines(source):
+    return source.splitlines(keepends=True)
+
+
+class TestTreeSitterParser:
+    """Tests for TreeSitterParser and create_code_parser"""
+
+    def test_multiline_signatures_and_decorators(self):
+        result = TreeSitterParser().parse_code("module.py", lines=_lines(PYTHON_SOURCE))
+
+        assert [imp["module"] for imp in result["imports"]] == ["os", "typing"]
+        load = result["functions"][0]
+        assert load["name"] == "load"
+        assert load["line_number"] == 10 and load["end_line"] == 14
+        assert load["return_type"] == "Dict[str, List[int]]"
+        assert "limit: int = 10" in load["parameters"]
+        assert load["decorators"] == ["@cached", "@traced(level=2)"]
+
+    def test_nested_classes_have_parent_and_end_line(self):
+        result = TreeSitterParser().parse_code("module.py", lines=_lines(PYTHON_SOURCE))
+        classes = {cls["name"]: cls for cls in result["classes"]}
+
+        assert classes["Outer"]["line_number"] == 17 and classes["Outer"]["end_line"] == 23
+        assert classes["Inner"]["parent"] == "Outer"
+        assert [m["name"] for m in classes["Inner"]["methods"]] == ["method"]
+        assert [m["name"] for m in classes["Outer"]["methods"]] == ["run"]
+
+    def test_incremental_reparse_follows_edits(self):
+        parser = TreeSitterParser()
+        first = parser.parse_code("module.py", lines=_lines(PYTHON_SOURCE))
+        edited = PYTHON_SOURCE.replace("def load(", "def load_all(").replace(
+            "    async def run", "    def stop(self):\n        pass\n\n    async def run")
+        second = parser.parse_code("module.py", lines=_lines(edited))
+
+        assert first["functions"][0]["name"] == "load"
+        assert second["functions"][0]["name"] == "load_all"
+        outer = next(cls for cls in second["classes"] if cls["name"] == "Outer")
+        assert [m["name"] for m in outer["methods"]] == ["stop", "run"]
+        assert second == TreeSitterParser().parse_code("module.py", lines=_lines(edited))
+
+    def test_unsupported_languages_use_regex_parser(self):
+        source = _lines("<div id=\"main\" class=\"page\"></div>\n")
+        assert TreeSitterParser().parse_code("page.html", lines=source) == CodeParser().parse_code(
+            "page.html", lines=source)
+
+    def test_create_code_parser_engines(self, monkeypatch):
+        assert type(create_code_parser("regex")) is CodeParser
+        assert isinstance(create_code_parser("tree_sitter"), TreeSitterParser)
+        with pytest.raises(ValueError):
+            create_code_parser("ast")
+
+        from api.tools import tree_sitter_parser
+        monkeypatch.setattr(tree_sitter_parser, "tree_sitter_available", lambda: False)
+        assert type(create_code_parser("auto")) is CodeParser
+        assert type(create_code_parser("tree_sitter")) is CodeParser
+
+    def test_format_results_keeps_end_lines(self):
+        parser = TreeSitterParser()
+        formatted = parser.format_results(parser.parse_code("module.py", lines=_lines(PYTHON_SOURCE)))
+
+        assert formatted["parsed_data"]["functions"][0]["end_line"] == 14
+        assert formatted["parsed_data"]["classes"][1]["parent"] == "Outer"
+        regex = CodeParser().format_results(CodeParser().parse_code("module.py", lines=_lines(PYTHON_SOURCE)))
+        assert regex["parsed_data"]["methods"]
+        assert all("end_line" not in method for method in regex["parsed_data"]["methods"])
+
+    def test_analysis_cache_follows_installed_parser(self, tmp_path, monkeypatch):
+        from api.tools import tree_sitter_parser
+        monkeypatch.setenv("HOME", str(tmp_path / "home"))
+        project = tmp_path / "project"
+        project.mkdir()
+        (project / "module.py").write_text(PYTHON_SOURCE)
+
+        monkeypatch.setattr(tree_sitter_parser, "tree_sitter_available", lambda: False)
+        assert code_parser_signature("auto") == "CodeParser"
+        _, stats = update_project_analysis(str(project), workers=1, engine="auto")
+        assert stats.parsed == 1
+
+        # Installing tree-sitter, then another grammar, invalidates the cached results
+        monkeypatch.setattr(tree_sitter_parser, "tree_sitter_available", lambda: True)
+        assert code_parser_signature("auto").startswith("TreeSitterParser:")
+        _, stats = update_project_analysis(str(project), workers=1, engine="auto")
+        assert stats.parsed == 1
+        _, stats = update_project_analysis(str(project), workers=1, engine="auto")
+        assert stats.reused == 1
+
+        grammars = TreeSitterParser.available_grammars() + ["zig"]
+        monkeypatch.setattr(TreeSitterParser, "available_grammars", classmethod(lambda cls: grammars))
+        _, stats = update_project_analysis(str(project), workers=1, engine="auto")
+        assert stats.parsed == 1
@@ -0,0 +1,198 @@
+"""
+Tests for the memory-mapped vector store that replaces the pickled LocalDB.
+
+Usage: python -m pytest test/test_vector_store.py
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.tools.vector_store import (
+    StoreBuildLock, StoreLockedError, VectorStore, VectorStoreWriter, partial_path_for, quantize_int8, store_path_for,
+    validate_embeddings,
+)
+
+
+def _chunk(index, vector, file_path="a.py"):
+    return SimpleNamespace(
+        id=f"chunk-{index}", text=f"text {index} é", vector=vector, order=index,
+        parent_doc_id="doc-1", estimated_num_tokens=3, meta_data={"file_path": file_path},
+    )
+
+
+class TestVectorStore:
+    """Tests for VectorStore and VectorStoreWriter"""
+
+    def test_store_path_for(self):
+        assert store_path_for("/db/owner_repo.pkl") == "/db/owner_repo.store"
+
+    def test_round_trip_keeps_rows_and_lengths(self, tmp_path):
+        path = str(tmp_path / "repo.store")
+        chunks = [_chunk(0, [1.0, 0.0, 0.0]), _chunk(1, [0.0, 2.0]), _chunk(2, [0.0, 0.0, 3.0]), _chunk(3, [])]
+        VectorStore.write(path, chunks, embedder={"model": "m"})
+
+        store = VectorStore.open(path)
+        assert len(store) == 4
+        assert store.dim == 3
+        assert store.embedder == {"model": "m"}
+        assert isinstance(store.vectors, np.memmap)
+        assert list(store.lengths) == [3, 2, 3, 0]
+        assert store.text(1) == "text 1 é"
+
+        docs = store.documents(factory=SimpleNamespace)
+        assert docs[2].vector == [0.0, 0.0, 3.0]
+        assert docs[1].vector == []
+        assert docs[-1].id == "chunk-3"
+        assert [doc.order for doc in docs[0:2]] == [0, 1]
+        assert docs[0].meta_data == {"file_path": "a.py"}
+
+    def test_copy_from_and_replace(self, tmp_path):
+        path = str(tmp_path / "repo.store")
+        old = VectorStore.write(path, [_chunk(i, [float(i), 1.0], f"{i}.py") for i in range(3)])
+
+        writer = VectorStoreWriter(path, dim=old.dim)
+        writer.copy_from(old, [0, 2])
+        writer.add([_chunk(9, [9.0, 9.0], "9.py")])
+        new = writer.commit()
+
+        assert [record["id"] for record in new.iter_metadata()] == ["chunk-0", "chunk-2", "chunk-9"]
+        np.testing.assert_array_equal(new.vectors[:, 0], [0.0, 2.0, 9.0])
+        assert new.text(1) == "text 2 é"
+        # The lock file is kept: removing it could let two writers lock different files
+        assert sorted(os.listdir(str(tmp_path))) == ["repo.store", "repo.store.lock"]
+
+    def test_empty_store(self, tmp_path):
+        store = VectorStore.write(str(tmp_path / "empty.store"), [])
+        assert len(store) == 0
+        assert len(store.documents()) == 0
+
+    def test_validate_embeddings(self):
+        vectors = np.array([[1, 0], [0, 0], [np.nan, 1], [0, 0], [2, 2]], dtype=np.float32)
+        lengths = np.array([2, 2, 2, 0, 3])
+        validation = validate_embeddings(vectors, lengths)
+        assert list(validation.valid_rows) == [0]
+        assert validation.summary() == {
+            "total": 5, "valid": 1, "target_dim": 2, "missing": 1,
+            "wrong_size": 1, "non_finite": 1, "zero_norm": 1,
+        }
+
+    def test_validation_is_saved_with_the_store(self, tmp_path):
+        path = str(tmp_path / "repo.store")
+        VectorStore.write(path, [_chunk(0, [1.0, 0.0]), _chunk(1, [0.0, 0.0]), _chunk(2, [1.0])])
+        assert os.path.exists(os.path.join(path, "valid_rows.bin"))
+
+        store = VectorStore.open(path)
+        validation = store.validation()
+        assert list(validation.valid_rows) == [0]
+        assert validation.zero_norm == 1 and validation.wrong_size == 1
+        docs = store.documents(factory=SimpleNamespace, rows=validation.valid_rows)
+        assert len(docs) == 1 and docs[0].id == "chunk-0"
+
+    def test_resume_from_checkpoint(self, tmp_path):
+        path = str(tmp_path / "repo.store")
+        writer = VectorStoreWriter(path, embedder={"model": "m"}, resumable=True)
+        writer.add([_chunk(0, [1.0, 0.0], "a.py")])
+        writer.checkpoint({"a.py": "git:1"})
+        # Rows written after the last checkpoint are lost with the crash
+        writer.add([_chunk(1, [0.0, 1.0], "b.py")])
+        writer.close()
+
+        assert VectorStoreWriter.resume(path, embedder={"model": "other"}) is None
+        writer, completed = VectorStoreWriter.resume(path, embedder={"model": "m"})
+        assert completed == {"a.py": "git:1"}
+        writer.add([_chunk(2, [1.0, 1.0], "c.py")])
+        writer.checkpoint({"c.py": "git:3"})
+        store = writer.commit()
+
+        assert [record["id"] for record in store.iter_metadata()] == ["chunk-0", "chunk-2"]
+        np.testing.assert_array_equal(store.vectors, [[1.0, 0.0], [1.0, 1.0]])
+        assert store.text(1) == "text 2 é"
+        assert not os.path.exists(partial_path_for(path))
+        assert not os.path.exists(os.path.join(path, "checkpoint.json"))
+
+    def test_concurrent_build_waits_for_lock(self, tmp_path):
+        path = str(tmp_path / "repo.store")
+        first = VectorStoreWriter(path, resumable=True)
+        first.add([_chunk(0, [1.0, 0.0], "a.py")])
+        first.checkpoint({"a.py": "git:1"})
+
+        with pytest.raises(StoreLockedError):
+            VectorStoreWriter(path, resumable=True, lock_timeout=0)
+        with pytest.raises(StoreLockedError):
+            VectorStoreWriter.resume(path, lock_timeout=0)
+        # The second writer left the first one's build directory alone
+        assert first.commit().text(0) == "text 0 é"
+
+        second = VectorStoreWriter(path, resumable=True, lock_timeout=0)
+        second.abort()
+
+    def test_lock_held_across_writers(self, tmp_path):
+        path = str(tmp_path / "repo.store")
+        lock = StoreBuildLock(path).acquire()
+        writer = VectorStoreWriter(path, resumable=True, lock=lock)
+        writer.abort()
+        assert lock.held
+        with pytest.raises(StoreLockedError):
+            VectorStoreWriter(path, lock_timeout=0)
+
+        writer = VectorStoreWriter(path, resumable=True, lock=lock)
+        lock.release()
+        writer.add([_chunk(0, [1.0, 0.0], "a.py")])
+        writer.commit()
+        assert not lock.held
+        VectorStoreWriter(path, lock_timeout=0).abort()
+
+    def test_int8_store_dequantizes_and_validates(self, tmp_path):
+        path = str(tmp_path / "repo.store")
+        chunks = [_chunk(0, [0.5, -1.0, 0.25]), _chunk(1, [0.0, 0.0, 0.0]), _chunk(2, [float("nan"), 1.0, 0.0])]
+        store = VectorStore.write(path, chunks, dtype="int8")
+
+        assert store.vectors.dtype == np.int8 and store.scales.dtype == np.float32
+        np.testing.assert_allclose(store.float_vectors(0), [0.5, -1.0, 0.25], atol=1.0 / 127)
+        np.testing.assert_allclose(store.documents(factory=SimpleNamespace)[0].vector, [0.5, -1.0, 0.25],
+                                   atol=1.0 / 127)
+        validation = store.validation()
+        assert list(validation.valid_rows) == [0]
+        assert validation.zero_norm == 1 and validation.non_finite == 1
+
+    def test_copy_from_converts_between_dtypes(self, tmp_path):
+        path = str(tmp_path / "repo.store")
+        old = VectorStore.write(path, [_chunk(i, [float(i), 1.0]) for i in range(3)], dtype="int8")
+
+        writer = VectorStoreWriter(path, dim=old.dim, dtype="int8")
+        writer.copy_from(old, [2])
+        writer.add([_chunk(9, [-4.0, 2.0])])
+        same = writer.commit()
+        np.testing.assert_array_equal(same.vectors[0], old.vectors[2])
+        np.testing.assert_allclose(same.float_vectors(), [[2.0, 1.0], [-4.0, 2.0]], atol=4.0 / 127)
+
+        writer = VectorStoreWriter(path, dim=same.dim, dtype="float16")
+        writer.copy_from(same, [0, 1])
+        converted = writer.commit()
+        assert converted.scales is None
+        np.testing.assert_allclose(converted.float_vectors(), [[2.0, 1.0], [-4.0, 2.0]], atol=4.0 / 127)
+
+    def test_quantize_int8_uses_a_scale_per_row(self):
+        codes, scales = quantize_int8(np.array([[1.0, -0.5], [254.0, 127.0]], dtype=np.float32))
+        np.testing.assert_array_equal(codes, [[127, -64], [127, 64]])
+        np.testing.assert_allclose(scales, [1.0 / 127, 2.0])
+
+    def test_resume_int8_store(self, tmp_path):
+        path = str(tmp_path / "repo.store")
+        writer = VectorStoreWriter(path, dtype="int8", resumable=True)
+        writer.add([_chunk(0, [1.0, 0.0], "a.py")])
+        writer.checkpoint({"a.py": "git:1"})
+        writer.add([_chunk(1, [0.0, 1.0], "b.py")])
+        writer.close()
+
+        assert VectorStoreWriter.resume(path) is None
+        writer, _ = VectorStoreWriter.resume(path, dtype="int8")
+        writer.add([_chunk(2, [2.0, 2.0], "c.py")])
+        store = writer.commit()
+        np.testing.assert_allclose(store.float_vectors(), [[1.0, 0.0], [2.0, 2.0]])